@@ -4,6 +4,7 @@ root_path = str(Path(__file__).resolve().parent.parent)
 sys.path.append(root_path)
 
 from utils.yaml_util import read_yaml, write_yaml
+from utils.path_util import with_output_formats
 
 
 def init_config():
@@ -21,6 +22,10 @@ def init_config():
     config["param"]["sf_node_eval_param"]["input_path"]["bob"] = f"{bob_data}/bob.csv"
     config["param"]["sf_node_eval_param"]["output_path"]["alice"] = f"{alice_data}/psi-output.csv"
     config["param"]["sf_node_eval_param"]["output_path"]["bob"] = f"{bob_data}/psi-output.csv"
+    # 输出信息中记录各参与方输出文件的格式
+    config["sf_output_information"] = with_output_formats(
+        config["sf_output_information"], config["param"]["sf_node_eval_param"].get("output_format")
+    )
     # 写入配置文件
     write_yaml(f"{JobConfig}/output_psi_input_data.yaml", config)
     
@@ -34,6 +39,9 @@ def init_config():
     config["param"]["sf_node_eval_param"]["train_output_path"]["bob"] = f"{bob_data}/train-dataset.csv"
     config["param"]["sf_node_eval_param"]["test_output_path"]["alice"] = f"{alice_data}/test-dataset.csv"
     config["param"]["sf_node_eval_param"]["test_output_path"]["bob"] = f"{bob_data}/test-dataset.csv"
+    config["sf_output_information"] = with_output_formats(
+        config["sf_output_information"], config["param"]["sf_node_eval_param"].get("output_format")
+    )
     
     # 写入配置文件
     write_yaml(f"{JobConfig}/output_split_input_data.yaml", config)
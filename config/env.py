@@ -4,7 +4,7 @@ import sys
 from dotenv import load_dotenv
 from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Dict, List, Literal
 
 
 # # note: BaseSettings 自动获得以下核心功能：
@@ -64,6 +64,48 @@ class DAGSchedulerSettings(BaseSettings):
     """
     dag_scheduler_host: str = "127.0.0.1"
     dag_scheduler_port: int = 9099
+    dag_scheduler_connect_timeout: float = 3  # 回调连接超时时间（单位：秒）
+    dag_scheduler_read_timeout: float = 10  # 回调读取超时时间（单位：秒）
+    dag_scheduler_max_retries: int = 3  # 回调失败最大重试次数
+    dag_scheduler_backoff_factor: float = 0.5  # 回调重试退避系数
+    dag_scheduler_pool_size: int = 4  # 回调长连接池大小
+
+
+class ExecutorSettings(BaseSettings):
+    """
+    算子执行器配置
+    """
+
+    # 本机同时运行的任务数上限，小于等于0表示不限制；与JobConfig中单个DAG作业的max_parallelism（由调度器控制）不同，这里限制的是本机全部作业
+    executor_max_parallelism: int = 4
+    executor_start_method: Literal["fork", "spawn", "forkserver"] = "forkserver"  # 任务进程启动方式
+    executor_preload_modules: List[str] = [
+        "module_task.psi",
+        "module_task.split",
+        "module_task.ss_xgb",
+    ]  # forkserver启动器预先导入的模块，子进程直接继承
+    executor_pool_enabled: bool = True  # 是否启用SecretFlow常驻执行器池（仅单机模拟模式的任务复用）
+    executor_pool_max_size: int = 4  # 常驻执行器最大数量
+    executor_pool_idle_timeout: int = 600  # 常驻执行器空闲回收时间（单位：秒）
+    executor_party: str = ""  # 本方参与方名称，为空时读取sf_init.cluster_config.self_party
+    executor_peer_port: int = 8088  # 对端算子服务端口，对端地址取cluster_def节点的host
+    executor_peer_operators: Dict[str, str] = {}  # 参与方到算子服务地址的映射，优先于cluster_def推导
+    executor_peer_cancel_timeout: float = 3  # 向对端发送取消请求的超时时间（单位：秒）
+    executor_rendezvous_enabled: bool = True  # 构建SPU前是否与对端参与方握手，确保各方同时建立连接
+    executor_rendezvous_timeout: int = 60  # 等待对端就绪的超时时间，超时后任务失败（单位：秒）
+    executor_port_allocation_enabled: bool = True  # 是否为每个任务动态分配SPU端口，替换cluster_def中写死的端口
+    executor_port_range_start: int = 20000  # SPU端口分配范围起始（包含）
+    executor_port_range_end: int = 20999  # SPU端口分配范围结束（包含）
+    executor_result_cache_enabled: bool = True  # 是否启用任务结果缓存，相同算子、参数和输入内容的任务直接复用输出
+    executor_result_cache_dir: str = "result_cache"  # 任务结果缓存目录
+    executor_result_cache_max_bytes: int = 10 * 1024**3  # 任务结果缓存容量上限（单位：字节）
+    executor_finished_jobs_max: int = 1000  # 保留最近结束任务的状态和结果摘要的数量，供任务状态查询
+    executor_scoring_enabled: bool = True  # 是否启用SS-XGB常驻评分服务
+    executor_scoring_max_sessions: int = 2  # 评分服务常驻进程的最大数量，每个集群配置一个
+    executor_scoring_max_models: int = 4  # 每个评分进程常驻的模型数上限，超过时淘汰最久未使用的模型
+    executor_scoring_batch_window_ms: int = 20  # 合并并发评分请求的时间窗口（单位：毫秒）
+    executor_scoring_max_batch_rows: int = 10000  # 单个微批的行数上限
+    executor_scoring_timeout: float = 60  # 单个评分请求的超时时间（单位：秒）
 
 class GetConfig:
     """
@@ -104,6 +146,14 @@ class GetConfig:
         """
         # 实例化算子层配置模型
         return DAGSchedulerSettings()
+
+    @lru_cache()
+    def get_executor_config(self):
+        """
+        获取算子执行器配置
+        """
+        # 实例化算子执行器配置模型
+        return ExecutorSettings()
     
     @staticmethod
     def parse_cli_args():
@@ -160,3 +210,5 @@ DataBaseConfig = get_config.get_database_config()
 RedisConfig = get_config.get_redis_config()
 # DAGScheduler算子层配置
 DAGSchedulerConfig = get_config.get_dag_scheduler_config()
+# 算子执行器配置
+ExecutorConfig = get_config.get_executor_config()
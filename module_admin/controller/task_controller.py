@@ -1,25 +1,32 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from config.get_db import get_db
 from utils.log_util import logger
 from utils.response_util import ResponseUtil
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 from module_admin.models.job import Job
+from module_admin.models.scoring import ScoreRequest
 import json
-import module_task
+from module_task import resolve_operator
 import multiprocessing
 from pydantic import BaseModel
 import requests
 import os
 import signal
 from module_admin.service.task_service import ProcessManager
+from utils.cluster_util import get_node_ports
+from config.env import ExecutorConfig
 
 # 定义任务响应模型
 class JobResponse(BaseModel):
     job_uid: str
     success: bool
+    message: Optional[str] = None
+    ports_released: Optional[Dict[int, bool]] = None
+    peers_cancelled: Optional[Dict[str, bool]] = None
 
 # 获取进程管理器实例
 process_manager = ProcessManager.get_instance()
@@ -40,26 +47,43 @@ async def execute_task_list(
     # 获取分页数据
     # time.sleep(2)
     logger.info("获取成功")
+    response_data = []
     for job in job_params:
-        function = eval(job.invoke_target) # module_task.scheduler_test.job
-        args = json.loads(job.job_args or "[]")
-        kwargs = json.loads(job.job_kwargs or "{}")
+        # 启动进程前校验调用目标和参数，未注册的算子直接拒绝
+        try:
+            function = resolve_operator(job.invoke_target)
+            args = json.loads(job.job_args or "[]")
+            kwargs = json.loads(job.job_kwargs or "{}")
+        except (ValueError, ImportError) as e:
+            logger.error(f"任务 {job.job_uid} 校验失败: {str(e)}")
+            response_data.append(JobResponse(
+                job_uid=job.job_uid,
+                success=False,
+                message=str(e)
+            ))
+            continue
         logger.info(f"args: {args}, kwargs: {kwargs}")
         
-        # 使用进程管理器启动进程
-        process_manager.start_process(
-            job_uid=job.job_uid,
-            function=function,
-            args=args,
-            kwargs=kwargs,
-            job_info=job
-        )
-    
-    response_data = []
-    for job in job_params:
+        # 提交到进程管理器的准入队列，进程由后台启动线程启动，不阻塞事件循环
+        try:
+            queued_info = process_manager.start_process(
+                job_uid=job.job_uid,
+                function=function,
+                args=args,
+                kwargs=kwargs,
+                job_info=job
+            )
+        except ValueError as e:
+            response_data.append(JobResponse(
+                job_uid=job.job_uid,
+                success=False,
+                message=str(e)
+            ))
+            continue
         response_data.append(JobResponse(
             job_uid=job.job_uid,
-            success=True
+            success=True,
+            message=queued_info.get("status")
         ))
     
     return ResponseUtil.success(data=response_data)
@@ -72,15 +96,21 @@ async def execute_task_list(
 async def stop_job(
     request: Request,
     job_uids: List[str] = Query(..., description="要停止的任务ID列表"),
+    propagate: bool = Query(True, description="是否通知其他参与方停止同一任务，对端转发的请求为false"),
 ):
     logger.info(f"停止任务: {job_uids}")
     
+    # 并发停止，各任务的SIGTERM/SIGKILL等待互不阻塞，也不阻塞事件循环
+    results = await run_in_threadpool(process_manager.stop_processes, job_uids, propagate=propagate)
+    
     response_data = []
     for job_uid in job_uids:
-        success = process_manager.stop_process(job_uid)
+        result = results[job_uid]
         response_data.append(JobResponse(
             job_uid=job_uid,
-            success=success
+            success=result["success"],
+            ports_released=result["ports_released"],
+            peers_cancelled=result["peers_cancelled"]
         ))
     
     return ResponseUtil.success(data=response_data)
@@ -98,19 +128,35 @@ async def get_job_status(
     process_info = process_manager.get_process_info(job_uid)
     
     if not process_info:
+        finished = process_manager.get_finished_job(job_uid)
+        if finished:
+            return ResponseUtil.success(data={"job_uid": job_uid, **finished})
         return ResponseUtil.success(data={
             "job_uid": job_uid,
             "status": "not_found",
             "message": "任务不存在或已完成"
         })
     
+    if process_info.get("status") in ("queued", "launching"):
+        return ResponseUtil.success(data={
+            "job_uid": job_uid,
+            "status": process_info.get("status"),
+            "queue_position": process_manager.get_queue_position(job_uid),
+            "priority": process_info.get("priority"),
+        })
+    
     is_running = process_manager.is_process_running(job_uid)
     
     return ResponseUtil.success(data={
         "job_uid": job_uid,
         "status": "running" if is_running else "stopped",
         "pid": process_info.get("pid"),
-        "start_time": process_info.get("start_time")
+        "start_time": process_info.get("start_time"),
+        "executor": process_info.get("executor"),
+        "launch_ms": process_info.get("launch_ms"),
+        "memory": process_manager.get_process_memory(job_uid),
+        "rendezvous_wait_ms": process_manager.rendezvous_registry.get_wait_ms(job_uid),
+        "spu_ports": get_node_ports((process_info.get("kwargs") or {}).get("sf_cluster_desc")),
     })
 
 
@@ -124,6 +170,13 @@ async def get_all_jobs(request: Request):
     
     result = {}
     for job_uid, process_info in all_processes.items():
+        if process_info.get("status") in ("queued", "launching"):
+            result[job_uid] = {
+                "status": process_info.get("status"),
+                "queue_position": process_manager.get_queue_position(job_uid),
+                "priority": process_info.get("priority"),
+            }
+            continue
         is_running = process_manager.is_process_running(job_uid)
         result[job_uid] = {
             "status": "running" if is_running else "stopped",
@@ -131,4 +184,78 @@ async def get_all_jobs(request: Request):
             "start_time": process_info.get("start_time")
         }
     
-    return ResponseUtil.success(data=result)
\ No newline at end of file
+    return ResponseUtil.success(data=result)
+
+
+@taskController.post(
+    "/rendezvous/arrive",
+    response_model=Dict
+)
+async def rendezvous_arrive(
+    request: Request,
+    job_uid: str = Query(..., description="任务ID"),
+    party: str = Query(..., description="已就绪的参与方"),
+    port: Optional[int] = Query(None, description="该参与方SPU节点实际监听的端口"),
+):
+    """登记参与方的任务进程已就绪，由各参与方的任务进程调用"""
+    process_manager.rendezvous_registry.arrive(job_uid, party, port)
+    return ResponseUtil.success(data={"job_uid": job_uid, "party": party})
+
+
+@taskController.get(
+    "/rendezvous/wait",
+    response_model=Dict
+)
+async def rendezvous_wait(
+    request: Request,
+    job_uid: str = Query(..., description="任务ID"),
+    party: str = Query(..., description="本方参与方"),
+    parties: List[str] = Query(..., description="需要就绪的参与方列表"),
+    timeout: float = Query(10, le=30, description="长轮询超时时间（秒）"),
+):
+    """长轮询等待全部参与方就绪，由本方的任务进程调用；在事件循环中等待，不占用线程池"""
+    ready = await process_manager.rendezvous_registry.wait(job_uid, party, parties, timeout)
+    return ResponseUtil.success(data={
+        "job_uid": job_uid,
+        "ready": ready,
+        "ports": process_manager.rendezvous_registry.get_ports(job_uid),
+    })
+
+
+@taskController.post(
+    "/ss_xgb/score",
+    response_model=Dict
+)
+async def ss_xgb_score(
+    request: Request,
+    score_request: ScoreRequest,
+):
+    """使用常驻的SS-XGB模型评分，并发的请求合并为微批预测"""
+    try:
+        scoring_service = process_manager.get_scoring_service()
+        result = await run_in_threadpool(
+            scoring_service.score,
+            score_request.sf_cluster_desc,
+            score_request.model_path,
+            score_request.features,
+            score_request.model_version,
+            score_request.label_col or "",
+            ExecutorConfig.executor_scoring_timeout,
+        )
+    except (ValueError, OSError, RuntimeError, TimeoutError) as e:
+        logger.error(f"评分失败: {str(e)}")
+        return ResponseUtil.failure(msg=str(e))
+    return ResponseUtil.success(data=result)
+
+
+@taskController.get(
+    "/ss_xgb/scoring_status",
+    response_model=Dict
+)
+async def ss_xgb_scoring_status(request: Request):
+    """获取常驻评分进程的状态"""
+    try:
+        sessions = process_manager.get_scoring_service().get_status()
+    except RuntimeError as e:
+        return ResponseUtil.failure(msg=str(e))
+    return ResponseUtil.success(data=sessions)
@@ -8,14 +8,16 @@ class Job(BaseModel):
     invoke_target: str
     job_args: Optional[str] = ""
     job_kwargs: Optional[str] = ""
+    priority: Optional[int] = 0  # 优先级，数值越大越先启动
 
     class Config:
         json_schema_extra = {
             "example": {
                 "job_uid": "psi3",
                 "job_executor": "default",
-                "invoke_target": "module_task.scheduler_test.psi",
+                "invoke_target": "psi_csv",
                 "job_args": "",
-                "job_kwargs": ""
+                "job_kwargs": "",
+                "priority": 100
             }
         } 
\ No newline at end of file
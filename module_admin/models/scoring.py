@@ -0,0 +1,22 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+class ScoreRequest(BaseModel):
+    """SS-XGB评分请求模型"""
+    sf_cluster_desc: Dict[str, Any]
+    model_path: str
+    model_version: Optional[str] = None  # 为空时由模型文件的大小和修改时间决定
+    label_col: Optional[str] = ""
+    features: Dict[str, List[Dict[str, Any]]]  # {参与方: 特征行列表}，各方按行对齐
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sf_cluster_desc": {"devices": {"spu_config": {}}, "sf_init": {"parties": ["alice", "bob"], "address": "local"}},
+                "model_path": "local_data/ss_xgb.model",
+                "features": {
+                    "alice": [{"x1": 0.1, "x2": 0.2}],
+                    "bob": [{"x3": 0.3}]
+                }
+            }
+        }
@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from typing import Dict, List
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.log_util import logger
+
+
+class CallbackDispatcher:
+    """
+    回调通知分发器
+
+    在独立线程中通过长连接池发送回调，带超时和退避重试，调用方只需入队，不会被网络I/O阻塞。
+    每个完成事件单独发送一次请求，请求体与原有的单条通知一致；多个发送线程共用连接池
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        backoff_factor: float,
+        pool_size: int,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = max(pool_size, 1)
+        self._queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+
+        # 只重试连接失败（请求尚未发出）；POST不是幂等的，读超时或5xx后重试可能导致对端重复处理完成通知
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def start(self):
+        """启动分发线程"""
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.pool_size:
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"回调分发线程已启动({self.pool_size}个)")
+
+    def stop(self, timeout: float = 5):
+        """发送完队列中剩余的通知后停止分发线程"""
+        for _ in self._threads:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        self._threads = []
+        self._session.close()
+
+    def submit(self, callback_url: str, payload: Dict):
+        """
+        提交一条回调通知
+
+        Args:
+            callback_url: 回调地址
+            payload: 通知内容
+        """
+        self._queue.put((callback_url, payload))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            self._send(*item)
+
+    def _send(self, callback_url: str, payload: Dict) -> bool:
+        """
+        发送一条通知
+
+        Returns:
+            是否成功发送通知
+        """
+        try:
+            response = self._session.post(callback_url, json=payload, timeout=self.timeout)
+            logger.info(f"回调通知已发送 {payload.get('job_uid')}: {response.status_code}")
+            return response.ok
+        except Exception as e:
+            logger.error(f"发送回调通知失败 {payload.get('job_uid')}: {str(e)}")
+        return False
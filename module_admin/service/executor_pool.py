@@ -0,0 +1,294 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from module_admin.service.peer_service import lease_spu_ports
+from utils.log_util import logger
+from utils.cluster_util import cluster_fingerprint, is_local_cluster
+from utils.port_util import PortAllocator
+
+
+def _warm_worker_main(sf_cluster_desc: Dict, conn):
+    """
+    常驻执行器进程入口：初始化SecretFlow运行时后循环执行任务
+
+    Args:
+        sf_cluster_desc: 用于预热的SecretFlow集群配置
+        conn: 与主进程通信的管道
+    """
+    # 独立进程组，回收或停止执行器时连同Ray/SPU子进程一起终止
+    os.setsid()
+    # 延迟导入，避免主进程加载secretflow
+    from utils.sf_init import SecretFlowConfigurator
+    from module_admin.service.job_runner import execute_job, summarize_result
+
+    SecretFlowConfigurator.enable_reuse()
+    # 预热：提前完成sf.init和SPU/HEU设备构建
+    SecretFlowConfigurator(**sf_cluster_desc)
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        # 收到None表示执行器被回收
+        if message is None:
+            break
+
+        job_uid, function, args, kwargs = message
+        success = True
+        result = None
+        try:
+            result = summarize_result(job_uid, execute_job(job_uid, function, args, kwargs))
+        except Exception as e:
+            success = False
+            logger.error(f"常驻执行器中任务 {job_uid} 执行失败: {str(e)}")
+        conn.send((job_uid, success, result))
+
+    SecretFlowConfigurator.release_runtime()
+
+
+class WarmJobHandle:
+    """
+    常驻执行器中的任务句柄，提供与multiprocessing.Process一致的查询接口
+    """
+
+    def __init__(self, worker: "_WarmWorker", job_uid: str):
+        self._worker = worker
+        self.job_uid = job_uid
+        self.exitcode = None
+        self.result = None  # 任务回传的结果摘要
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._worker.process.pid
+
+    @property
+    def sf_cluster_desc(self) -> Dict:
+        """执行器实际使用的集群配置（含分配的端口）"""
+        return self._worker.sf_cluster_desc
+
+    @property
+    def sentinel(self) -> int:
+        """执行器回传结果或退出时变为可读，可用于事件驱动的等待"""
+        return self._worker.conn.fileno()
+
+    def is_alive(self) -> bool:
+        if self.exitcode is None:
+            self._worker.collect()
+        return self.exitcode is None
+
+    def terminate(self):
+        """常驻执行器无法单独中断某个任务，直接结束整个执行器进程"""
+        self._worker.terminate()
+
+    def join(self, timeout: Optional[float] = None):
+        """等待任务结束（不等待执行器进程退出）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.is_alive():
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return
+            self._worker.wait(remaining)
+
+    def close(self):
+        """任务结束已被处理，执行器可以接收下一个任务"""
+        self._worker.release(self)
+
+
+class _WarmWorker:
+    """
+    常驻执行器，持有一个已初始化的SecretFlow运行时
+    """
+
+    def __init__(self, mp_context, fingerprint: str, sf_cluster_desc: Dict, lease_owner: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.sf_cluster_desc = sf_cluster_desc
+        self.lease_owner = lease_owner
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(
+            target=_warm_worker_main, args=(sf_cluster_desc, child_conn)
+        )
+        self.process.start()
+        child_conn.close()
+        self.handle: Optional[WarmJobHandle] = None
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+
+    def is_idle(self) -> bool:
+        return self.handle is None and self.process.is_alive()
+
+    def submit(self, job_uid: str, function, args: List, kwargs: Dict) -> WarmJobHandle:
+        """向执行器派发任务"""
+        with self._lock:
+            self.handle = WarmJobHandle(self, job_uid)
+            # 任务使用执行器预热时的集群配置，指纹一致才能复用运行时
+            kwargs = {**kwargs, "sf_cluster_desc": self.sf_cluster_desc}
+            self.conn.send((job_uid, function, args, kwargs))
+            return self.handle
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待执行器回传结果或退出"""
+        try:
+            self.conn.poll(timeout)
+        except (EOFError, OSError):
+            self.process.join(timeout)
+
+    def collect(self):
+        """读取执行器回传的任务结果，执行器异常退出时将任务标记为失败"""
+        with self._lock:
+            handle = self.handle
+            if handle is None or handle.exitcode is not None:
+                return
+            try:
+                if self.conn.poll():
+                    _, success, handle.result = self.conn.recv()
+                    handle.exitcode = 0 if success else 1
+                    return
+            except (EOFError, OSError):
+                pass
+            if not self.process.is_alive():
+                exit_code = self.process.exitcode
+                handle.exitcode = exit_code if exit_code else 1
+
+    def release(self, handle: WarmJobHandle):
+        """
+        释放已结束的任务
+
+        任务结束后执行器保持占用，直到调用方处理完退出事件，避免结果被提前消费
+        """
+        with self._lock:
+            if self.handle is handle and handle.exitcode is not None:
+                self.handle = None
+                self.last_used = time.time()
+
+    def terminate(self):
+        self.process.terminate()
+
+    def retire(self):
+        """通知执行器释放运行时并退出"""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.conn.close()
+
+
+class SecretFlowExecutorPool:
+    """
+    SecretFlow常驻执行器池
+
+    按sf_cluster_desc指纹复用已初始化的执行器，避免每个任务重复sf.init和构建SPU/HEU，只用于单机模拟模式。
+    启用端口分配时，每个执行器在生命周期内持有自己的SPU端口，相同配置的执行器之间不会冲突
+    """
+
+    def __init__(self, max_size: int, idle_timeout: int, mp_context=None, port_allocator: Optional[PortAllocator] = None):
+        self.mp_context = mp_context or multiprocessing.get_context()
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.port_allocator = port_allocator
+        self._workers: List[_WarmWorker] = []
+        self._starting = 0  # 正在锁外启动的执行器数
+        self._worker_seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, job_uid: str, function, args: List, kwargs: Dict) -> Optional[WarmJobHandle]:
+        """
+        将任务派发到指纹匹配的空闲执行器
+
+        Args:
+            job_uid: 任务唯一标识
+            function: 要执行的函数
+            args: 位置参数
+            kwargs: 关键字参数
+
+        Returns:
+            任务句柄；任务不需要SecretFlow或执行器池已满时返回None，由调用方冷启动
+        """
+        sf_cluster_desc = kwargs.get("sf_cluster_desc")
+        if not isinstance(sf_cluster_desc, dict):
+            return None
+        # 只在单机模拟模式下复用：多参与方时复用要求对端同时有指纹相同、SPU连接状态一致的常驻执行器，
+        # 一方冷启动或回收而另一方复用会导致连接不匹配，双方之间没有协调；且握手时对端端口可能被改写
+        if not is_local_cluster(sf_cluster_desc):
+            return None
+        fingerprint = cluster_fingerprint(sf_cluster_desc)
+
+        with self._lock:
+            self._remove_dead()
+            for worker in self._workers:
+                if worker.fingerprint == fingerprint and worker.is_idle():
+                    logger.info(f"任务 {job_uid} 复用常驻执行器 {worker.process.pid}")
+                    return worker.submit(job_uid, function, args, kwargs)
+
+            if len(self._workers) + self._starting >= self.max_size:
+                idle_workers = [worker for worker in self._workers if worker.is_idle()]
+                if not idle_workers:
+                    return None
+                # 淘汰最久未使用的空闲执行器
+                victim = min(idle_workers, key=lambda worker: worker.last_used)
+                self._workers.remove(victim)
+                self._retire(victim)
+            # 预留名额，在锁外启动进程，不阻塞其他任务的派发和回收
+            self._starting += 1
+            lease_owner = f"executor-{next(self._worker_seq)}" if self.port_allocator is not None else None
+
+        try:
+            if lease_owner is not None:
+                sf_cluster_desc = lease_spu_ports(self.port_allocator, lease_owner, sf_cluster_desc)
+            worker = _WarmWorker(self.mp_context, fingerprint, sf_cluster_desc, lease_owner)
+        except Exception:
+            self._release_ports(lease_owner)
+            with self._lock:
+                self._starting -= 1
+            raise
+        try:
+            # 先派发任务再加入执行器列表，避免被其他任务当作空闲执行器取走
+            handle = worker.submit(job_uid, function, args, kwargs)
+        except Exception:
+            worker.terminate()
+            self._release_ports(lease_owner)
+            with self._lock:
+                self._starting -= 1
+            raise
+        with self._lock:
+            self._starting -= 1
+            self._workers.append(worker)
+            logger.info(f"已创建常驻执行器 {worker.process.pid}，当前数量 {len(self._workers)}")
+        return handle
+
+    def evict_idle(self):
+        """回收空闲时间超过阈值的执行器"""
+        now = time.time()
+        with self._lock:
+            self._remove_dead()
+            for worker in list(self._workers):
+                if worker.is_idle() and now - worker.last_used > self.idle_timeout:
+                    self._workers.remove(worker)
+                    self._retire(worker)
+                    logger.info(f"常驻执行器 {worker.process.pid} 空闲超时，已回收")
+
+    def shutdown(self):
+        """回收全部执行器"""
+        with self._lock:
+            for worker in self._workers:
+                self._retire(worker)
+            self._workers.clear()
+
+    def _remove_dead(self):
+        """移除已退出的执行器"""
+        for worker in list(self._workers):
+            if not worker.process.is_alive():
+                self._workers.remove(worker)
+                self._release_ports(worker.lease_owner)
+
+    def _retire(self, worker: _WarmWorker):
+        """回收执行器并归还其端口"""
+        worker.retire()
+        self._release_ports(worker.lease_owner)
+
+    def _release_ports(self, lease_owner: Optional[str]):
+        if self.port_allocator is not None and lease_owner is not None:
+            self.port_allocator.release(lease_owner)
@@ -0,0 +1,137 @@
+import copy
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from config.env import ExecutorConfig
+from module_admin.service.peer_service import rendezvous
+from module_admin.service.result_cache import ResultCache, resolve_paths
+from module_task.registry import CACHEABLE_OPERATORS, get_operator_name
+from utils.dataset_util import get_load_stats, reset_load_stats
+from utils.table_format_util import FORMAT_EXTENSIONS, get_table_format, is_directory_output
+from utils.log_util import logger
+
+# 回传主进程的结果摘要大小上限，需小于管道缓冲区，任务进程发送时不会阻塞
+RESULT_MAX_BYTES = 16 * 1024
+
+
+def execute_job(job_uid: str, function, args: List, kwargs: Dict):
+    """
+    在任务进程中执行任务：命中结果缓存时直接恢复输出，否则与对端握手后执行算子并写入缓存
+
+    Args:
+        job_uid: 任务唯一标识
+        function: 算子函数
+        args: 位置参数
+        kwargs: 关键字参数
+    """
+    # 常驻进程复用时只统计本任务的数据加载
+    reset_load_stats()
+    output_formats = _output_formats(function, kwargs)
+    cache_entry = _prepare_cache(job_uid, function, kwargs)
+    if cache_entry is not None:
+        cache, key, operator, output_files, manifest = cache_entry
+        if manifest is not None and cache.restore(key, manifest, output_files):
+            logger.info(f"任务 {job_uid} 命中结果缓存 {key}，跳过SecretFlow计算")
+            return {"output_formats": output_formats} if output_formats else None
+
+    if isinstance(kwargs.get("sf_cluster_desc"), dict):
+        kwargs["sf_cluster_desc"] = rendezvous(job_uid, kwargs["sf_cluster_desc"])
+    result = function(*args, **kwargs)
+
+    if cache_entry is not None:
+        try:
+            if cache.store(key, operator, output_files) is not None:
+                logger.info(f"任务 {job_uid} 的结果已写入缓存 {key}")
+        except OSError as e:
+            logger.warning(f"任务 {job_uid} 的结果写入缓存失败: {str(e)}")
+    if output_formats:
+        result = {**(result if isinstance(result, dict) else {}), "output_formats": output_formats}
+    return result
+
+
+def _output_formats(function, kwargs: Dict) -> Optional[Dict[str, str]]:
+    """
+    任务各数据输出的格式，按算子实际写出的路径（替换output_format对应的扩展名后）判断，
+    通过任务状态和完成回调返回，下游按格式读取
+
+    Returns:
+        {参数名或参数名.参与方: csv/parquet/feather}，没有数据输出时返回None
+    """
+    spec = CACHEABLE_OPERATORS.get(get_operator_name(function))
+    sf_node_eval_param = kwargs.get("sf_node_eval_param")
+    if spec is None or not isinstance(sf_node_eval_param, dict):
+        return None
+    table_format = sf_node_eval_param.get("output_format")
+    formats = {}
+    for slot, path in resolve_paths(sf_node_eval_param, spec["outputs"], spec.get("local_data", False), table_format).items():
+        if is_directory_output(path):
+            # 输出目录中的分片按output_format写出，未指定时与输入分片相同
+            if table_format:
+                formats[slot] = table_format
+        elif os.path.splitext(path)[1] in FORMAT_EXTENSIONS.values():
+            formats[slot] = get_table_format(path)
+    return formats or None
+
+
+def _prepare_cache(job_uid: str, function, kwargs: Dict) -> Optional[Tuple]:
+    """
+    计算任务的缓存键并查找缓存
+
+    只有输入文件都能在本机读取时才缓存，对端的输入无法计算内容摘要，不能保证结果一致
+
+    Returns:
+        (cache, key, operator, output_files, manifest)，任务不可缓存时返回None
+    """
+    if not ExecutorConfig.executor_result_cache_enabled:
+        return None
+    operator = get_operator_name(function)
+    spec = CACHEABLE_OPERATORS.get(operator)
+    sf_node_eval_param = kwargs.get("sf_node_eval_param")
+    if spec is None or not isinstance(sf_node_eval_param, dict):
+        return None
+    if any(sf_node_eval_param.get(name) for name in spec.get("bypass", [])):
+        return None
+
+    # 算子可能原地修改参数，缓存使用提交时的参数
+    sf_node_eval_param = copy.deepcopy(sf_node_eval_param)
+    input_files = resolve_paths(sf_node_eval_param, spec["inputs"], spec.get("local_data", False))
+    output_files = resolve_paths(
+        sf_node_eval_param, spec["outputs"], spec.get("local_data", False), sf_node_eval_param.get("output_format")
+    )
+    if not input_files or not output_files or not all(os.path.isfile(path) for path in input_files.values()):
+        return None
+
+    cache = ResultCache(ExecutorConfig.executor_result_cache_dir, ExecutorConfig.executor_result_cache_max_bytes)
+    try:
+        key = cache.make_key(operator, sf_node_eval_param, input_files, spec["inputs"] + spec["outputs"])
+    except OSError as e:
+        logger.warning(f"任务 {job_uid} 计算缓存键失败: {str(e)}")
+        return None
+    return cache, key, operator, output_files, cache.lookup(key)
+
+
+def summarize_result(job_uid: str, result) -> Optional[Dict]:
+    """
+    生成回传主进程的任务结果摘要
+
+    算子返回dict时（例如只求交集大小时的交集行数）作为结果摘要，通过任务状态和完成回调返回；
+    模型、预测结果等其他返回值以及超过大小上限的结果不回传。
+    任务中通过load_dataset加载过数据时，各次加载的耗时和内存附加在dataset_loads中
+
+    Args:
+        job_uid: 任务唯一标识
+        result: 算子返回值
+
+    Returns:
+        可JSON序列化的结果摘要，不回传时返回None
+    """
+    load_stats = get_load_stats()
+    if load_stats:
+        result = {**(result if isinstance(result, dict) else {}), "dataset_loads": load_stats}
+    if not isinstance(result, dict):
+        return None
+    content = json.dumps(result, ensure_ascii=False, default=str)
+    if len(content.encode("utf-8")) > RESULT_MAX_BYTES:
+        logger.warning(f"任务 {job_uid} 的结果摘要超过 {RESULT_MAX_BYTES} 字节，不回传")
+        return None
+    return json.loads(content)
@@ -0,0 +1,69 @@
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import sys
+import threading
+from multiprocessing import spawn
+from typing import Dict, List
+
+__all__ = ["create_mp_context", "run_job"]
+
+# 服务入口模块路径，由服务进程写入环境变量，forkserver启动器进程继承
+LAUNCHER_MAIN_PATH_ENV = "OPERATOR_LAUNCHER_MAIN_PATH"
+
+
+def create_mp_context(start_method: str, preload_modules: List[str]):
+    """
+    创建任务进程的启动上下文
+
+    forkserver模式下由独立的启动器进程预先导入preload_modules，
+    任务进程从启动器fork，既不继承服务进程的线程和状态，也不必重复导入
+
+    :param start_method: 进程启动方式，fork/spawn/forkserver
+    :param preload_modules: forkserver启动器预先导入的模块
+    :return: multiprocessing上下文
+    """
+    mp_context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        main_path = spawn.get_preparation_data("launcher").get("init_main_from_path")
+        if main_path:
+            os.environ[LAUNCHER_MAIN_PATH_ENV] = main_path
+        # 本模块必须第一个导入，先完成入口模块的标记
+        mp_context.set_forkserver_preload([__name__, *preload_modules])
+        # 后台启动启动器进程，预导入的耗时不计入第一个任务
+        threading.Thread(target=multiprocessing.forkserver.ensure_running, daemon=True).start()
+    return mp_context
+
+
+def run_job(job_uid: str, function, args: List, kwargs: Dict, result_conn=None):
+    """
+    任务进程入口：创建新的会话和进程组后执行任务，并通过result_conn回传结果摘要
+
+    任务派生的Ray/SPU子进程都在该进程组内，停止任务时可以按进程组整体终止
+    """
+    os.setsid()
+    # 延迟导入，启动器进程预导入本模块时不加载服务配置
+    from module_admin.service.job_runner import execute_job, summarize_result
+
+    result = execute_job(job_uid, function, args, kwargs)
+    if result_conn is not None:
+        result_conn.send(summarize_result(job_uid, result))
+        result_conn.close()
+    return result
+
+
+def _mark_main_prepared():
+    """
+    在启动器进程中标记服务入口模块已加载
+
+    子进程启动时会按路径重新执行一遍__main__（python app.py时即重新加载整个服务），
+    forkserver本应通过预导入__main__避免，但Python 3.11传递的参数名不匹配导致不生效。
+    任务函数都定义在module_task中，子进程不需要入口模块的内容，这里直接跳过重新执行
+    """
+    main_path = os.environ.get(LAUNCHER_MAIN_PATH_ENV)
+    main_module = sys.modules.get("__main__")
+    if main_path and main_module is not None and getattr(main_module, "__file__", None) is None:
+        main_module.__file__ = main_path
+
+
+_mark_main_prepared()
@@ -0,0 +1,197 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import requests
+from config.env import AppConfig, ExecutorConfig
+from utils.cluster_util import assign_node_ports, get_node_ports, get_spu_nodes, is_local_cluster, split_address
+from utils.log_util import logger
+from utils.port_util import PortAllocator
+
+
+def get_local_party(sf_cluster_desc: Dict) -> Optional[str]:
+    """
+    获取本方参与方名称，配置优先，其次读取sf_init.cluster_config.self_party
+
+    Args:
+        sf_cluster_desc: SecretFlow集群配置
+
+    Returns:
+        本方参与方名称，无法确定时返回None
+    """
+    if ExecutorConfig.executor_party:
+        return ExecutorConfig.executor_party
+    sf_init = (sf_cluster_desc or {}).get("sf_init") or {}
+    return (sf_init.get("cluster_config") or {}).get("self_party")
+
+
+def get_peer_operators(sf_cluster_desc: Dict) -> Dict[str, str]:
+    """
+    从cluster_def节点推导对端参与方的算子服务地址
+
+    Args:
+        sf_cluster_desc: SecretFlow集群配置
+
+    Returns:
+        对端参与方到算子服务地址的映射；单机模拟（sf_init.address为local）或无法确定本方时为空
+    """
+    if is_local_cluster(sf_cluster_desc):
+        return {}
+    local_party = get_local_party(sf_cluster_desc)
+    if not local_party:
+        logger.warning("无法确定本方参与方，跳过对端取消")
+        return {}
+
+    peers = {}
+    for node in get_spu_nodes(sf_cluster_desc):
+        party = node.get("party")
+        if not party or party == local_party or party in peers:
+            continue
+        if party in ExecutorConfig.executor_peer_operators:
+            peers[party] = ExecutorConfig.executor_peer_operators[party].rstrip("/")
+        elif node.get("address"):
+            host, _ = split_address(node["address"])
+            peers[party] = f"http://{host}:{ExecutorConfig.executor_peer_port}"
+    return peers
+
+
+def lease_spu_ports(port_allocator: PortAllocator, owner: str, sf_cluster_desc: Dict, block: int = 1) -> Dict:
+    """
+    为在本机监听的SPU节点分配端口，并改写集群配置
+
+    单机模拟模式下全部节点都在本机；多参与方模式下只改写本方节点，
+    对端节点的端口在握手时交换，因此未启用握手时不改写
+
+    Args:
+        port_allocator: 端口分配器
+        owner: 租约持有者
+        sf_cluster_desc: SecretFlow集群配置
+        block: 每个节点占用的连续端口数，节点端口改写为其中的第一个
+
+    Returns:
+        改写端口后的集群配置，不需要分配时原样返回
+    """
+    node_ports = get_node_ports(sf_cluster_desc)
+    if is_local_cluster(sf_cluster_desc):
+        parties = list(node_ports.keys())
+    elif ExecutorConfig.executor_rendezvous_enabled and get_local_party(sf_cluster_desc) in node_ports:
+        parties = [get_local_party(sf_cluster_desc)]
+    else:
+        return sf_cluster_desc
+    if not parties:
+        return sf_cluster_desc
+
+    ports = port_allocator.lease(owner, len(parties), block)
+    logger.info(f"{owner} 分配SPU端口: {dict(zip(parties, ports))}")
+    return assign_node_ports(sf_cluster_desc, dict(zip(parties, ports)))
+
+
+class PeerCancelClient:
+    """
+    对端取消通知
+
+    本方停止SecretFlow任务时通知其他参与方的算子服务停止同一任务，
+    避免对端等待link_desc中的连接重试和接收超时（最长可达20分钟）后才失败
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def cancel(self, job_uid: str, sf_cluster_desc: Dict) -> Dict[str, bool]:
+        """
+        并发通知全部对端停止任务
+
+        对端收到的请求不再向外传播，避免参与方之间相互循环取消
+
+        Args:
+            job_uid: 任务唯一标识
+            sf_cluster_desc: SecretFlow集群配置
+
+        Returns:
+            对端参与方与是否通知成功的映射
+        """
+        peers = get_peer_operators(sf_cluster_desc)
+        if not peers:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(peers)) as executor:
+            results = executor.map(lambda url: self._send_cancel(url, job_uid), peers.values())
+            return dict(zip(peers.keys(), results))
+
+    def _send_cancel(self, operator_url: str, job_uid: str) -> bool:
+        try:
+            response = self._session.post(
+                f"{operator_url}/operator/stop_job",
+                params={"job_uids": job_uid, "propagate": "false"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            logger.info(f"已通知对端 {operator_url} 停止任务 {job_uid}")
+            return True
+        except requests.RequestException as e:
+            logger.error(f"通知对端 {operator_url} 停止任务 {job_uid} 失败: {str(e)}")
+            return False
+
+
+def rendezvous(job_uid: str, sf_cluster_desc: Dict) -> Dict:
+    """
+    构建SPU前与对端参与方握手，在任务进程中调用
+
+    向全部参与方的算子服务登记本方就绪及本方SPU端口，再在本方算子服务上长轮询等待全部参与方就绪；
+    登记失败的对端在每轮等待前重试。对端可能在动态分配的端口上监听，没有拿到对端端口时无法连接，超时后任务失败
+
+    Args:
+        job_uid: 任务唯一标识
+        sf_cluster_desc: SecretFlow集群配置
+
+    Returns:
+        按对端登记的端口改写后的集群配置；不需要握手时原样返回
+
+    Raises:
+        TimeoutError: 超时仍未等到全部参与方就绪
+    """
+    if not ExecutorConfig.executor_rendezvous_enabled:
+        return sf_cluster_desc
+    peers = get_peer_operators(sf_cluster_desc)
+    if not peers:
+        return sf_cluster_desc
+
+    local_party = get_local_party(sf_cluster_desc)
+    local_port = get_node_ports(sf_cluster_desc).get(local_party)
+    local_operator = f"http://127.0.0.1:{AppConfig.app_port}"
+    parties = [local_party, *peers.keys()]
+    pending = {local_party: local_operator, **peers}
+    deadline = time.time() + ExecutorConfig.executor_rendezvous_timeout
+
+    with requests.Session() as session:
+        while True:
+            for party, operator_url in list(pending.items()):
+                try:
+                    session.post(
+                        f"{operator_url}/operator/rendezvous/arrive",
+                        params={"job_uid": job_uid, "party": local_party, "port": local_port},
+                        timeout=ExecutorConfig.executor_peer_cancel_timeout,
+                    ).raise_for_status()
+                    del pending[party]
+                except requests.RequestException as e:
+                    logger.warning(f"任务 {job_uid} 向 {operator_url} 登记就绪失败: {str(e)}")
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError(f"任务 {job_uid} 等待对端就绪超时（{ExecutorConfig.executor_rendezvous_timeout}秒），未获取对端的SPU端口")
+            # 单次长轮询不超过10秒，以便重试登记失败的对端
+            poll_timeout = min(remaining, 10)
+            try:
+                response = session.get(
+                    f"{local_operator}/operator/rendezvous/wait",
+                    params={"job_uid": job_uid, "party": local_party, "parties": parties, "timeout": poll_timeout},
+                    timeout=poll_timeout + ExecutorConfig.executor_peer_cancel_timeout,
+                )
+                response.raise_for_status()
+                data = response.json()["data"]
+                if data["ready"]:
+                    # 使用对端实际监听的端口（对端可能动态分配了端口）
+                    peer_ports = {party: port for party, port in (data.get("ports") or {}).items() if party != local_party}
+                    return assign_node_ports(sf_cluster_desc, peer_ports)
+            except (requests.RequestException, KeyError, ValueError) as e:
+                logger.warning(f"任务 {job_uid} 等待对端就绪失败: {str(e)}")
+                time.sleep(min(1, max(deadline - time.time(), 0)))
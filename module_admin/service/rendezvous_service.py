@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from utils.log_util import logger
+
+
+class RendezvousRegistry:
+    """
+    跨参与方的任务就绪登记
+
+    各参与方的任务进程在构建SPU前向所有参与方的算子服务登记就绪，
+    再在本方算子服务上等待全部参与方就绪，从而同时开始建立SPU连接，
+    不再依赖brpc的连接重试来吸收各方/add_job调用的时间差。
+    等待在事件循环中异步进行，长轮询不占用线程池
+    """
+
+    def __init__(self, ttl: int = 3600):
+        self.ttl = ttl
+        self._rendezvous: Dict[str, Dict] = {}
+        # 等待中的长轮询 {job_uid: [(事件循环, 事件)]}，有参与方登记时唤醒
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def arrive(self, job_uid: str, party: str, port: Optional[int] = None):
+        """
+        登记参与方就绪
+
+        Args:
+            job_uid: 任务唯一标识
+            party: 就绪的参与方
+            port: 该参与方SPU节点实际监听的端口
+        """
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._rendezvous.setdefault(
+                job_uid, {"arrivals": {}, "ports": {}, "created": now, "wait_ms": None}
+            )
+            entry["arrivals"].setdefault(party, now)
+            if port is not None:
+                entry["ports"][party] = port
+            waiters = self._waiters.pop(job_uid, [])
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+        logger.info(f"任务 {job_uid} 参与方 {party} 已就绪")
+
+    async def wait(self, job_uid: str, local_party: str, parties: List[str], timeout: float) -> bool:
+        """
+        等待全部参与方就绪
+
+        Args:
+            job_uid: 任务唯一标识
+            local_party: 本方参与方，用于计算本方的等待时间
+            parties: 需要就绪的参与方列表
+            timeout: 本次等待的超时时间（秒）
+
+        Returns:
+            全部参与方是否已就绪
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            event = asyncio.Event()
+            with self._lock:
+                if self._is_ready(job_uid, local_party, parties):
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                self._waiters.setdefault(job_uid, []).append((loop, event))
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(job_uid, [])
+                    if (loop, event) in waiters:
+                        waiters.remove((loop, event))
+                    if not waiters:
+                        self._waiters.pop(job_uid, None)
+
+    def _is_ready(self, job_uid: str, local_party: str, parties: List[str]) -> bool:
+        """全部参与方是否已登记，首次就绪时记录本方的等待时间"""
+        entry = self._rendezvous.get(job_uid)
+        arrivals = entry["arrivals"] if entry else {}
+        if not all(party in arrivals for party in parties):
+            return False
+        if entry["wait_ms"] is None and local_party in arrivals:
+            ready_time = max(arrivals[party] for party in parties)
+            entry["wait_ms"] = round((ready_time - arrivals[local_party]) * 1000, 3)
+        return True
+
+    def get_wait_ms(self, job_uid: str) -> Optional[float]:
+        """获取本方从就绪到全部参与方就绪的等待时间（毫秒），尚未完成时返回None"""
+        with self._lock:
+            entry = self._rendezvous.get(job_uid)
+            return entry["wait_ms"] if entry else None
+
+    def get_ports(self, job_uid: str) -> Dict[str, int]:
+        """获取各参与方登记的SPU端口"""
+        with self._lock:
+            entry = self._rendezvous.get(job_uid)
+            return dict(entry["ports"]) if entry else {}
+
+    def discard(self, job_uid: str):
+        """任务结束后清除登记"""
+        with self._lock:
+            self._rendezvous.pop(job_uid, None)
+
+    def _purge_expired(self, now: float):
+        """清除长时间未完成的登记，例如对端登记后本方从未启动的任务"""
+        for job_uid in [job_uid for job_uid, entry in self._rendezvous.items() if now - entry["created"] > self.ttl]:
+            del self._rendezvous[job_uid]
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional
+from utils.log_util import logger
+from utils.path_util import get_local_data_path
+from utils.table_format_util import with_format_extension
+
+MANIFEST_NAME = "manifest.json"
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件内容的sha256摘要
+
+    Args:
+        path: 文件路径
+        chunk_size: 分块读取大小
+
+    Returns:
+        十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def count_rows(path: str) -> Optional[int]:
+    """统计csv文件的数据行数（不含表头），非csv文件返回None"""
+    if not path.endswith(".csv"):
+        return None
+    lines, last = 0, b""
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    # 最后一行没有换行符
+    if last and last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def resolve_paths(sf_node_eval_param: Dict, param_names, local_data: bool = False, table_format: Optional[str] = None) -> Dict[str, str]:
+    """
+    展开参数中的文件路径
+
+    Args:
+        sf_node_eval_param: 节点评估参数
+        param_names: 路径参数名列表，参数值为路径或{参与方: 路径}
+        local_data: 路径是否为local_data/<参与方>/下的文件名
+        table_format: 算子的output_format参数，指定时文件的扩展名替换为该格式的扩展名（与算子一致）
+
+    Returns:
+        {参数名或参数名.参与方: 文件路径}
+    """
+    paths = {}
+    for name in param_names:
+        value = sf_node_eval_param.get(name)
+        if isinstance(value, dict):
+            for party, path in value.items():
+                if local_data:
+                    path = os.path.join(get_local_data_path(), party, path)
+                paths[f"{name}.{party}"] = with_format_extension(path, table_format)
+        elif value:
+            paths[name] = with_format_extension(value, table_format)
+    return paths
+
+
+class ResultCache:
+    """
+    内容寻址的任务结果缓存
+
+    缓存键由算子名称、去除路径后的规范化参数和输入文件内容摘要计算，
+    相同输入重复提交时直接恢复输出文件，不再启动SecretFlow。
+    每个条目为一个目录，包含输出文件和清单（路径、行数、校验和），按最近访问时间在容量上限内淘汰
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def make_key(self, operator: str, sf_node_eval_param: Dict, input_files: Dict[str, str], path_params) -> str:
+        """
+        计算缓存键
+
+        Args:
+            operator: 算子名称
+            sf_node_eval_param: 节点评估参数
+            input_files: {参数位置: 输入文件路径}
+            path_params: 输入/输出路径参数名，不参与参数摘要（输入以内容摘要代替）
+
+        Returns:
+            缓存键
+        """
+        params = {key: value for key, value in sf_node_eval_param.items() if key not in path_params}
+        content = json.dumps(
+            {
+                "operator": operator,
+                "params": params,
+                "inputs": {slot: file_digest(path) for slot, path in input_files.items()},
+            },
+            sort_keys=True,
+            ensure_ascii=True,
+            default=str,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        查找缓存条目，命中时刷新最近访问时间
+
+        Returns:
+            条目清单，未命中或条目不完整时返回None
+        """
+        entry_dir = os.path.join(self.root, key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            for output in manifest["outputs"].values():
+                if os.path.getsize(os.path.join(entry_dir, output["file"])) != output["size"]:
+                    return None
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return manifest
+
+    def restore(self, key: str, manifest: Dict, output_files: Dict[str, str]) -> bool:
+        """
+        将缓存的输出文件复制到本次任务的输出路径
+
+        Args:
+            key: 缓存键
+            manifest: 条目清单
+            output_files: {参数位置: 本次任务的输出路径}
+
+        Returns:
+            是否全部恢复成功
+        """
+        if set(output_files) != set(manifest["outputs"]):
+            return False
+        entry_dir = os.path.join(self.root, key)
+        try:
+            for slot, path in output_files.items():
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                shutil.copyfile(os.path.join(entry_dir, manifest["outputs"][slot]["file"]), temp_path)
+                os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"恢复缓存结果 {key} 失败: {str(e)}")
+            return False
+        return True
+
+    def store(self, key: str, operator: str, output_files: Dict[str, str]) -> Optional[Dict]:
+        """
+        保存任务输出文件，写入完成后原子地发布条目，并按容量上限淘汰旧条目
+
+        Args:
+            key: 缓存键
+            operator: 算子名称
+            output_files: {参数位置: 输出文件路径}
+
+        Returns:
+            条目清单，输出文件缺失时返回None
+        """
+        if not all(os.path.isfile(path) for path in output_files.values()):
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        temp_dir = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(temp_dir)
+        try:
+            outputs = {}
+            for index, (slot, path) in enumerate(sorted(output_files.items())):
+                file_name = f"{index}{os.path.splitext(path)[1]}"
+                shutil.copyfile(path, os.path.join(temp_dir, file_name))
+                outputs[slot] = {
+                    "file": file_name,
+                    "path": path,
+                    "size": os.path.getsize(path),
+                    "rows": count_rows(path),
+                    "sha256": file_digest(path),
+                }
+            manifest = {"key": key, "operator": operator, "created": time.time(), "outputs": outputs}
+            with open(os.path.join(temp_dir, MANIFEST_NAME), "w", encoding="utf-8") as file:
+                json.dump(manifest, file, ensure_ascii=False, indent=2)
+            try:
+                os.rename(temp_dir, os.path.join(self.root, key))
+            except OSError:
+                # 其他任务已写入相同的条目
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        self.evict()
+        return manifest
+
+    def evict(self):
+        """按最近访问时间淘汰条目，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+            if name.startswith(".") or not os.path.isfile(manifest_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            entries.append((os.path.getmtime(manifest_path), size, entry_dir))
+            total += size
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            logger.info(f"结果缓存条目 {os.path.basename(entry_dir)} 已淘汰")
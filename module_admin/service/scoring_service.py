@@ -0,0 +1,393 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from module_admin.service.peer_service import lease_spu_ports
+from utils.cluster_util import cluster_fingerprint, is_local_cluster
+from utils.log_util import logger
+from utils.port_util import PortAllocator
+
+# 常驻模型的键：(模型文件, 模型版本, 标签列)
+ModelKey = Tuple[str, str, str]
+
+
+def _scoring_worker_main(sf_cluster_desc: Dict, max_models: int, conn):
+    """
+    评分进程入口：初始化SecretFlow运行时后循环处理微批，已加载的模型按LRU常驻
+
+    Args:
+        sf_cluster_desc: SecretFlow集群配置
+        max_models: 常驻的模型数上限
+        conn: 与主进程通信的管道，收到(model_key, frames)，回传(是否成功, 预测结果或错误信息)
+    """
+    # 独立进程组，回收时连同Ray/SPU子进程一起终止
+    os.setsid()
+    # 延迟导入，避免主进程加载secretflow
+    from utils.sf_init import SecretFlowConfigurator
+    from module_task.ss_xgb import load_model, predict_frames
+
+    SecretFlowConfigurator.enable_reuse()
+    sf_config = SecretFlowConfigurator(**sf_cluster_desc)
+    models: "OrderedDict[ModelKey, Any]" = OrderedDict()
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        model_key, frames = message
+        try:
+            model = models.get(model_key)
+            if model is None:
+                model_path, _, label_col = model_key
+                model = load_model(sf_config.spu, model_path, label_col)
+                # 同一模型文件的旧版本不会再被使用
+                for key in [key for key in models if key[0] == model_path]:
+                    del models[key]
+                models[model_key] = model
+                while len(models) > max_models:
+                    models.popitem(last=False)
+                logger.info(f"评分进程已加载模型 {model_path}，当前常驻 {len(models)} 个")
+            models.move_to_end(model_key)
+            conn.send((True, predict_frames(sf_config, model, frames)))
+        except Exception as e:
+            logger.error(f"评分进程预测失败: {str(e)}")
+            conn.send((False, str(e)))
+
+    SecretFlowConfigurator.release_runtime()
+
+
+class _ScoringRequest:
+    """等待进入微批的评分请求"""
+
+    def __init__(self, model_key: ModelKey, frames: Dict[str, pd.DataFrame], rows: int):
+        self.model_key = model_key
+        self.frames = frames
+        self.rows = rows
+        self.future: Future = Future()
+
+
+class _ScoringSession:
+    """
+    一个集群配置对应的常驻评分进程，以及把并发请求合并为微批的线程
+    """
+
+    def __init__(self, service: "ScoringService", fingerprint: str, sf_cluster_desc: Dict, lease_owner: Optional[str] = None):
+        self.service = service
+        self.fingerprint = fingerprint
+        self.lease_owner = lease_owner
+        self.conn, child_conn = service.mp_context.Pipe()
+        self.process = service.mp_context.Process(
+            target=service.worker_main, args=(sf_cluster_desc, service.max_models, child_conn)
+        )
+        self.process.start()
+        child_conn.close()
+        self.last_used = time.time()
+        self.batches = 0
+        self.requests = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False  # 会话线程已停止收取请求，在服务锁内设置
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return not self._closed and self.process.is_alive() and self._thread.is_alive()
+
+    def submit(self, request: _ScoringRequest):
+        """提交请求，调用方需持有服务锁，保证请求排在回收标记之前"""
+        self.last_used = time.time()
+        self._queue.put(request)
+
+    def retire(self):
+        """处理完已提交的请求后通知评分进程释放运行时并退出，进程退出后归还端口"""
+        self._queue.put(None)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # 在时间窗口内继续收集，合并并发的请求
+            batch = [item]
+            rows = item.rows
+            deadline = time.monotonic() + self.service.batch_window
+            while rows < self.service.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += item.rows
+
+            # 同一模型且参与方相同的请求才能拼接
+            grouped: Dict[Tuple, List[_ScoringRequest]] = {}
+            for request in batch:
+                grouped.setdefault((request.model_key, tuple(request.frames)), []).append(request)
+            for requests in grouped.values():
+                if not self._predict(requests):
+                    stopping = True
+                    break
+
+        # 标记关闭后服务不再向本会话提交请求，此后清空队列不会遗漏请求
+        with self.service._lock:
+            self._closed = True
+        self._fail_pending(RuntimeError("评分进程已退出"))
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.conn.close()
+        # 评分进程退出后才归还端口，此前端口仍被其SPU占用
+        self.process.join(self.service.exit_timeout)
+        if self.process.is_alive():
+            self._kill()
+            self.process.join()
+        self.service._release_ports(self.lease_owner)
+
+    def _kill(self):
+        """结束评分进程所在的进程组（含Ray/SPU子进程）"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+
+    def _predict(self, requests: List[_ScoringRequest]) -> bool:
+        """
+        将同一模型的请求拼接为一个微批预测，再按请求拆分结果
+
+        Returns:
+            评分进程是否仍然可用
+        """
+        try:
+            frames = {
+                party: pd.concat([request.frames[party] for request in requests], ignore_index=True)
+                for party in requests[0].frames
+            }
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return True
+        try:
+            self.conn.send((requests[0].model_key, frames))
+            # 预测卡住时结束评分进程，避免之后的请求全部在队列中超时
+            if not self.conn.poll(self.service.predict_timeout):
+                self._kill()
+                for request in requests:
+                    request.future.set_exception(TimeoutError(f"评分进程 {self.process.pid} 预测超时，已结束"))
+                return False
+            success, payload = self.conn.recv()
+        except (EOFError, OSError) as e:
+            for request in requests:
+                request.future.set_exception(RuntimeError(f"评分进程异常退出: {str(e)}"))
+            return False
+
+        self.batches += 1
+        self.requests += len(requests)
+        self.last_used = time.time()
+        if not success:
+            for request in requests:
+                request.future.set_exception(RuntimeError(payload))
+            return True
+        offsets = np.cumsum([0] + [request.rows for request in requests])
+        for request, start, end in zip(requests, offsets[:-1], offsets[1:]):
+            request.future.set_result({
+                "predictions": payload[start:end].tolist(),
+                "batch_requests": len(requests),
+            })
+        return True
+
+    def _fail_pending(self, error: Exception):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and not item.future.done():
+                item.future.set_exception(error)
+
+
+class ScoringService:
+    """
+    SS-XGB常驻评分服务
+
+    每个集群配置对应一个常驻评分进程，进程内保留已初始化的SecretFlow运行时和按LRU常驻的模型，
+    模型按(模型文件, 版本, 标签列)区分，模型文件更新后自动加载新版本。
+    并发的评分请求在时间窗口内合并为微批，一次经SPU预测后再按请求拆分结果。
+    只支持单机模拟集群：多参与方模式下各方需要以相同的微批同时调用，无法在一方独立合并
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        max_models: int,
+        batch_window_ms: int,
+        max_batch_rows: int,
+        idle_timeout: int,
+        mp_context=None,
+        port_allocator: Optional[PortAllocator] = None,
+        worker_main=_scoring_worker_main,
+        predict_timeout: Optional[float] = None,
+        exit_timeout: float = 30,
+    ):
+        self.mp_context = mp_context or multiprocessing.get_context()
+        self.max_sessions = max(max_sessions, 1)
+        self.max_models = max(max_models, 1)
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_rows = max(max_batch_rows, 1)
+        self.idle_timeout = idle_timeout
+        self.port_allocator = port_allocator
+        self.worker_main = worker_main
+        self.predict_timeout = predict_timeout  # 单个微批的预测超时，超时后结束评分进程
+        self.exit_timeout = exit_timeout  # 回收时等待评分进程退出的时间，超时后强制结束
+        self._sessions: Dict[str, _ScoringSession] = {}
+        self._session_seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def score(
+        self,
+        sf_cluster_desc: Dict,
+        model_path: str,
+        features: Dict[str, List[Dict]],
+        model_version: Optional[str] = None,
+        label_col: str = "",
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        提交评分请求并等待所在微批完成
+
+        Args:
+            sf_cluster_desc: SecretFlow集群配置（单机模拟模式）
+            model_path: 模型文件
+            features: {参与方名称: 该方的特征行列表}，各方行数相同且按行对齐
+            model_version: 模型版本，为空时由模型文件的大小和修改时间决定
+            label_col: 标签列
+            timeout: 等待超时时间（秒）
+
+        Returns:
+            {"predictions": 预测结果, "batch_requests": 所在微批合并的请求数}
+        """
+        if not is_local_cluster(sf_cluster_desc):
+            raise ValueError("评分服务只支持单机模拟集群（sf_init.address为local）")
+        parties = sf_cluster_desc.get("sf_init", {}).get("parties", [])
+        unknown = [party for party in features if party not in parties]
+        if not features or unknown:
+            raise ValueError(f"features必须为集群参与方的特征: {unknown or parties}")
+        rows = {party: len(records) for party, records in features.items()}
+        if len(set(rows.values())) != 1:
+            raise ValueError(f"各参与方的特征行数不一致: {rows}")
+        if model_version is None:
+            stat = os.stat(model_path)
+            model_version = f"{stat.st_size}-{stat.st_mtime_ns}"
+
+        frames = {party: pd.DataFrame.from_records(records) for party, records in features.items()}
+        request = _ScoringRequest((model_path, model_version, label_col), frames, next(iter(rows.values())))
+        self._submit(sf_cluster_desc, request)
+        return request.future.result(timeout)
+
+    def get_status(self) -> List[Dict]:
+        """
+        获取各评分进程的状态
+
+        Returns:
+            [{"pid", "fingerprint", "batches": 已执行的微批数, "requests": 已处理的请求数, "idle_seconds"}]
+        """
+        now = time.time()
+        with self._lock:
+            self._remove_dead()
+            return [
+                {
+                    "pid": session.process.pid,
+                    "fingerprint": fingerprint,
+                    "batches": session.batches,
+                    "requests": session.requests,
+                    "idle_seconds": round(now - session.last_used, 3),
+                }
+                for fingerprint, session in self._sessions.items()
+            ]
+
+    def evict_idle(self):
+        """回收空闲时间超过阈值的评分进程"""
+        now = time.time()
+        with self._lock:
+            self._remove_dead()
+            for fingerprint, session in list(self._sessions.items()):
+                if now - session.last_used > self.idle_timeout:
+                    del self._sessions[fingerprint]
+                    self._retire(session)
+                    logger.info(f"评分进程 {session.process.pid} 空闲超时，已回收")
+
+    def shutdown(self):
+        """回收全部评分进程"""
+        with self._lock:
+            for session in self._sessions.values():
+                self._retire(session)
+            self._sessions.clear()
+
+    def _submit(self, sf_cluster_desc: Dict, request: _ScoringRequest):
+        """
+        将请求提交到集群配置对应的评分进程
+
+        查找评分进程与提交请求在同一把锁内完成，回收只能发生在提交之前或之后：
+        之前回收时会创建新的评分进程，之后回收时请求排在回收标记之前，仍会被处理
+        """
+        with self._lock:
+            self._get_session(sf_cluster_desc).submit(request)
+
+    def _get_session(self, sf_cluster_desc: Dict) -> _ScoringSession:
+        """获取集群配置对应的评分进程，不存在时创建，数量超过上限时淘汰最久未使用的进程，调用方需持有锁"""
+        fingerprint = cluster_fingerprint(sf_cluster_desc)
+        self._remove_dead()
+        session = self._sessions.get(fingerprint)
+        if session is not None:
+            return session
+
+        if len(self._sessions) >= self.max_sessions:
+            victim = min(self._sessions, key=lambda key: self._sessions[key].last_used)
+            self._retire(self._sessions.pop(victim))
+
+        lease_owner = None
+        if self.port_allocator is not None:
+            lease_owner = f"scoring-{next(self._session_seq)}"
+            sf_cluster_desc = lease_spu_ports(self.port_allocator, lease_owner, sf_cluster_desc)
+        try:
+            session = _ScoringSession(self, fingerprint, sf_cluster_desc, lease_owner)
+        except Exception:
+            self._release_ports(lease_owner)
+            raise
+        self._sessions[fingerprint] = session
+        logger.info(f"已创建评分进程 {session.process.pid}，当前数量 {len(self._sessions)}")
+        return session
+
+    def _remove_dead(self):
+        """移除已退出的评分进程"""
+        for fingerprint, session in list(self._sessions.items()):
+            if not session.is_alive():
+                del self._sessions[fingerprint]
+                self._retire(session)
+
+    def _retire(self, session: _ScoringSession):
+        """回收评分进程，端口在进程退出后由会话线程归还"""
+        session.retire()
+
+    def _release_ports(self, lease_owner: Optional[str]):
+        if self.port_allocator is not None and lease_owner is not None:
+            self.port_allocator.release(lease_owner)
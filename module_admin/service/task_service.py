@@ -1,13 +1,27 @@
 import os
 import signal
+import selectors
+import heapq
+import itertools
 import multiprocessing
+import psutil
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
 # import json
-import requests
 import threading
 import time
 from utils.log_util import logger
-from config.env import DAGSchedulerConfig
+from config.env import DAGSchedulerConfig, ExecutorConfig
+from module_admin.service.executor_pool import SecretFlowExecutorPool
+from module_admin.service.callback_dispatcher import CallbackDispatcher
+from module_admin.service.launcher import create_mp_context, run_job
+from module_admin.service.peer_service import PeerCancelClient, get_local_party, lease_spu_ports
+from module_admin.service.rendezvous_service import RendezvousRegistry
+from module_admin.service.scoring_service import ScoringService
+from concurrent.futures import ThreadPoolExecutor
+from utils.cluster_util import get_listen_ports, is_local_cluster
+from utils.csv_shard_util import get_shard_count
+from utils.port_util import PortAllocator, wait_ports_released
 
 DAGHttp = f"http://{DAGSchedulerConfig.dag_scheduler_host}:{DAGSchedulerConfig.dag_scheduler_port}"
 
@@ -17,9 +31,26 @@ class ProcessManager:
     """
     _instance = None
     _running_processes = {}
+    _queued_jobs = {}  # 准入队列中等待启动的任务
+    _pending_jobs = []  # 准入队列的堆，元素为(-priority, 提交序号, job_uid)
+    _submit_seq = itertools.count()  # 提交序号，同优先级按先进先出排序
+    _launching_jobs = {}  # 已出队、正在启动进程的任务
+    _finished_jobs = OrderedDict()  # 最近结束的任务，保留状态和结果摘要
     _monitor_thread = None
     _monitor_running = False
+    _executor_pool = None
+    _scoring_service = None  # SS-XGB常驻评分服务
+    _port_allocator = None  # SPU端口分配器
+    _callback_dispatcher = None
+    _peer_cancel_client = None  # 停止任务时通知对端参与方
+    rendezvous_registry = RendezvousRegistry()  # 跨参与方的任务就绪登记
+    _mp_context = None  # 任务进程的启动上下文（fork/spawn/forkserver）
+    _selector = None  # 等待进程sentinel的多路复用器，启动监控线程时创建
+    _wakeup_reader = _wakeup_writer = None  # 用于唤醒阻塞在select上的监控线程的管道，与_selector一同创建
+    _housekeeping_interval = 5  # 周期性维护（如回收空闲执行器）的间隔（单位：秒）
     _lock = threading.RLock()  # 添加线程锁以保证线程安全
+    _launch_condition = threading.Condition(_lock)  # 有新任务或空闲名额时唤醒启动线程
+    _launcher_thread = None
     complated_url = f"{DAGHttp}/scheduler/job_completed"
     stop_url = f"{DAGHttp}/scheduler/task/stop"
 
@@ -39,57 +70,196 @@ class ProcessManager:
     
     def initialize(self):
         """显式初始化方法，只在服务器进程中调用"""
+        self._init_mp_context()
+        if ExecutorConfig.executor_port_allocation_enabled and self._port_allocator is None:
+            self._port_allocator = PortAllocator(
+                ExecutorConfig.executor_port_range_start, ExecutorConfig.executor_port_range_end
+            )
+        if ExecutorConfig.executor_pool_enabled and self._executor_pool is None:
+            self._executor_pool = SecretFlowExecutorPool(
+                max_size=ExecutorConfig.executor_pool_max_size,
+                idle_timeout=ExecutorConfig.executor_pool_idle_timeout,
+                mp_context=self._mp_context,
+                port_allocator=self._port_allocator,
+            )
+        if ExecutorConfig.executor_scoring_enabled and self._scoring_service is None:
+            self._scoring_service = ScoringService(
+                max_sessions=ExecutorConfig.executor_scoring_max_sessions,
+                max_models=ExecutorConfig.executor_scoring_max_models,
+                batch_window_ms=ExecutorConfig.executor_scoring_batch_window_ms,
+                max_batch_rows=ExecutorConfig.executor_scoring_max_batch_rows,
+                idle_timeout=ExecutorConfig.executor_pool_idle_timeout,
+                mp_context=self._mp_context,
+                port_allocator=self._port_allocator,
+                predict_timeout=ExecutorConfig.executor_scoring_timeout,
+            )
+        if self._callback_dispatcher is None:
+            self._callback_dispatcher = CallbackDispatcher(
+                connect_timeout=DAGSchedulerConfig.dag_scheduler_connect_timeout,
+                read_timeout=DAGSchedulerConfig.dag_scheduler_read_timeout,
+                max_retries=DAGSchedulerConfig.dag_scheduler_max_retries,
+                backoff_factor=DAGSchedulerConfig.dag_scheduler_backoff_factor,
+                pool_size=DAGSchedulerConfig.dag_scheduler_pool_size,
+            )
+        self._callback_dispatcher.start()
+        if self._peer_cancel_client is None:
+            self._peer_cancel_client = PeerCancelClient(timeout=ExecutorConfig.executor_peer_cancel_timeout)
         self._start_monitor()
+        self._start_launcher()
+    
+    def _init_mp_context(self):
+        """初始化任务进程的启动上下文"""
+        if self._mp_context is not None:
+            return
+        start_method = ExecutorConfig.executor_start_method
+        self._mp_context = create_mp_context(start_method, ExecutorConfig.executor_preload_modules)
+        logger.info(f"任务进程启动方式: {start_method}")
     
     def _start_monitor(self):
         """启动进程监控线程"""
         if self._monitor_thread is None or not self._monitor_thread.is_alive():
+            with self._lock:
+                # 在服务器进程中才创建，导入模块没有副作用；管道不可继承，spawn/forkserver启动的任务进程不会持有
+                if self._selector is None:
+                    self._selector = selectors.DefaultSelector()
+                    self._wakeup_reader, self._wakeup_writer = os.pipe()
+                    self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
             self._monitor_running = True
             self._monitor_thread = threading.Thread(target=self._monitor_processes, daemon=True)
             self._monitor_thread.start()
             logger.info("进程监控线程已启动")
     
     def _monitor_processes(self):
-        """监控进程状态，清理已结束的进程"""
+        """
+        监控进程状态，清理已结束的进程
+
+        等待所有任务进程的sentinel，进程退出时立即被唤醒处理，
+        单次唤醒只处理就绪的任务，开销与运行中的任务数量无关
+        """
+        last_housekeeping = time.time()
         while self._monitor_running:
             try:
-                # 复制键列表以避免在迭代过程中修改字典
-                with self._lock:
-                    job_uids = list(self._running_processes.keys())
-                
-                for job_uid in job_uids:
+                events = self._selector.select(timeout=self._housekeeping_interval)
+                for key, _ in events:
+                    if key.fileobj == self._wakeup_reader:
+                        # 仅用于打断select，使新注册的进程生效
+                        os.read(self._wakeup_reader, 4096)
+                        continue
                     try:
-                        with self._lock:
-                            if job_uid not in self._running_processes:
-                                continue
-                            
-                            process_info = self._running_processes[job_uid]
-                            process = process_info["process"]
-                            
-                            # 检查进程是否已结束
-                            if not process.is_alive():
-                                # 获取进程退出码（如果可用）
-                                exit_code = process.exitcode
-                                success = True if exit_code == 0 else False
-                                
-                                # 从运行中进程列表中移除
-                                del self._running_processes[job_uid]
-                                
-                                # 发送回调通知
-                                self._send_callback_notification(self.complated_url, job_uid, success)
-                                
-                                logger.info(f"任务 {job_uid} 已结束，已从进程列表中移除")
+                        self._handle_process_exit(key.data)
                     except Exception as e:
-                        logger.error(f"监控任务 {job_uid} 时发生错误: {str(e)}")
+                        logger.error(f"监控任务 {key.data} 时发生错误: {str(e)}")
                 
-                # 每隔一段时间检查一次
-                time.sleep(5)
+                # 回收空闲的常驻执行器和评分进程
+                if time.time() - last_housekeeping >= self._housekeeping_interval:
+                    last_housekeeping = time.time()
+                    if self._executor_pool is not None:
+                        self._executor_pool.evict_idle()
+                    if self._scoring_service is not None:
+                        self._scoring_service.evict_idle()
             except Exception as e:
                 logger.error(f"进程监控线程发生错误: {str(e)}")
     
-    def start_process(self, job_uid: str, function, args: List = None, kwargs: Dict = None, job_info: Any = None) -> Dict:
+    def _watch_process(self, job_uid: str, process):
+        """注册进程sentinel，进程退出时唤醒监控线程；监控线程未启动时不注册"""
+        with self._lock:
+            if self._selector is None:
+                return
+            self._selector.register(process.sentinel, selectors.EVENT_READ, job_uid)
+        os.write(self._wakeup_writer, b"\0")
+    
+    def _unwatch_process(self, process):
+        """注销进程sentinel"""
+        with self._lock:
+            if self._selector is None:
+                return
+            try:
+                self._selector.unregister(process.sentinel)
+            except (KeyError, ValueError):
+                pass
+    
+    def _handle_process_exit(self, job_uid: str):
+        """处理单个任务进程的退出事件"""
+        with self._lock:
+            if job_uid not in self._running_processes:
+                return
+            
+            process_info = self._running_processes[job_uid]
+            process = process_info["process"]
+            
+            # sentinel就绪但任务尚未结束（例如常驻执行器中的残留事件），等待下一次唤醒
+            if process.is_alive():
+                return
+            
+            # 获取进程退出码（如果可用）
+            exit_code = process.exitcode
+            success = True if exit_code == 0 else False
+            result = self._read_job_result(process_info)
+            
+            # 从运行中进程列表中移除
+            del self._running_processes[job_uid]
+            self._unwatch_process(process)
+            self._release_process(process)
+            self._record_finished_job(job_uid, "completed" if success else "failed", exit_code, result)
+        rendezvous_wait_ms = self.rendezvous_registry.get_wait_ms(job_uid)
+        self.rendezvous_registry.discard(job_uid)
+        self._release_job_ports(job_uid)
+        
+        # 发送回调通知（在锁外入队，不阻塞其他任务的状态查询和启动）
+        self._send_callback_notification(self.complated_url, job_uid, success, result)
+        
+        logger.info(f"任务 {job_uid} 已结束，已从进程列表中移除，对端握手等待 {rendezvous_wait_ms}ms")
+        
+        # 释放出并发名额后启动排队中的任务
+        self._admit_pending_jobs()
+    
+    @staticmethod
+    def _read_job_result(process_info: Dict) -> Optional[Dict]:
+        """读取任务进程回传的结果摘要，任务失败时没有结果；常驻执行器的结果由任务句柄收取"""
+        result_conn = process_info.get("result_conn")
+        if result_conn is None:
+            return getattr(process_info["process"], "result", None)
+        try:
+            if result_conn.poll():
+                return result_conn.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            result_conn.close()
+        return None
+    
+    @staticmethod
+    def _close_result_conn(process_info: Dict):
+        """任务被停止时不读取结果，直接关闭结果管道"""
+        result_conn = process_info.get("result_conn")
+        if result_conn is not None:
+            result_conn.close()
+    
+    def _record_finished_job(self, job_uid: str, status: str, exit_code: Optional[int], result: Optional[Dict]):
+        """记录结束的任务，超过保留数量时丢弃最早结束的任务"""
+        with self._lock:
+            self._finished_jobs.pop(job_uid, None)
+            self._finished_jobs[job_uid] = {
+                "status": status,
+                "exit_code": exit_code,
+                "end_time": time.time(),
+                "result": result,
+            }
+            while len(self._finished_jobs) > max(ExecutorConfig.executor_finished_jobs_max, 0):
+                self._finished_jobs.popitem(last=False)
+    
+    @staticmethod
+    def _release_process(process):
+        """释放进程对象持有的资源，常驻执行器的任务句柄会将执行器归还到池中"""
+        try:
+            process.close()
+        except ValueError:
+            # 进程仍在运行，无法释放
+            pass
+    
+    def start_process(self, job_uid: str, function, args: List = None, kwargs: Dict = None, job_info: Any = None, priority: int = None) -> Dict:
         """
-        启动一个新进程
+        提交任务到准入队列，由启动线程按优先级和并发上限异步启动，调用方不会被进程启动阻塞
         
         Args:
             job_uid: 任务唯一标识
@@ -97,38 +267,209 @@ class ProcessManager:
             args: 位置参数
             kwargs: 关键字参数
             job_info: 任务相关信息
+            priority: 任务优先级，数值越大越先启动，默认取job_info.priority
             
         Returns:
-            进程信息字典
+            排队信息字典
+            
+        Raises:
+            ValueError: 相同job_uid的任务已在排队或运行中
         """
-        if job_uid in self._running_processes:
-            logger.warning(f"任务 {job_uid} 已在运行中")
-            return self._running_processes[job_uid]
-        
         if args is None:
             args = []
         if kwargs is None:
             kwargs = {}
+        if priority is None:
+            priority = getattr(job_info, "priority", None) or 0
+        
+        with self._launch_condition:
+            if self._is_known_job(job_uid):
+                logger.warning(f"任务 {job_uid} 已在运行中")
+                raise ValueError(f"任务 {job_uid} 已在运行中")
+            
+            seq = next(self._submit_seq)
+            queued_info = {
+                "status": "queued",
+                "job": job_info,
+                "priority": priority,
+                "seq": seq,  # 与堆中的条目对应，取消后以相同job_uid重新提交时旧条目不再匹配
+                "enqueue_time": time.time(),
+                "function": function,
+                "args": args,
+                "kwargs": kwargs,
+            }
+            self._queued_jobs[job_uid] = queued_info
+            heapq.heappush(self._pending_jobs, (-priority, seq, job_uid))
+            self._launch_condition.notify()
+        
+        logger.info(f"任务 {job_uid} 已进入准入队列，当前排队数 {len(self._queued_jobs)}")
+        return queued_info
+    
+    def _is_known_job(self, job_uid: str) -> bool:
+        """任务是否已在排队、启动或运行中，调用方需持有锁"""
+        return (
+            job_uid in self._running_processes
+            or job_uid in self._queued_jobs
+            or job_uid in self._launching_jobs
+        )
+    
+    def _has_free_slot(self) -> bool:
+        """是否还有空闲的并发名额，调用方需持有锁"""
+        max_parallelism = ExecutorConfig.executor_max_parallelism
+        if max_parallelism <= 0:
+            return True
+        return len(self._running_processes) + len(self._launching_jobs) < max_parallelism
+    
+    def _start_launcher(self):
+        """启动任务启动线程"""
+        if self._launcher_thread is None or not self._launcher_thread.is_alive():
+            self._launcher_thread = threading.Thread(target=self._launch_pending_jobs, daemon=True)
+            self._launcher_thread.start()
+            logger.info("任务启动线程已启动")
+    
+    def _launch_pending_jobs(self):
+        """有空闲并发名额时，按优先级和提交顺序启动排队中的任务"""
+        while self._monitor_running:
+            with self._launch_condition:
+                while not (self._queued_jobs and self._has_free_slot()):
+                    self._launch_condition.wait()
+                _, seq, job_uid = heapq.heappop(self._pending_jobs)
+                # 已被取消的任务只做了惰性删除，这里跳过；取消后重新提交的任务按新的条目启动
+                queued_info = self._queued_jobs.get(job_uid)
+                if queued_info is None or queued_info["seq"] != seq:
+                    continue
+                del self._queued_jobs[job_uid]
+                queued_info["status"] = "launching"
+                self._launching_jobs[job_uid] = queued_info
             
-        # 创建并启动进程
-        process = multiprocessing.Process(target=function, args=args, kwargs=kwargs)
-        process.start()
+            try:
+                self._launch_process(
+                    job_uid,
+                    queued_info["function"],
+                    queued_info["args"],
+                    queued_info["kwargs"],
+                    queued_info["job"],
+                )
+            except Exception as e:
+                logger.error(f"启动排队任务 {job_uid} 失败: {str(e)}")
+                # 任务已从启动中列表移除，记录失败状态后再回调，状态查询仍能看到该任务
+                result = {"error": f"启动任务进程失败: {str(e)}"}
+                self._record_finished_job(job_uid, "failed", None, result)
+                self._send_callback_notification(self.complated_url, job_uid, False, result)
+    
+    def _admit_pending_jobs(self):
+        """释放并发名额后唤醒启动线程"""
+        with self._launch_condition:
+            self._launch_condition.notify()
+    
+    def _launch_process(self, job_uid: str, function, args: List, kwargs: Dict, job_info: Any) -> Dict:
+        """启动任务进程，调用方需已将任务登记到_launching_jobs"""
+        try:
+            # 优先派发到指纹匹配的常驻执行器，没有可用执行器时冷启动新进程
+            launch_start = time.perf_counter()
+            process = None
+            # 分桶求交需要为每个桶额外占用端口，不使用常驻执行器
+            port_block = self._get_port_block(kwargs)
+            if self._executor_pool is not None and port_block == 1:
+                process = self._executor_pool.submit(job_uid, function, args, kwargs)
+            executor = "warm" if process is not None else "cold"
+            result_conn = None
+            if process is not None:
+                # 常驻执行器使用其自身持有的端口
+                kwargs = {**kwargs, "sf_cluster_desc": process.sf_cluster_desc}
+            else:
+                kwargs = self._lease_job_ports(job_uid, kwargs, port_block)
+                mp_context = self._mp_context or multiprocessing.get_context()
+                # 任务进程通过单向管道回传结果摘要
+                result_conn, child_conn = mp_context.Pipe(duplex=False)
+                process = mp_context.Process(target=run_job, args=(job_uid, function, args, kwargs, child_conn))
+                try:
+                    process.start()
+                finally:
+                    child_conn.close()
+            launch_ms = round((time.perf_counter() - launch_start) * 1000, 3)
+        except Exception:
+            if result_conn is not None:
+                result_conn.close()
+            self._release_job_ports(job_uid)
+            with self._lock:
+                self._launching_jobs.pop(job_uid, None)
+            self._admit_pending_jobs()
+            raise
         
         # 记录进程信息
         process_info = {
             "process": process,
             "pid": process.pid,
+            "executor": executor,
+            "launch_ms": launch_ms,
             "job": job_info,
+            "kwargs": kwargs,
+            "result_conn": result_conn,
             "start_time": multiprocessing.current_process()._config.get('start_time', None)
         }
         
-        # 存储进程信息
+        # 存储进程信息，并注册进程退出事件
         with self._lock:
+            self._launching_jobs.pop(job_uid, None)
             self._running_processes[job_uid] = process_info
+            self._watch_process(job_uid, process)
         
-        logger.info(f"已在进程 {process.pid} 中启动任务 {job_uid}")
+        logger.info(f"已在进程 {process.pid} 中启动任务 {job_uid}，启动耗时 {launch_ms}ms")
         return process_info
     
+    @staticmethod
+    def _local_listen_ports(sf_cluster_desc: Optional[Dict]) -> List[int]:
+        """本方SPU节点监听的端口，单机模拟时为全部节点，无法确定本方时为空"""
+        if not isinstance(sf_cluster_desc, dict):
+            return []
+        if is_local_cluster(sf_cluster_desc):
+            return get_listen_ports(sf_cluster_desc)
+        local_party = get_local_party(sf_cluster_desc)
+        return get_listen_ports(sf_cluster_desc, local_party) if local_party else []
+    
+    @staticmethod
+    def _get_port_block(kwargs: Dict) -> int:
+        """任务每个SPU节点需要的连续端口数，分桶求交时每个桶使用基准端口+桶号"""
+        sf_cluster_desc = kwargs.get("sf_cluster_desc")
+        if not isinstance(sf_cluster_desc, dict):
+            return 1
+        return get_shard_count(kwargs.get("sf_node_eval_param"), is_local_cluster(sf_cluster_desc))
+    
+    def _lease_job_ports(self, job_uid: str, kwargs: Dict, block: int = 1) -> Dict:
+        """为冷启动的任务分配SPU端口，返回改写sf_cluster_desc后的关键字参数"""
+        sf_cluster_desc = kwargs.get("sf_cluster_desc")
+        if self._port_allocator is None or not isinstance(sf_cluster_desc, dict):
+            return kwargs
+        return {**kwargs, "sf_cluster_desc": lease_spu_ports(self._port_allocator, job_uid, sf_cluster_desc, block)}
+    
+    def _release_job_ports(self, job_uid: str):
+        """归还任务的SPU端口"""
+        if self._port_allocator is not None:
+            self._port_allocator.release(job_uid)
+    
+    def get_queue_position(self, job_uid: str) -> Optional[int]:
+        """
+        获取排队中任务的位置
+        
+        Args:
+            job_uid: 任务唯一标识
+            
+        Returns:
+            从1开始的排队位置，任务不在队列中时返回None
+        """
+        with self._lock:
+            if job_uid not in self._queued_jobs:
+                return None
+            pending = sorted(
+                entry for entry in self._pending_jobs
+                if entry[2] in self._queued_jobs and self._queued_jobs[entry[2]]["seq"] == entry[1]
+            )
+        for position, entry in enumerate(pending, start=1):
+            if entry[2] == job_uid:
+                return position
+        return None
+    
     def stop_process(self, job_uid: str, timeout: int = 5) -> bool:
         """
         停止指定的进程
@@ -140,37 +481,157 @@ class ProcessManager:
         Returns:
             是否成功停止进程
         """
+        return self.terminate_job(job_uid, timeout)["success"]
+    
+    def terminate_job(self, job_uid: str, timeout: int = 5, propagate: bool = False) -> Dict:
+        """
+        停止指定的任务，先对整个进程组发送SIGTERM，超时后升级为SIGKILL，并确认监听端口已释放
+        
+        Args:
+            job_uid: 任务唯一标识
+            timeout: 每一级信号等待进程结束的超时时间（秒）
+            propagate: 是否同时通知其他参与方的算子服务停止同一任务
+            
+        Returns:
+            {"success": 是否成功停止, "ports_released": {端口: 是否已释放}, "peers_cancelled": {参与方: 是否通知成功}}
+        """
+        sf_cluster_desc = None
+        if propagate and self._peer_cancel_client is not None:
+            job_kwargs = (self.get_process_info(job_uid) or {}).get("kwargs") or {}
+            sf_cluster_desc = job_kwargs.get("sf_cluster_desc")
+        
+        if not isinstance(sf_cluster_desc, dict):
+            result = self._terminate_local_job(job_uid, timeout)
+            result["peers_cancelled"] = {}
+            return result
+        
+        # 对端取消与本地停止同时进行，各参与方并行退出
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            peer_future = executor.submit(self._peer_cancel_client.cancel, job_uid, sf_cluster_desc)
+            result = self._terminate_local_job(job_uid, timeout)
+            result["peers_cancelled"] = peer_future.result()
+        return result
+    
+    def _terminate_local_job(self, job_uid: str, timeout: int) -> Dict:
+        """停止本地的任务进程，返回停止结果和端口释放情况"""
         with self._lock:
+            # 排队中的任务直接出队，堆中的条目在出队时惰性删除
+            if self._queued_jobs.pop(job_uid, None) is not None:
+                logger.info(f"排队任务 {job_uid} 已取消")
+                return {"success": True, "ports_released": {}}
+            
+            # 正在启动的任务等待其完成登记后再停止
+            deadline = time.time() + timeout
+            while job_uid in self._launching_jobs and time.time() < deadline:
+                self._launch_condition.wait(0.05)
+            
             if job_uid not in self._running_processes:
                 logger.warning(f"任务 {job_uid} 不在运行中")
-                return True
+                return {"success": True, "ports_released": {}}
                 
             process_info = self._running_processes[job_uid]
+            # 其他请求正在停止该任务（例如对端转发的取消与本地请求同时到达），等待其完成
+            if process_info.get("stopping"):
+                deadline = time.time() + timeout * 3
+                while job_uid in self._running_processes and time.time() < deadline:
+                    self._launch_condition.wait(0.05)
+                return {"success": job_uid not in self._running_processes, "ports_released": {}}
+            
+            process_info["stopping"] = True
             process = process_info["process"]
+            job_kwargs = process_info.get("kwargs") or {}
+            # 停止期间由本线程回收进程，避免监控线程同时处理退出事件
+            self._unwatch_process(process)
         
         try:
-            # 尝试终止进程
-            process.terminate()
-            process.join(timeout=timeout)
-            
-            # hack: 强制结束进程
-            # # 如果进程仍然运行，强制结束
-            # if process.is_alive():
-            #     os.kill(process.pid, signal.SIGKILL)
+            stopped = self._terminate_process_tree(process, timeout)
+            if not stopped:
+                process_info["stopping"] = False
+                self._watch_process(job_uid, process)
+                logger.error(f"任务 {job_uid} 在SIGKILL后仍未退出")
+                return {"success": False, "ports_released": {}}
             
             with self._lock:
                 # 从运行中进程列表中移除
                 if job_uid in self._running_processes:
                     del self._running_processes[job_uid]
+                    self._close_result_conn(process_info)
+                    self._record_finished_job(job_uid, "stopped", process.exitcode, None)
+                    self._release_process(process)
+                self._launch_condition.notify_all()
+            self.rendezvous_registry.discard(job_uid)
             
             # # 发送任务完成通知（如果有回调URL）
             # self._send_callback_notification(self.stop_url, job_uid, success)
             
-            logger.info(f"任务 {job_uid} 已停止")
-            return True
+            # 确认本方SPU监听端口已释放，下一个任务可以立即绑定；对端节点的端口由对端释放，不在本机等待
+            ports_released = wait_ports_released(self._local_listen_ports(job_kwargs.get("sf_cluster_desc")), timeout=timeout)
+            self._release_job_ports(job_uid)
+            
+            logger.info(f"任务 {job_uid} 已停止，端口释放情况: {ports_released}")
+            self._admit_pending_jobs()
+            return {"success": True, "ports_released": ports_released}
         except Exception as e:
             logger.error(f"停止任务 {job_uid} 失败: {str(e)}")
-            return False
+            return {"success": False, "ports_released": {}}
+    
+    @staticmethod
+    def _terminate_process_tree(process, timeout: float) -> bool:
+        """
+        终止任务进程及其全部子孙进程
+        
+        任务进程在独立的进程组中运行，按进程组发送信号；
+        脱离进程组的子孙进程（例如Ray自行创建会话的进程）在停止前通过psutil记录并单独处理
+        
+        Returns:
+            任务进程是否已退出
+        """
+        pid = process.pid
+        try:
+            descendants = psutil.Process(pid).children(recursive=True)
+        except psutil.NoSuchProcess:
+            descendants = []
+        
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+            for child in descendants:
+                try:
+                    child.send_signal(sig)
+                except psutil.NoSuchProcess:
+                    pass
+            
+            process.join(timeout=timeout)
+            _, descendants = psutil.wait_procs(descendants, timeout=timeout if process.is_alive() else 0.5)
+            if not process.is_alive() and not descendants:
+                break
+        
+        # 任务进程已退出时，清理进程组中残留的进程
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        return not process.is_alive()
+    
+    def stop_processes(self, job_uids: List[str], timeout: int = 5, propagate: bool = False) -> Dict[str, Dict]:
+        """
+        并发停止多个任务
+        
+        Args:
+            job_uids: 任务ID列表
+            timeout: 每一级信号等待进程结束的超时时间（秒）
+            propagate: 是否同时通知其他参与方的算子服务停止同一任务
+            
+        Returns:
+            任务ID与停止结果的映射
+        """
+        if not job_uids:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(job_uids)) as executor:
+            results = executor.map(lambda job_uid: self.terminate_job(job_uid, timeout, propagate), job_uids)
+            return dict(zip(job_uids, results))
     
     def stop_all_processes(self, timeout: int = 5) -> Dict[str, bool]:
         """
@@ -182,13 +643,11 @@ class ProcessManager:
         Returns:
             任务ID与停止结果的映射
         """
-        results = {}
-        job_uids = list(self._running_processes.keys())
+        with self._lock:
+            job_uids = list(self._queued_jobs.keys()) + list(self._running_processes.keys())
         
-        for job_uid in job_uids:
-            results[job_uid] = self.stop_process(job_uid, timeout)
-            
-        return results
+        results = self.stop_processes(job_uids, timeout)
+        return {job_uid: result["success"] for job_uid, result in results.items()}
     
     def get_process_info(self, job_uid: str) -> Optional[Dict]:
         """
@@ -198,19 +657,56 @@ class ProcessManager:
             job_uid: 任务唯一标识
             
         Returns:
-            进程信息字典，如果不存在则返回None
+            进程信息字典，排队中的任务返回排队信息，如果不存在则返回None
+        """
+        with self._lock:
+            return (
+                self._running_processes.get(job_uid)
+                or self._launching_jobs.get(job_uid)
+                or self._queued_jobs.get(job_uid)
+            )
+    
+    def get_finished_job(self, job_uid: str) -> Optional[Dict]:
+        """
+        获取最近结束的任务的状态和结果摘要
+        
+        Args:
+            job_uid: 任务唯一标识
+            
+        Returns:
+            {"status": completed/failed/stopped, "exit_code", "end_time", "result": 结果摘要}，不存在时返回None
         """
-        return self._running_processes.get(job_uid)
+        with self._lock:
+            finished = self._finished_jobs.get(job_uid)
+            return dict(finished) if finished else None
+    
+    def get_scoring_service(self) -> ScoringService:
+        """
+        获取SS-XGB常驻评分服务
+        
+        Returns:
+            评分服务实例
+            
+        Raises:
+            RuntimeError: 评分服务未启用
+        """
+        if self._scoring_service is None:
+            raise RuntimeError("评分服务未启用")
+        return self._scoring_service
     
     def get_all_processes(self) -> Dict[str, Dict]:
         """
-        获取所有运行中的进程信息
+        获取所有运行中和排队中的进程信息
         
         Returns:
             所有进程信息的字典
         """
         # 返回一个新的字典，避免外部修改内部状态
-        return self._running_processes.copy()
+        with self._lock:
+            all_processes = self._queued_jobs.copy()
+            all_processes.update(self._launching_jobs)
+            all_processes.update(self._running_processes)
+            return all_processes
     
     def is_process_running(self, job_uid: str) -> bool:
         """
@@ -231,36 +727,62 @@ class ProcessManager:
         
         return process.is_alive()
     
-    def _send_callback_notification(self, callback_url: str, job_uid: str, success: bool) -> bool:
+    def get_process_memory(self, job_uid: str) -> Optional[Dict]:
         """
-        发送回调通知
+        获取任务进程的内存占用
         
         Args:
             job_uid: 任务唯一标识
-            process_info: 进程信息
-            status: 任务状态
-            message: 通知消息
             
         Returns:
-            是否成功发送通知
+            包含rss和uss（字节）的字典，进程不存在时返回None
         """
+        with self._lock:
+            process_info = self._running_processes.get(job_uid)
+            if not process_info:
+                return None
+            pid = process_info.get("pid")
+        
         try:
-            response = requests.post(
-                callback_url,
-                json={
-                    "job_uid": job_uid,
-                    "success": success,
-                }
-            )
-            logger.info(f"回调通知已发送: {response.status_code}")
-            return True
-        except Exception as e:
-            logger.error(f"发送回调通知失败: {str(e)}")
+            memory_info = psutil.Process(pid).memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        return {"rss": memory_info.rss, "uss": memory_info.uss}
+    
+    def _send_callback_notification(self, callback_url: str, job_uid: str, success: bool, result: Optional[Dict] = None) -> bool:
+        """
+        发送回调通知，通知由回调分发器异步发送
         
-        return False
+        Args:
+            callback_url: 回调地址
+            job_uid: 任务唯一标识
+            success: 任务是否成功
+            result: 任务回传的结果摘要，有结果时才加入通知
+            
+        Returns:
+            是否成功提交通知
+        """
+        if self._callback_dispatcher is None:
+            logger.error(f"回调分发器未初始化，任务 {job_uid} 的回调通知未发送")
+            return False
+        
+        payload = {
+            "job_uid": job_uid,
+            "success": success,
+        }
+        if result is not None:
+            payload["result"] = result
+        self._callback_dispatcher.submit(callback_url, payload)
+        return True
     
     def __del__(self):
         """析构函数，确保监控线程停止"""
         self._monitor_running = False
         if self._monitor_thread and self._monitor_thread.is_alive():
-            self._monitor_thread.join(timeout=1)
\ No newline at end of file
+            self._monitor_thread.join(timeout=1)
+        if self._executor_pool is not None:
+            self._executor_pool.shutdown()
+        if self._scoring_service is not None:
+            self._scoring_service.shutdown()
+        if self._callback_dispatcher is not None:
+            self._callback_dispatcher.stop()
\ No newline at end of file
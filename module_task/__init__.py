@@ -1,2 +1,2 @@
-from . import scheduler_test  # noqa: F401
-from .psi import psi_csv
\ No newline at end of file
+# 算子模块按需导入，通过registry.resolve_operator获取算子函数
+from .registry import register_operator, resolve_operator  # noqa: F401
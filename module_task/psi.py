@@ -1,20 +1,364 @@
 ## 初始化sf集群，pyu和spu
+import os
+import shutil
+from functools import partial
 import secretflow as sf
+from secretflow.device import SPU
 from utils.yaml_util import read_yaml
 from utils.sf_init import SecretFlowConfigurator
-from utils.path_util import modify_path
+from utils.path_util import get_local_data_path, modify_path
+from utils.csv_delta_util import merge_outputs, params_digest, prepare_delta, remove_files, save_watermark
+from utils.csv_shard_util import concat_buckets, get_shard_count, run_buckets, split_buckets
+from utils.csv_key_util import KEY_DIGEST_COLUMN, join_back, project_keys
+from utils.row_index_util import get_index_path, write_row_index
+from utils.table_format_util import csv_staging_path, finalize_table, is_columnar, is_directory_output, materialize_csv, needs_csv_materialization
+from utils.cluster_util import assign_node_ports, get_bucket_ports, is_local_cluster
+from utils.ub_psi_cache_util import client_cache_state, commit_client_cache, commit_server_cache, server_cache_state
+from module_task.registry import register_operator
 
-__all__ = ["psi_csv"]
+__all__ = ["psi_csv", "ub_psi_csv"]
 
+@register_operator("psi_csv")
 def psi_csv(sf_cluster_desc, sf_node_eval_param, **kwargs):
+    # incremental为True时只对上次求交后追加的行求交，并合并到已有的输出文件
+    incremental = sf_node_eval_param.pop("incremental", False)
+    # sharded为True时按求交键哈希分桶，各桶在独立的SPU上并行求交
+    shards = get_shard_count(sf_node_eval_param, is_local_cluster(sf_cluster_desc))
+    sf_node_eval_param.pop("sharded", None)
+    sf_node_eval_param.pop("shards", None)
+    # project_keys为True时只用求交键的定长摘要求交，再从原始输入取回交集行
+    projected = sf_node_eval_param.pop("project_keys", False)
+    # index_only为True时只保存交集行在原始输入中的行号，下游通过惰性视图按需取出交集行
+    index_only = sf_node_eval_param.pop("index_only", False)
+    # cardinality_only为True时只计算交集大小，不写出和广播交集（协议本身仍完整执行），结果通过任务状态和完成回调返回
+    cardinality_only = sf_node_eval_param.pop("cardinality_only", False)
+    # output_format指定时输出文件的扩展名替换为该格式（csv/parquet/feather），下游算子按扩展名读取
+    output_format = sf_node_eval_param.pop("output_format", None)
     with SecretFlowConfigurator(**sf_cluster_desc) as sf_config:
         spu = sf_config.spu
-        sf_node_eval_param["input_path"] = modify_path(sf_node_eval_param["input_path"])
-        sf_node_eval_param["output_path"] = modify_path(sf_node_eval_param["output_path"])
-               
-        psi_csv_param = sf_config.replace_keys(sf_node_eval_param)
-
-        # import time
-        # time.sleep(200)
-        sf.wait(spu.psi_csv(**psi_csv_param))
-        # time.sleep(100)
\ No newline at end of file
+        pyus = sf_config.parties_pyu
+        input_path = modify_path(sf_node_eval_param["input_path"])
+        output_path = {} if cardinality_only else modify_path(sf_node_eval_param["output_path"], output_format)
+        if (incremental or index_only) and any(needs_csv_materialization(path) for path in [*input_path.values(), *output_path.values()]):
+            raise ValueError("incremental和index_only只支持单个csv文件的输入和输出")
+        if any(is_directory_output(path) for path in output_path.values()):
+            raise ValueError(f"psi的输出必须为文件: {output_path}")
+
+        # SecretFlow的求交只读写单个csv文件，列式格式或分片数据集（目录或通配符）的输入先在各方转换为csv，
+        # 输出先写出csv再转换；是否需要转换在各方判断，目录只存在于该方的机器上
+        sf_node_eval_param["input_path"] = {
+            party: sf.reveal(pyus[party](materialize_csv)(path, os.path.dirname(output_path[party]) if party in output_path else None))
+            for party, path in input_path.items()
+        }
+        try:
+            if cardinality_only:
+                return _cardinality_psi_csv(sf_config, spu, sf_node_eval_param)
+            sf_node_eval_param["output_path"] = {party: csv_staging_path(path) for party, path in output_path.items()}
+            _dispatch_psi_csv(sf_cluster_desc, sf_config, spu, sf_node_eval_param, incremental, shards, projected, index_only)
+            sf.wait([
+                pyus[party](finalize_table)(sf_node_eval_param["output_path"][party], path)
+                for party, path in output_path.items()
+                if is_columnar(path)
+            ])
+        finally:
+            sf.wait([
+                pyus[party](remove_files)([path])
+                for party, path in sf_node_eval_param["input_path"].items()
+                if path != input_path[party]
+            ])
+
+
+def _dispatch_psi_csv(sf_cluster_desc, sf_config, spu, sf_node_eval_param, incremental, shards, projected, index_only):
+    """按求交方式执行psi_csv，输入输出均为csv"""
+    if incremental:
+        _incremental_psi_csv(sf_config, spu, sf_node_eval_param)
+        return
+    if shards > 1:
+        _sharded_psi_csv(sf_cluster_desc, sf_config, spu, sf_node_eval_param, shards)
+        return
+    if projected or index_only:
+        _projected_psi_csv(sf_config, spu, sf_node_eval_param, index_only)
+        return
+
+    psi_csv_param = sf_config.replace_keys(sf_node_eval_param)
+
+    # import time
+    # time.sleep(200)
+    sf.wait(spu.psi_csv(**psi_csv_param))
+    # time.sleep(100)
+
+
+@register_operator("ub_psi_csv")
+def ub_psi_csv(sf_cluster_desc, sf_node_eval_param, **kwargs):
+    """
+    非平衡求交：小数据方（receiver）的查询集与大数据方（server）的大表求交
+
+    大数据方的离线阶段（加密大表生成缓存、传输给小数据方预处理）结果按版本缓存在各方磁盘上，
+    版本由大表内容和求交键决定；大表未变化时后续查询只执行在线阶段，只处理小数据方的数据
+
+    sf_node_eval_param:
+        input_path: {参与方: 文件名}
+        output_path: {receiver: 文件名}
+        key: {参与方: 求交键}
+        receiver: 小数据方，获得交集
+        server: 大数据方，未指定时取另一方
+        cache_name: 缓存名称，未指定时取大数据方输入的文件名
+        curve_type/bucket_size/sort: 同psi_csv
+
+    Returns:
+        {"cache_version": 缓存版本, "offline_generated": 本次是否生成了离线缓存,
+         "cache_transferred": 本次是否传输了缓存, "intersection_count": 交集大小}
+    """
+    input_path = modify_path(sf_node_eval_param["input_path"])
+    output_path = modify_path(sf_node_eval_param["output_path"])
+    key = sf_node_eval_param["key"]
+    client = sf_node_eval_param["receiver"]
+    server = sf_node_eval_param.get("server") or next(party for party in input_path if party != client)
+    cache_name = sf_node_eval_param.get("cache_name") or os.path.splitext(sf_node_eval_param["input_path"][server])[0]
+    curve_type = sf_node_eval_param.get("curve_type", "CURVE_FOURQ")
+    cache_root = {party: os.path.join(get_local_data_path(), party, "ub_psi_cache", cache_name) for party in (server, client)}
+    # 离线缓存只与大数据方的数据、求交键和曲线有关
+    digest = params_digest({"key": key[server], "curve_type": curve_type})
+
+    with SecretFlowConfigurator(**sf_cluster_desc) as sf_config:
+        spu = sf_config.spu
+        pyus = sf_config.parties_pyu
+        server_state = sf.reveal(pyus[server](server_cache_state)(input_path[server], cache_root[server], digest))
+        version = server_state["version"]
+        client_state = sf.reveal(pyus[client](client_cache_state)(cache_root[client], version))
+        common_param = {
+            "key": {server: key[server], client: key[client]},
+            "receiver": client,
+            "precheck_input": False,
+            "broadcast_result": False,
+            "curve_type": curve_type,
+            "bucket_size": sf_node_eval_param.get("bucket_size", 1 << 20),
+            "ecdh_secret_key_path": server_state["secret_key_path"],
+        }
+
+        if not server_state["ready"]:
+            # 离线：大数据方用私钥加密大表生成缓存
+            spu.psi_csv(**sf_config.replace_keys({
+                **common_param,
+                "key": {server: key[server]},
+                "input_path": {server: input_path[server]},
+                "output_path": {server: server_state["cache_path"]},
+                "protocol": "ECDH_OPRF_UB_PSI_2PC_GEN_CACHE",
+                "sort": False,
+            }))
+            sf.wait(pyus[server](commit_server_cache)(cache_root[server], server_state))
+
+        if not client_state["ready"]:
+            # 离线：缓存传输给小数据方，由小数据方保存预处理结果
+            spu.psi_csv(**sf_config.replace_keys({
+                **common_param,
+                "input_path": {server: server_state["cache_path"], client: input_path[client]},
+                "output_path": {server: os.devnull, client: os.devnull},
+                "protocol": "ECDH_OPRF_UB_PSI_2PC_TRANSFER_CACHE",
+                "preprocess_path": client_state["preprocess_path"],
+                "sort": False,
+            }))
+            sf.wait(pyus[client](commit_client_cache)(cache_root[client], version))
+
+        # 在线：只处理小数据方的查询集
+        reports = spu.psi_csv(**sf_config.replace_keys({
+            **common_param,
+            "input_path": {server: input_path[server], client: input_path[client]},
+            "output_path": {server: os.devnull, client: output_path[client]},
+            "protocol": "ECDH_OPRF_UB_PSI_2PC_ONLINE",
+            "preprocess_path": client_state["preprocess_path"],
+            "sort": sf_node_eval_param.get("sort", True),
+        }))
+
+    counts = [report["intersection_count"] for report in reports if report.get("party") == client]
+    return {
+        "cache_version": version,
+        "offline_generated": not server_state["ready"],
+        "cache_transferred": not client_state["ready"],
+        "intersection_count": counts[0] if counts else None,
+    }
+
+
+def _cardinality_psi_csv(sf_config, spu, sf_node_eval_param):
+    """
+    只计算交集大小
+
+    SecretFlow的psi_csv没有只计数的模式，接收方仍完整执行求交协议并逐行输出交集；
+    这里只省去交集的广播、交集文件的写出（写入空设备）和排序，协议本身的计算和通信量与完整求交相同。
+    交集大小取自接收方的报告
+
+    Returns:
+        {"intersection_count": 交集大小, "original_count": {参与方: 输入行数}}
+    """
+    input_path = sf_node_eval_param["input_path"]
+    parties = list(input_path.keys())
+    psi_param = {
+        **sf_node_eval_param,
+        "output_path": {party: os.devnull for party in parties},
+        "sort": False,
+        # 交集只需要接收方计数，不广播给其他参与方
+        "broadcast_result": False,
+    }
+    reports = spu.psi_csv(**sf_config.replace_keys(psi_param))
+
+    receiver = sf_node_eval_param.get("receiver")
+    # 不广播结果时只有接收方的报告中有交集大小
+    counts = [report["intersection_count"] for report in reports if report.get("party") == receiver]
+    counts = counts or [max(report["intersection_count"] for report in reports)]
+    return {
+        "intersection_count": counts[0],
+        "original_count": {report.get("party"): report.get("original_count") for report in reports},
+    }
+
+
+def _incremental_psi_csv(sf_config, spu, sf_node_eval_param):
+    """
+    增量求交
+
+    交集 = 上次的交集 ∪ (每一方新追加的行 ∩ 其他方的全量数据)。
+    各方在自己的PYU上比对输入文件与上次的水位线，生成增量文件；
+    任一方需要全量求交（首次运行、参数变化或文件被改写）时退化为全量求交。
+    增量结果追加在已有输出的末尾，sort为True时只在追加的部分内排序
+    """
+    input_path = sf_node_eval_param["input_path"]
+    output_path = sf_node_eval_param["output_path"]
+    parties = list(input_path.keys())
+    params = {key: value for key, value in sf_node_eval_param.items() if key not in ("input_path", "output_path")}
+    digest = params_digest(params)
+    pyus = sf_config.parties_pyu
+    state_path = {party: f"{output_path[party]}.psi-watermark.json" for party in parties}
+
+    deltas = {
+        party: sf.reveal(pyus[party](prepare_delta)(input_path[party], output_path[party], state_path[party], digest))
+        for party in parties
+    }
+
+    if any(delta["mode"] == "full" for delta in deltas.values()):
+        sf.wait(spu.psi_csv(**sf_config.replace_keys(sf_node_eval_param)))
+    else:
+        delta_outputs = {party: [] for party in parties}
+        for appended_party in [party for party in parties if deltas[party]["delta_rows"]]:
+            run_input = {
+                party: deltas[party]["delta_path"] if party == appended_party else input_path[party]
+                for party in parties
+            }
+            run_output = {party: f"{output_path[party]}.delta-{appended_party}.csv" for party in parties}
+            sf.wait(spu.psi_csv(**sf_config.replace_keys({**params, "input_path": run_input, "output_path": run_output})))
+            for party in parties:
+                delta_outputs[party].append(run_output[party])
+
+        if any(delta_outputs.values()):
+            sf.wait([
+                pyus[party](merge_outputs)(output_path[party], delta_outputs[party], params["key"][party], params.get("sort", True))
+                for party in parties
+            ])
+
+    sf.wait([
+        pyus[party](save_watermark)(input_path[party], state_path[party], digest, deltas[party]["watermark"])
+        for party in parties
+    ])
+    sf.wait([pyus[party](remove_files)([deltas[party]["delta_path"]]) for party in parties])
+
+
+def _sharded_psi_csv(sf_cluster_desc, sf_config, spu, sf_node_eval_param, shards):
+    """
+    分桶求交
+
+    各方在自己的PYU上按求交键的带密钥哈希把输入拆成shards个桶，相同的键必然落入同一个桶；
+    第i个桶在独立的SPU上求交（端口见get_bucket_ports，同一主机上各桶的端口互不重叠），各桶并行执行，最后在各方合并输出。
+    哈希密钥取自求交参数的摘要，各方相同且不需要额外协商
+    """
+    input_path = sf_node_eval_param["input_path"]
+    output_path = sf_node_eval_param["output_path"]
+    parties = list(input_path.keys())
+    params = {key: value for key, value in sf_node_eval_param.items() if key not in ("input_path", "output_path")}
+    salt = params_digest(params)
+    pyus = sf_config.parties_pyu
+    bucket_dir = {party: f"{output_path[party]}.buckets" for party in parties}
+    # 端口无法分桶时在拆分输入之前失败
+    bucket_ports = get_bucket_ports(sf_cluster_desc, shards)
+
+    bucket_inputs = {
+        party: pyus[party](split_buckets)(input_path[party], params["key"][party], shards, salt, bucket_dir[party])
+        for party in parties
+    }
+    bucket_inputs = {party: sf.reveal(paths) for party, paths in bucket_inputs.items()}
+
+    spu_config = sf_cluster_desc["devices"]["spu_config"]
+
+    def run_bucket(index):
+        bucket_spu = spu
+        if index > 0:
+            bucket_desc = assign_node_ports(sf_cluster_desc, bucket_ports[index])
+            bucket_spu = SPU(**{**spu_config, "cluster_def": bucket_desc["devices"]["spu_config"]["cluster_def"]})
+        bucket_param = {
+            **params,
+            "input_path": {party: bucket_inputs[party][index] for party in parties},
+            "output_path": {party: os.path.join(bucket_dir[party], f"output-{index}.csv") for party in parties},
+        }
+        return bucket_spu.psi_csv(**sf_config.replace_keys(bucket_param))
+
+    # psi_csv阻塞到求交结束并返回报告，各桶在独立的线程中调用，在各自的SPU上并行求交
+    run_buckets([partial(run_bucket, index) for index in range(shards)])
+
+    sf.wait([
+        pyus[party](concat_buckets)(
+            [os.path.join(bucket_dir[party], f"output-{index}.csv") for index in range(shards)],
+            output_path[party],
+            params["key"][party],
+            params.get("sort", True),
+        )
+        for party in parties
+    ])
+    sf.wait([pyus[party](shutil.rmtree)(bucket_dir[party], True) for party in parties])
+
+
+def _projected_psi_csv(sf_config, spu, sf_node_eval_param, index_only=False):
+    """
+    键投影求交
+
+    宽表中只有求交键参与协议：各方在自己的PYU上流式读取求交键列（支持多列组合键），
+    规范化为定长摘要并附上行号，对投影文件求交后按行号从原始输入取回交集行的全部列。
+    摘要的哈希密钥取自求交参数的摘要，各方相同。
+    index_only时不取回交集行，只在<输出文件>.index.npz中保存升序的行号
+    """
+    input_path = sf_node_eval_param["input_path"]
+    output_path = sf_node_eval_param["output_path"]
+    parties = list(input_path.keys())
+    params = {key: value for key, value in sf_node_eval_param.items() if key not in ("input_path", "output_path")}
+    salt = params_digest(params)
+    pyus = sf_config.parties_pyu
+    projected_input = {party: f"{output_path[party]}.keys.csv" for party in parties}
+    projected_output = {party: f"{output_path[party]}.keys-output.csv" for party in parties}
+
+    total_rows = {
+        party: pyus[party](project_keys)(input_path[party], params["key"][party], salt, projected_input[party])
+        for party in parties
+    }
+    # 取回交集行时再排序，协议本身不需要排序
+    projected_param = {
+        **params,
+        "key": {party: [KEY_DIGEST_COLUMN] for party in parties},
+        "input_path": projected_input,
+        "output_path": projected_output,
+        "sort": False,
+    }
+    sf.wait(spu.psi_csv(**sf_config.replace_keys(projected_param)))
+
+    sf.wait([
+        pyus[party](write_row_index if index_only else join_back)(
+            projected_output[party],
+            input_path[party],
+            output_path[party],
+            params["key"][party],
+            total_rows[party],
+            params.get("sort", True),
+        )
+        for party in parties
+    ])
+    # 完整输出时删除上次留下的行号索引
+    temp_files = {party: [projected_input[party], projected_output[party]] for party in parties}
+    if not index_only:
+        for party in parties:
+            temp_files[party].append(get_index_path(output_path[party]))
+    sf.wait([pyus[party](remove_files)(temp_files[party]) for party in parties])
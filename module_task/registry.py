@@ -0,0 +1,102 @@
+import importlib
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+__all__ = [
+    "OPERATOR_MODULES",
+    "CACHEABLE_OPERATORS",
+    "register_operator",
+    "resolve_operator",
+    "get_operator_name",
+]
+
+# 算子名称 -> 所在模块，首次使用时才导入对应模块
+OPERATOR_MODULES: Dict[str, str] = {
+    "psi_csv": "module_task.psi",
+    "ub_psi_csv": "module_task.psi",
+    "split": "module_task.split",
+    "ss_xgb_train": "module_task.ss_xgb",
+    "ss_xgb_predict": "module_task.ss_xgb",
+    "job": "module_task.scheduler_test",
+    "async_job": "module_task.scheduler_test",
+}
+
+# 可缓存结果的算子：sf_node_eval_param中的输入/输出路径参数
+# local_data为True时路径为local_data/<参与方>/下的文件名（与psi_csv中modify_path一致）
+# bypass中的参数开启时算子不写出输出文件，不缓存
+CACHEABLE_OPERATORS: Dict[str, Dict] = {
+    "psi_csv": {"inputs": ["input_path"], "outputs": ["output_path"], "local_data": True, "bypass": ["cardinality_only"]},
+    "split": {"inputs": ["input_path"], "outputs": ["train_output_path", "test_output_path"], "bypass": ["k_folds", "split_ratios"]},
+    "ss_xgb_train": {"inputs": ["alice_data_path", "bob_data_path"], "outputs": ["model_path"]},
+    "ss_xgb_predict": {"inputs": ["alice_data_path", "bob_data_path", "model_path"], "outputs": ["output_path"]},
+}
+
+# 旧的点分路径中可以使用的包级导出（原module_task/__init__.py中导出的算子），与所在模块的完整写法等价
+_PACKAGE_EXPORTS: Dict[str, str] = {
+    "module_task.psi_csv": "psi_csv",
+}
+
+# 已导入模块中注册的算子函数
+_OPERATORS: Dict[str, Callable] = {}
+
+
+def register_operator(name: str):
+    """
+    算子注册装饰器，模块导入时将函数注册到算子表
+
+    :param name: 算子名称，需在OPERATOR_MODULES中声明所在模块
+    """
+
+    def decorator(function: Callable) -> Callable:
+        _OPERATORS[name] = function
+        return function
+
+    return decorator
+
+
+def _normalize_target(invoke_target: str) -> Optional[str]:
+    """
+    兼容旧的点分路径写法，例如module_task.psi.psi_csv
+
+    点分路径必须是算子所在模块加算子名称的完整写法或_PACKAGE_EXPORTS中的包级导出，其他写法返回None
+    """
+    target = invoke_target.strip()
+    if "." not in target:
+        return target
+    if target in _PACKAGE_EXPORTS:
+        return _PACKAGE_EXPORTS[target]
+    module, _, name = target.rpartition(".")
+    return name if OPERATOR_MODULES.get(name) == module else None
+
+
+# 调用目标由客户端传入，缓存大小需有上限
+@lru_cache(maxsize=256)
+def resolve_operator(invoke_target: str) -> Callable:
+    """
+    根据调用目标获取算子函数，结果会被缓存
+
+    :param invoke_target: 算子名称或旧的点分路径
+    :return: 算子函数
+    :raises ValueError: 调用目标未注册
+    """
+    name = _normalize_target(invoke_target)
+    if name is None or name not in OPERATOR_MODULES:
+        raise ValueError(f"未注册的算子: {invoke_target}")
+    if name not in _OPERATORS:
+        importlib.import_module(OPERATOR_MODULES[name])
+    if name not in _OPERATORS:
+        raise ValueError(f"算子 {name} 未在模块 {OPERATOR_MODULES[name]} 中注册")
+    return _OPERATORS[name]
+
+
+def get_operator_name(function: Callable) -> Optional[str]:
+    """
+    获取算子函数的注册名称
+
+    :param function: 算子函数
+    :return: 算子名称，未注册时返回None
+    """
+    for name, operator in _OPERATORS.items():
+        if operator is function:
+            return name
+    return None
@@ -1,6 +1,8 @@
 from datetime import datetime
+from module_task.registry import register_operator
 
 
+@register_operator("job")
 def job(*args, **kwargs):
     """
     定时任务执行同步函数示例
@@ -13,6 +15,7 @@ def job(*args, **kwargs):
     print(f'{datetime.now()}同步函数执行了')
 
 
+@register_operator("async_job")
 async def async_job(*args, **kwargs):
     """
     定时任务执行异步函数示例
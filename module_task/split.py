@@ -1,4 +1,5 @@
 ## 初始化sf集群，pyu和spu
+import os
 import secretflow as sf
 
 from secretflow.data.vertical import read_csv as v_read_csv
@@ -10,47 +11,189 @@ from secretflow.security.compare import SPUComparator
 
 from secretflow.data.split import train_test_split
 from utils.sf_init import SecretFlowConfigurator
+from utils.csv_delta_util import remove_files
+from utils.row_index_util import materialize_table
+from utils.table_format_util import csv_staging_path, finalize_table, is_directory_output, materialize_csv, with_format_extension
+from utils.csv_split_util import get_fold_path, kfold_intervals, ratio_intervals, resolve_split_sizes, split_rows_multi
+from module_task.registry import register_operator
 
 
+@register_operator("split")
 def split(sf_cluster_desc, sf_node_eval_param):
     with SecretFlowConfigurator(**sf_cluster_desc) as sf_config:
         spu = sf_config.spu
 
         data_type = sf_node_eval_param.pop("data_type", "vdf")
-        input_path = sf_config.replace_keys(sf_node_eval_param.pop("input_path"))
-        train_output_path = sf_config.replace_keys(
-            sf_node_eval_param.pop("train_output_path")
+        # streaming为True时各方按求交键的哈希独立流式划分纵向数据，不加载完整的数据；
+        # 输入为分片目录或通配符时各分片并行划分，输出为目录（以/结尾）时按输入分片写出
+        # k_folds或split_ratios在一次遍历中生成全部划分（流式）
+        streaming = any(sf_node_eval_param.get(name) for name in ("streaming", "k_folds", "split_ratios"))
+        sf_node_eval_param.pop("streaming", None)
+        # output_format指定时输出文件的扩展名替换为该格式（csv/parquet/feather），下游算子按扩展名读取
+        output_format = sf_node_eval_param.pop("output_format", None)
+        _apply_output_format(sf_node_eval_param, output_format)
+        raw_input_path = sf_node_eval_param.pop("input_path")
+        if streaming and data_type == "vdf":
+            # 上游只输出了行号索引时，流式划分直接按行号读取原始输入，不写出交集行
+            return _streaming_split(sf_config, raw_input_path, sf_node_eval_param, output_format)
+
+        # 上游只输出了行号索引时，各方此时才从原始输入中取出交集行
+        materialized_path = {
+            party: sf.reveal(sf_config.parties_pyu[party](materialize_table)(path))
+            for party, path in raw_input_path.items()
+        }
+        try:
+            if any(is_directory_output(path) for name in ("train_output_path", "test_output_path") for path in sf_node_eval_param[name].values()):
+                raise ValueError("输出为目录（按输入分片写出）时需要流式划分（streaming/k_folds/split_ratios）")
+            # SecretFlow的读写只支持单个csv文件，列式格式或分片数据集的输入先转换为csv，输出先写出csv再转换
+            csv_input_path = {
+                party: sf.reveal(sf_config.parties_pyu[party](materialize_csv)(
+                    path, os.path.dirname(sf_node_eval_param["train_output_path"][party])
+                ))
+                for party, path in materialized_path.items()
+            }
+            try:
+                output_path = {
+                    name: sf_node_eval_param.pop(name)
+                    for name in ("train_output_path", "test_output_path")
+                }
+                staging_path = {
+                    name: {party: csv_staging_path(path) for party, path in paths.items()}
+                    for name, paths in output_path.items()
+                }
+                keys = sf_config.replace_keys(sf_node_eval_param.pop("keys", None))
+                _split(
+                    sf_config,
+                    spu,
+                    data_type,
+                    sf_config.replace_keys(csv_input_path),
+                    sf_config.replace_keys(staging_path["train_output_path"]),
+                    sf_config.replace_keys(staging_path["test_output_path"]),
+                    keys,
+                    sf_node_eval_param,
+                )
+                sf.wait([
+                    sf_config.parties_pyu[party](finalize_table)(staging_path[name][party], path)
+                    for name, paths in output_path.items()
+                    for party, path in paths.items()
+                ])
+            finally:
+                sf.wait([
+                    sf_config.parties_pyu[party](remove_files)([path])
+                    for party, path in csv_input_path.items()
+                    if path != materialized_path[party]
+                ])
+        finally:
+            sf.wait([
+                sf_config.parties_pyu[party](remove_files)([path])
+                for party, path in materialized_path.items()
+                if path != raw_input_path[party]
+            ])
+
+
+def _apply_output_format(sf_node_eval_param, output_format):
+    """将各输出文件的扩展名替换为output_format对应的扩展名，输出目录中的分片由split_rows_multi按该格式写出"""
+    if not output_format:
+        return
+    for name in ("train_output_path", "test_output_path", "output_paths"):
+        if name not in sf_node_eval_param:
+            continue
+        sf_node_eval_param[name] = {
+            party: [with_format_extension(path, output_format) for path in paths] if isinstance(paths, list)
+            else with_format_extension(paths, output_format)
+            for party, paths in sf_node_eval_param[name].items()
+        }
+
+
+def _streaming_split(sf_config, input_path, sf_node_eval_param, output_format=None):
+    """
+    流式纵向划分
+
+    各方在自己的PYU上单次流式读取输入，按求交键的带种子哈希将每行写入对应的输出，
+    对齐的数据在各方得到相同的划分，不需要交互。支持三种划分：
+        train_size/test_size: 训练集和测试集
+        k_folds: k折交叉验证，第i折写入train_output_path/test_output_path加-fold<i>后缀的文件
+        split_ratios: 按比例列表划分，output_paths为{参与方: 与比例一一对应的输出文件列表}
+
+    Returns:
+        训练集和测试集为{"train_rows", "test_rows"}，k折为{"folds": [{"train_rows", "test_rows"}]}，
+        按比例划分为{"rows": 各输出的行数}
+    """
+    pyus = sf_config.parties_pyu
+    keys = sf_node_eval_param["keys"]
+    parties = list(input_path.keys())
+    k_folds = sf_node_eval_param.get("k_folds")
+    split_ratios = sf_node_eval_param.get("split_ratios")
+
+    if k_folds:
+        folds = kfold_intervals(k_folds)
+        outputs = {
+            party: [
+                output
+                for fold, (train, test) in enumerate(folds)
+                for output in (
+                    (get_fold_path(sf_node_eval_param["train_output_path"][party], fold), train),
+                    (get_fold_path(sf_node_eval_param["test_output_path"][party], fold), test),
+                )
+            ]
+            for party in parties
+        }
+    elif split_ratios:
+        intervals = ratio_intervals(split_ratios)
+        output_paths = sf_node_eval_param["output_paths"]
+        if any(len(output_paths[party]) != len(intervals) for party in parties):
+            raise ValueError("output_paths中每个参与方的输出文件数必须与split_ratios一致")
+        outputs = {party: list(zip(output_paths[party], intervals)) for party in parties}
+    else:
+        train_size, test_size = resolve_split_sizes(sf_node_eval_param.get("train_size"), sf_node_eval_param.get("test_size"))
+        outputs = {
+            party: [
+                (sf_node_eval_param["train_output_path"][party], [(0.0, train_size)]),
+                (sf_node_eval_param["test_output_path"][party], [(train_size, train_size + test_size)]),
+            ]
+            for party in parties
+        }
+
+    counts = sf.reveal([
+        pyus[party](split_rows_multi)(
+            input_path[party], keys[party], outputs[party], sf_node_eval_param.get("random_state"), output_format=output_format
+        )
+        for party in parties
+    ])
+    if any(count != counts[0] for count in counts):
+        raise ValueError(f"各方划分的行数不一致，输入数据未对齐: {dict(zip(parties, counts))}")
+
+    counts = counts[0]
+    if k_folds:
+        return {"folds": [{"train_rows": counts[index], "test_rows": counts[index + 1]} for index in range(0, len(counts), 2)]}
+    if split_ratios:
+        return {"rows": counts}
+    return {"train_rows": counts[0], "test_rows": counts[1]}
+
+
+def _split(sf_config, spu, data_type, input_path, train_output_path, test_output_path, keys, sf_node_eval_param):
+    """按data_type读取纵向或横向数据并划分训练集和测试集"""
+    if data_type == "vdf":
+        sf_node_eval_param.pop("SecureAggregatorDevice", None)
+        sf_node_eval_param.pop("participants", None)
+
+        vdf = v_read_csv(filepath=input_path, keys=keys)
+        train_vdf, test_vdf = train_test_split(vdf, **sf_node_eval_param)
+
+        sf.wait(train_vdf.to_csv(train_output_path, index=False))
+        sf.wait(test_vdf.to_csv(test_output_path, index=False))
+
+    else:
+        aggr = SecureAggregator(
+            device=sf_node_eval_param.pop("SecureAggregatorDevice"),
+            participants=sf_config.parties_pyu.values(),
         )
-        test_output_path = sf_config.replace_keys(
-            sf_node_eval_param.pop("test_output_path")
+        comp = SPUComparator(spu)
+        hdf = h_read_csv(
+            input_path,
+            aggregator=aggr,
+            comparator=comp,
         )
-        keys = sf_config.replace_keys(sf_node_eval_param.pop("keys", None))
-
-        import time
-        # time.sleep(100)
-        time.sleep(20)
-
-        if data_type == "vdf":
-            sf_node_eval_param.pop("SecureAggregatorDevice", None)
-            sf_node_eval_param.pop("participants", None)
-
-            vdf = v_read_csv(filepath=input_path, keys=keys)
-            train_vdf, test_vdf = train_test_split(vdf, **sf_node_eval_param)
-
-            sf.wait(train_vdf.to_csv(train_output_path, index=False))
-            sf.wait(test_vdf.to_csv(test_output_path, index=False))
-
-        else:
-            aggr = SecureAggregator(
-                device=sf_node_eval_param.pop("SecureAggregatorDevice"),
-                participants=sf_config.parties_pyu.values(),
-            )
-            comp = SPUComparator(spu)
-            hdf = h_read_csv(
-                input_path,
-                aggregator=aggr,
-                comparator=comp,
-            )
-            train_hdf, test_hdf = train_test_split(hdf, **sf_node_eval_param)
-            sf.wait(train_hdf.to_csv(train_output_path))
-            sf.wait(test_hdf.to_csv(test_output_path))
+        train_hdf, test_hdf = train_test_split(hdf, **sf_node_eval_param)
+        sf.wait(train_hdf.to_csv(train_output_path))
+        sf.wait(test_hdf.to_csv(test_output_path))
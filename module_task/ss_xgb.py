@@ -4,13 +4,79 @@ from secretflow.data import partition
 from secretflow.security.aggregation import SecureAggregator
 from utils.yaml_util import read_yaml
 from utils.sf_init import SecretFlowConfigurator
+from utils.row_index_util import table_exists
+from utils.dataset_util import iter_dataset, load_dataset
+from utils.csv_delta_util import remove_files
+from utils.table_format_util import csv_staging_path, finalize_table
+from module_task.registry import register_operator
 import pandas as pd
 import numpy as np
 import os
 import logging
+from itertools import zip_longest
 
-__all__ = ["ss_xgb_train", "ss_xgb_predict"]
+__all__ = ["ss_xgb_train", "ss_xgb_predict", "load_model", "predict_frames"]
 
+
+def _selected_columns(ss_xgb_param, device):
+    """
+    参与方需要加载的列
+
+    Args:
+        ss_xgb_param: 替换键后的节点参数，feature_columns为{参与方: 特征列列表}
+        device: 参与方
+
+    Returns:
+        该方的特征列加标签列（标签列不在该方文件中时被忽略），未指定该方的特征列时返回None（加载全部列）
+    """
+    feature_columns = ss_xgb_param.get('feature_columns') or {}
+    if device not in feature_columns:
+        return None
+    label_col = ss_xgb_param.get('label_col')
+    return list(feature_columns[device]) + ([label_col] if label_col else [])
+
+
+def load_model(spu, model_path, label_col=''):
+    """
+    加载已训练的SS-XGB模型
+
+    Args:
+        spu: SPU设备
+        model_path: 模型文件
+        label_col: 标签列
+
+    Returns:
+        模型
+    """
+    ss_xgb = SSXGB(
+        spu=spu,
+        label_col=label_col,
+        aggregator=SecureAggregator(spu)
+    )
+    return ss_xgb.load_model(model_path)
+
+
+def predict_frames(sf_config, model, frames):
+    """
+    对各参与方对齐的数据预测，供常驻评分服务使用
+
+    Args:
+        sf_config: SecretFlow配置
+        model: 已加载的模型
+        frames: {参与方名称: 该方的数据}，各方行数相同且按行对齐
+
+    Returns:
+        一维的预测结果
+    """
+    data = [
+        partition(frames[party], device)
+        for party, device in sf_config.parties_pyu.items()
+        if party in frames
+    ]
+    return np.asarray(model.predict(data)).reshape(-1)
+
+
+@register_operator("ss_xgb_train")
 def ss_xgb_train(sf_cluster_desc, sf_node_eval_param, **kwargs):
     """
     两方SS-XGB模型训练函数
@@ -35,11 +101,12 @@ def ss_xgb_train(sf_cluster_desc, sf_node_eval_param, **kwargs):
         alice_data_path = ss_xgb_param.get('alice_data_path', '')
         bob_data_path = ss_xgb_param.get('bob_data_path', '')
         
-        if not os.path.exists(alice_data_path) or not os.path.exists(bob_data_path):
+        if not table_exists(alice_data_path) or not table_exists(bob_data_path):
             raise FileNotFoundError(f"数据文件不存在: {alice_data_path} 或 {bob_data_path}")
         
-        alice_data = pd.read_csv(alice_data_path)
-        bob_data = pd.read_csv(bob_data_path)
+        # 只加载模型用到的列，浮点列以float32加载；数据路径可以是分片目录或通配符，各分片并行读取
+        alice_data = load_dataset(alice_data_path, _selected_columns(ss_xgb_param, alice))
+        bob_data = load_dataset(bob_data_path, _selected_columns(ss_xgb_param, bob))
         
         # 数据分区
         alice_data = partition(alice_data, alice)
@@ -76,6 +143,7 @@ def ss_xgb_train(sf_cluster_desc, sf_node_eval_param, **kwargs):
         
         return model
 
+@register_operator("ss_xgb_predict")
 def ss_xgb_predict(sf_cluster_desc, sf_node_eval_param, **kwargs):
     """
     两方SS-XGB模型预测函数
@@ -99,27 +167,27 @@ def ss_xgb_predict(sf_cluster_desc, sf_node_eval_param, **kwargs):
         alice_data_path = ss_xgb_param.get('alice_data_path', '')
         bob_data_path = ss_xgb_param.get('bob_data_path', '')
         
-        if not os.path.exists(alice_data_path) or not os.path.exists(bob_data_path):
+        if not table_exists(alice_data_path) or not table_exists(bob_data_path):
             raise FileNotFoundError(f"数据文件不存在: {alice_data_path} 或 {bob_data_path}")
-        alice_data = pd.read_csv(alice_data_path)
-        bob_data = pd.read_csv(bob_data_path)
-        
-        # 数据分区
-        alice_data = partition(alice_data, alice)
-        bob_data = partition(bob_data, bob)
         
         model_path = ss_xgb_param.get('model_path', '')
         if not model_path or not os.path.exists(model_path):
             raise FileNotFoundError(f"模型文件不存在: {model_path}")
         
-        # 创建SS-XGB模型实例
-        ss_xgb = SSXGB(
-            spu=spu,
-            label_col=ss_xgb_param.get('label_col', ''),
-            aggregator=SecureAggregator(spu)
-        )
+        model = load_model(spu, model_path, ss_xgb_param.get('label_col', ''))
+        
+        # 指定batch_size时分批读取、预测并追加写出，内存占用与预测集大小无关
+        batch_size = ss_xgb_param.get('batch_size')
+        if batch_size:
+            return _batched_predict(model, ss_xgb_param, alice, bob, batch_size)
         
-        model = ss_xgb.load_model(model_path)
+        # 只加载模型用到的列，浮点列以float32加载
+        alice_data = load_dataset(alice_data_path, _selected_columns(ss_xgb_param, alice))
+        bob_data = load_dataset(bob_data_path, _selected_columns(ss_xgb_param, bob))
+        
+        # 数据分区
+        alice_data = partition(alice_data, alice)
+        bob_data = partition(bob_data, bob)
         
         logging.info("开始SS-XGB模型预测...")
         predictions = model.predict([alice_data, bob_data])
@@ -127,8 +195,59 @@ def ss_xgb_predict(sf_cluster_desc, sf_node_eval_param, **kwargs):
         
         output_path = ss_xgb_param.get('output_path', '')
         if output_path:
+            # 列式格式的输出先写出csv再转换
+            staging_path = csv_staging_path(output_path)
             pred_df = pd.DataFrame({'predictions': predictions})
-            pred_df.to_csv(output_path, index=False)
+            pred_df.to_csv(staging_path, index=False)
+            finalize_table(staging_path, output_path)
             logging.info(f"预测结果已保存到: {output_path}")
         
-        return predictions 
\ No newline at end of file
+        return predictions 
+
+def _batched_predict(model, ss_xgb_param, alice, bob, batch_size):
+    """
+    分批预测
+
+    两方按相同的行数分块读取对齐的数据，每块经SPU预测后立即追加写入csv，
+    同时只持有一块数据和它的预测结果；output_path为parquet/feather时写完后整体转换
+
+    Args:
+        model: 已加载的模型
+        ss_xgb_param: 替换键后的节点参数
+        alice: alice参与方
+        bob: bob参与方
+        batch_size: 每批的行数
+
+    Returns:
+        {"rows": 预测行数, "batches": 批数}
+    """
+    output_path = ss_xgb_param.get('output_path', '')
+    if not output_path:
+        raise ValueError("分批预测需要指定output_path")
+    batches = zip_longest(
+        iter_dataset(ss_xgb_param['alice_data_path'], _selected_columns(ss_xgb_param, alice), batch_size),
+        iter_dataset(ss_xgb_param['bob_data_path'], _selected_columns(ss_xgb_param, bob), batch_size),
+    )
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    staging_path = csv_staging_path(output_path)
+    rows = 0
+    count = 0
+    logging.info(f"开始SS-XGB模型分批预测，每批 {batch_size} 行...")
+    try:
+        with open(staging_path, "w", encoding="utf-8", newline="") as file:
+            file.write("predictions\n")
+            for alice_batch, bob_batch in batches:
+                if alice_batch is None or bob_batch is None or len(alice_batch) != len(bob_batch):
+                    raise ValueError("两方数据的行数不一致，输入数据未对齐")
+                predictions = model.predict([partition(alice_batch, alice), partition(bob_batch, bob)])
+                pd.DataFrame({'predictions': predictions}).to_csv(file, header=False, index=False)
+                # 每批写完即落盘，输出为csv时下游可以尽早读取已完成的部分
+                file.flush()
+                rows += len(alice_batch)
+                count += 1
+        finalize_table(staging_path, output_path)
+    except Exception:
+        remove_files([staging_path, output_path])
+        raise
+    logging.info(f"SS-XGB模型分批预测完成，共 {rows} 行，结果已保存到: {output_path}")
+    return {"rows": rows, "batches": count}
@@ -27,6 +27,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # 关闭阶段
+    # 任务进程在独立的进程组中，不会随服务进程退出，需要主动停止
+    ProcessManager.get_instance().stop_all_processes()
     # await RedisUtil.close_redis_pool(app)  # 关闭Redis连接池
 
 # FastAPI核心对象初始化
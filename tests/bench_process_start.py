@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+任务进程启动开销对比：fork / spawn / forkserver(预导入)
+
+测量从Process.start()到子进程开始执行目标函数的耗时，以及子进程的RSS/USS。
+fork模式下父进程会先导入模块并启动后台线程，模拟uvicorn服务进程的状态。
+
+用法:
+    python tests/bench_process_start.py --modules module_task.psi module_task.split module_task.ss_xgb
+"""
+import argparse
+import importlib
+import multiprocessing
+import multiprocessing.forkserver
+import statistics
+import threading
+import time
+import psutil
+
+
+def _child(conn, modules):
+    entry = time.time()
+    # 目标函数需要的模块，预导入或继承后这里几乎没有开销
+    for module in modules:
+        importlib.import_module(module)
+    ready = time.time()
+    memory_info = psutil.Process().memory_full_info()
+    conn.send((entry, ready, memory_info.rss, memory_info.uss))
+    conn.close()
+
+
+def bench(start_method, modules, rounds):
+    ctx = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        ctx.set_forkserver_preload(modules)
+        multiprocessing.forkserver.ensure_running()
+
+    latencies, rss, uss = [], [], []
+    for _ in range(rounds):
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        begin = time.time()
+        process = ctx.Process(target=_child, args=(child_conn, modules))
+        process.start()
+        child_conn.close()
+        _, ready, child_rss, child_uss = parent_conn.recv()
+        process.join()
+        latencies.append((ready - begin) * 1000)
+        rss.append(child_rss / 2**20)
+        uss.append(child_uss / 2**20)
+
+    print(
+        f"{start_method:<10} ready_ms p50={statistics.median(latencies):8.1f} max={max(latencies):8.1f}  "
+        f"rss_mb={statistics.median(rss):7.1f}  uss_mb={statistics.median(uss):7.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="任务进程启动开销对比")
+    parser.add_argument("--modules", nargs="+", default=["module_task.psi", "module_task.split", "module_task.ss_xgb"])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--methods", nargs="+", default=["fork", "spawn", "forkserver"])
+    args = parser.parse_args()
+
+    for method in args.methods:
+        if method == "fork":
+            # 模拟服务进程：已导入全部模块，且有常驻后台线程
+            for module in args.modules:
+                importlib.import_module(module)
+            threading.Thread(target=time.sleep, args=(3600,), daemon=True).start()
+        bench(method, args.modules, args.rounds)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 将项目根目录加入sys.path，测试按包路径导入项目模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import os
+
+from utils.csv_delta_util import merge_outputs, prepare_delta, save_watermark
+
+
+def test_delta_after_append_and_merge(tmp_path):
+    input_path, output_path = str(tmp_path / "alice.csv"), str(tmp_path / "psi-output.csv")
+    state_path = output_path + ".psi-watermark.json"
+    (tmp_path / "alice.csv").write_text("id1,x\n1,a\n3,c\n")
+    assert prepare_delta(input_path, output_path, state_path, "d")["mode"] == "full"
+
+    # 模拟一次全量求交
+    (tmp_path / "psi-output.csv").write_text("id1,x\n3,c\n")
+    save_watermark(input_path, state_path, "d", os.path.getsize(input_path))
+
+    with open(input_path, "a") as file:
+        file.write("2,b\n4,d\n")
+    delta = prepare_delta(input_path, output_path, state_path, "d")
+    assert delta["mode"] == "delta" and delta["delta_rows"] == 2
+    assert open(delta["delta_path"]).read() == "id1,x\n2,b\n4,d\n"
+
+    # 对端也追加时，双方增量的交集在两次求交结果中各出现一次
+    (tmp_path / "delta-alice.csv").write_text("id1,x\n2,b\n")
+    (tmp_path / "delta-bob.csv").write_text("id1,x\n2,b\n1,a\n")
+    rows = merge_outputs(output_path, [str(tmp_path / "delta-alice.csv"), str(tmp_path / "delta-bob.csv")], ["id1"])
+    assert rows == 2
+    assert open(output_path).read() == "id1,x\n3,c\n1,a\n2,b\n"
+
+    # 参数变化或水位线之前的内容被改写时全量求交
+    assert prepare_delta(input_path, output_path, state_path, "other")["mode"] == "full"
+    (tmp_path / "alice.csv").write_text("id1,x\n9,z\n3,c\n2,b\n4,d\n")
+    assert prepare_delta(input_path, output_path, state_path, "d")["mode"] == "full"
+
+
+def test_merge_keeps_duplicate_keys_in_base(tmp_path):
+    output_path = str(tmp_path / "psi-output.csv")
+    # 已有输出中求交键重复的行与全量求交一致，合并时不能被删除
+    (tmp_path / "psi-output.csv").write_text("id1,x\n3,c\n3,d\n5,e")
+    (tmp_path / "delta-alice.csv").write_text("id1,x\n6,f\n6,g\n")
+    (tmp_path / "delta-bob.csv").write_text("id1,x\n6,f\n6,g\n7,h\n")
+    rows = merge_outputs(output_path, [str(tmp_path / "delta-alice.csv"), str(tmp_path / "delta-bob.csv")], ["id1"])
+    assert rows == 3
+    assert open(output_path).read() == "id1,x\n3,c\n3,d\n5,e\n6,f\n6,g\n7,h\n"
+    assert not os.path.exists(tmp_path / "delta-bob.csv")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import pandas as pd
+
+from utils.csv_key_util import KEY_DIGEST_COLUMN, join_back, key_digests, project_keys
+
+
+def test_project_and_join_back(tmp_path):
+    alice = pd.DataFrame({"id": [str(i) for i in range(100, 0, -1)], "x": [f"x{i}" for i in range(100)]})
+    alice.to_csv(tmp_path / "alice.csv", index=False)
+    bob = pd.DataFrame({"uid": [str(i) for i in range(50, 150)]})
+    bob.to_csv(tmp_path / "bob.csv", index=False)
+
+    rows = project_keys(str(tmp_path / "alice.csv"), ["id"], "salt", str(tmp_path / "alice.keys.csv"), chunk_size=30)
+    project_keys(str(tmp_path / "bob.csv"), ["uid"], "salt", str(tmp_path / "bob.keys.csv"), chunk_size=30)
+    assert rows == 100
+
+    # 模拟对投影文件按摘要求交
+    alice_keys = pd.read_csv(tmp_path / "alice.keys.csv", dtype={KEY_DIGEST_COLUMN: str})
+    bob_keys = pd.read_csv(tmp_path / "bob.keys.csv", dtype={KEY_DIGEST_COLUMN: str})
+    alice_keys[alice_keys[KEY_DIGEST_COLUMN].isin(bob_keys[KEY_DIGEST_COLUMN])].to_csv(tmp_path / "alice.keys-output.csv", index=False)
+
+    output = str(tmp_path / "psi-output.csv")
+    assert join_back(str(tmp_path / "alice.keys-output.csv"), str(tmp_path / "alice.csv"), output, ["id"], rows) == 51
+    result = pd.read_csv(output, dtype=str)
+    assert list(result.columns) == ["id", "x"]
+    assert list(result["id"]) == sorted(str(i) for i in range(50, 101))
+    assert result.set_index("id").loc["60", "x"] == "x40"
+
+
+def test_composite_key_digests():
+    alice = pd.DataFrame({"name": ["a", "b"], "phone": ["1", "2"]})
+    bob = pd.DataFrame({"n": ["a", "b"], "p": ["1", "3"]})
+    alice_digests = key_digests(alice, "salt")
+    bob_digests = key_digests(bob, "salt")
+    assert all(len(digest) == 32 for digest in alice_digests)
+    assert alice_digests[0] == bob_digests[0]
+    assert alice_digests[1] != bob_digests[1]
+    assert key_digests(alice, "other")[0] != alice_digests[0]
+    # 与直接求交一致，键值按原始字符串比较，首尾空白不同的键不相同
+    assert key_digests(pd.DataFrame({"n": ["a "], "p": ["1"]}), "salt")[0] != alice_digests[0]
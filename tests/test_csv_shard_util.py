@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+import pandas as pd
+import pytest
+
+from utils.cluster_util import get_bucket_ports
+from utils.csv_shard_util import concat_buckets, get_shard_count, run_buckets, split_buckets
+
+
+def test_same_keys_land_in_same_bucket(tmp_path):
+    pd.DataFrame({"id1": [str(i) for i in range(100)], "x": range(100)}).to_csv(tmp_path / "alice.csv", index=False)
+    pd.DataFrame({"id2": [str(i) for i in range(50, 150)]}).to_csv(tmp_path / "bob.csv", index=False)
+    alice = split_buckets(str(tmp_path / "alice.csv"), ["id1"], 4, "salt", str(tmp_path / "alice"), chunk_size=30)
+    bob = split_buckets(str(tmp_path / "bob.csv"), ["id2"], 4, "salt", str(tmp_path / "bob"), chunk_size=30)
+
+    # 各桶分别求交的并集等于全量求交
+    outputs = []
+    for index, (alice_bucket, bob_bucket) in enumerate(zip(alice, bob)):
+        alice_df, bob_df = pd.read_csv(alice_bucket, dtype=str), pd.read_csv(bob_bucket, dtype=str)
+        outputs.append(str(tmp_path / f"output-{index}.csv"))
+        alice_df[alice_df["id1"].isin(bob_df["id2"])].to_csv(outputs[-1], index=False)
+    assert concat_buckets(outputs, str(tmp_path / "psi-output.csv"), ["id1"]) == 50
+    # 多路归并后整体按求交键排序
+    assert list(pd.read_csv(tmp_path / "psi-output.csv", dtype=str)["id1"]) == sorted(str(i) for i in range(50, 100))
+    assert concat_buckets(outputs, str(tmp_path / "unsorted.csv"), ["id1"], sort=False) == 50
+
+
+def test_shard_count():
+    assert get_shard_count({}, local_cluster=True) == 1
+    assert get_shard_count({"sharded": True, "shards": 3}, local_cluster=False) == 3
+    assert get_shard_count({"sharded": True}, local_cluster=True) == (os.cpu_count() or 1)
+    with pytest.raises(ValueError):
+        get_shard_count({"sharded": True}, local_cluster=False)
+
+
+def test_bucket_ports_do_not_overlap():
+    def cluster(*addresses):
+        nodes = [{"party": party, "address": address} for party, address in zip(("alice", "bob"), addresses)]
+        return {"devices": {"spu_config": {"cluster_def": {"nodes": nodes}}}}
+
+    # 单机配置的相邻端口交错使用，第0个桶仍使用配置的端口
+    ports = get_bucket_ports(cluster("127.0.0.1:11666", "127.0.0.1:11667"), 3)
+    assert ports == [{"alice": 11666, "bob": 11667}, {"alice": 11668, "bob": 11669}, {"alice": 11670, "bob": 11671}]
+    # 按块分配的端口和不同主机上的节点直接使用基准端口+桶号
+    assert get_bucket_ports(cluster("127.0.0.1:20000", "127.0.0.1:20003"), 3)[2] == {"alice": 20002, "bob": 20005}
+    assert get_bucket_ports(cluster("10.0.0.1:11666", "10.0.0.2:11667"), 3)[1] == {"alice": 11667, "bob": 11668}
+    with pytest.raises(ValueError):
+        get_bucket_ports(cluster("127.0.0.1:11666", "127.0.0.1:11668"), 3)
+
+
+def test_buckets_run_concurrently():
+    # 每个桶阻塞到所有桶都已开始，串行执行时会超时
+    barrier = threading.Barrier(3, timeout=5)
+    intervals = []
+
+    def bucket(index):
+        start = time.monotonic()
+        barrier.wait()
+        intervals.append((start, time.monotonic()))
+        return {"bucket": index}
+
+    assert run_buckets([lambda index=index: bucket(index) for index in range(3)]) == [{"bucket": 0}, {"bucket": 1}, {"bucket": 2}]
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
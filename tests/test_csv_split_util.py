@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import os
+import pandas as pd
+import pytest
+
+from utils.csv_split_util import (
+    get_fold_path,
+    kfold_intervals,
+    ratio_intervals,
+    resolve_split_sizes,
+    split_rows,
+    split_rows_multi,
+)
+from utils.row_index_util import materialize_table, write_row_index
+
+
+def test_parties_split_identically(tmp_path):
+    ids = [str(i) for i in range(1000)]
+    pd.DataFrame({"id1": ids, "x": range(1000)}).to_csv(tmp_path / "alice.csv", index=False)
+    pd.DataFrame({"id2": [f" {i}" for i in ids], "y": range(1000)}).to_csv(tmp_path / "bob.csv", index=False)
+
+    alice = split_rows(str(tmp_path / "alice.csv"), ["id1"], str(tmp_path / "alice-train.csv"), str(tmp_path / "alice-test.csv"), test_size=0.3, seed=1234, chunk_size=128)
+    bob = split_rows(str(tmp_path / "bob.csv"), ["id2"], str(tmp_path / "bob-train.csv"), str(tmp_path / "bob-test.csv"), test_size=0.3, seed=1234)
+    assert alice == bob
+    assert alice["train_rows"] + alice["test_rows"] == 1000
+    assert 250 < alice["test_rows"] < 350
+
+    alice_train = pd.read_csv(tmp_path / "alice-train.csv")
+    bob_train = pd.read_csv(tmp_path / "bob-train.csv")
+    assert list(alice_train["x"]) == list(bob_train["y"])
+    assert list(alice_train.columns) == ["id1", "x"]
+
+    # 种子不同时划分不同
+    other = split_rows(str(tmp_path / "alice.csv"), ["id1"], str(tmp_path / "o-train.csv"), str(tmp_path / "o-test.csv"), test_size=0.3, seed=1)
+    assert list(pd.read_csv(tmp_path / "o-train.csv")["x"]) != list(alice_train["x"]) or other != alice
+
+
+def test_resolve_split_sizes():
+    assert resolve_split_sizes() == (0.75, 0.25)
+    assert resolve_split_sizes(train_size=0.3) == (0.3, 0.7)
+    assert resolve_split_sizes(0.5, 0.2) == (0.5, 0.2)
+    with pytest.raises(ValueError):
+        resolve_split_sizes(0.8, 0.5)
+
+
+def test_quoted_newlines(tmp_path):
+    pd.DataFrame({"id": [str(i) for i in range(20)], "text": ["a\nb"] * 20}).to_csv(tmp_path / "alice.csv", index=False)
+    counts = split_rows(str(tmp_path / "alice.csv"), ["id"], str(tmp_path / "train.csv"), str(tmp_path / "test.csv"), test_size=0.5, seed=1, chunk_size=7)
+    train, test = pd.read_csv(tmp_path / "train.csv"), pd.read_csv(tmp_path / "test.csv")
+    assert (len(train), len(test)) == (counts["train_rows"], counts["test_rows"])
+    assert sorted(list(train["id"]) + list(test["id"])) == list(range(20))
+    assert set(train["text"]) <= {"a\nb"}
+
+
+def test_kfold_in_one_pass(tmp_path):
+    pd.DataFrame({"id": [str(i) for i in range(500)]}).to_csv(tmp_path / "alice.csv", index=False)
+    outputs = []
+    for fold, (train, test) in enumerate(kfold_intervals(5)):
+        outputs.append((get_fold_path(str(tmp_path / "train.csv"), fold), train))
+        outputs.append((get_fold_path(str(tmp_path / "test.csv"), fold), test))
+    counts = split_rows_multi(str(tmp_path / "alice.csv"), ["id"], outputs, seed=7, chunk_size=64)
+
+    assert os.path.basename(outputs[0][0]) == "train-fold0.csv"
+    test_ids = []
+    for fold in range(5):
+        train = set(pd.read_csv(tmp_path / f"train-fold{fold}.csv")["id"])
+        test = set(pd.read_csv(tmp_path / f"test-fold{fold}.csv")["id"])
+        assert not train & test and len(train | test) == 500
+        assert (counts[2 * fold], counts[2 * fold + 1]) == (len(train), len(test))
+        test_ids += list(test)
+    # 每行恰好出现在一折的测试集中
+    assert sorted(test_ids) == list(range(500))
+
+
+def test_ratio_outputs(tmp_path):
+    pd.DataFrame({"id": [str(i) for i in range(500)]}).to_csv(tmp_path / "alice.csv", index=False)
+    paths = [str(tmp_path / f"part{index}.csv") for index in range(3)]
+    counts = split_rows_multi(str(tmp_path / "alice.csv"), ["id"], list(zip(paths, ratio_intervals([0.6, 0.2, 0.1]))), seed=7)
+    assert counts == [len(pd.read_csv(path)) for path in paths]
+    assert 400 < sum(counts) < 500
+    with pytest.raises(ValueError):
+        ratio_intervals([0.6, 0.6])
+
+
+def test_columnar_split_matches_csv_split(tmp_path):
+    ids = [str(i) for i in range(500)]
+    frame = pd.DataFrame({"id": ids, "x": [i / 7 for i in range(500)]})
+    frame.to_csv(tmp_path / "alice.csv", index=False)
+    frame.to_parquet(tmp_path / "alice.parquet", index=False)
+
+    csv_rows = split_rows(str(tmp_path / "alice.csv"), ["id"], str(tmp_path / "train.csv"), str(tmp_path / "test.csv"), seed=7)
+    # parquet输入写出feather，列类型保持不变，划分与csv一致
+    columnar_rows = split_rows(str(tmp_path / "alice.parquet"), ["id"], str(tmp_path / "train.feather"), str(tmp_path / "test.feather"), seed=7, chunk_size=64)
+    assert columnar_rows == csv_rows
+    train = pd.read_feather(tmp_path / "train.feather")
+    assert train["x"].dtype == "float64"
+    assert list(train["id"]) == [str(value) for value in pd.read_csv(tmp_path / "train.csv")["id"]]
+
+
+def test_sharded_split_matches_single_file(tmp_path):
+    frame = pd.DataFrame({"id": [str(i) for i in range(600)], "x": range(600)})
+    frame.to_csv(tmp_path / "alice.csv", index=False)
+    (tmp_path / "parts").mkdir()
+    for index in range(3):
+        frame.iloc[index * 200:(index + 1) * 200].to_csv(tmp_path / "parts" / f"part-{index}.csv", index=False)
+
+    expected = split_rows(str(tmp_path / "alice.csv"), ["id"], str(tmp_path / "train.csv"), str(tmp_path / "test.csv"), seed=3)
+    # 输出为文件时各分片的结果按顺序合并
+    assert split_rows(str(tmp_path / "parts"), ["id"], str(tmp_path / "s-train.csv"), str(tmp_path / "s-test.csv"), seed=3) == expected
+    for name in ("train", "test"):
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / f"s-{name}.csv"), pd.read_csv(tmp_path / f"{name}.csv"))
+    assert not os.path.exists(tmp_path / "s-train.csv.parts.tmp")
+
+    # 输出为目录时每个输入分片写出一个输出分片，文件名带分片序号
+    outputs = [(f"{tmp_path / 'train'}/", [(0.0, 0.75)]), (f"{tmp_path / 'test'}/", [(0.75, 1.0)])]
+    assert split_rows_multi(str(tmp_path / "parts" / "part-*.csv"), ["id"], outputs, seed=3) == [expected["train_rows"], expected["test_rows"]]
+    assert sorted(os.listdir(tmp_path / "train")) == ["00000-part-0.csv", "00001-part-1.csv", "00002-part-2.csv"]
+    train = pd.concat([pd.read_csv(tmp_path / "train" / f"{index:05d}-part-{index}.csv") for index in range(3)], ignore_index=True)
+    pd.testing.assert_frame_equal(train, pd.read_csv(tmp_path / "train.csv"))
+    assert get_fold_path(f"{tmp_path / 'train'}/", 1) == f"{tmp_path / 'train-fold1'}/"
+    # 输出为目录时按output_format写出各分片
+    outputs = [(f"{tmp_path / 'ptrain'}/", [(0.0, 0.75)]), (f"{tmp_path / 'ptest'}/", [(0.75, 1.0)])]
+    split_rows_multi(str(tmp_path / "parts"), ["id"], outputs, seed=3, output_format="parquet")
+    assert sorted(os.listdir(tmp_path / "ptrain")) == ["00000-part-0.parquet", "00001-part-1.parquet", "00002-part-2.parquet"]
+    train = pd.concat([pd.read_parquet(tmp_path / "ptrain" / f"{index:05d}-part-{index}.parquet") for index in range(3)], ignore_index=True)
+    assert train["x"].tolist() == pd.read_csv(tmp_path / "train.csv")["x"].tolist()
+
+
+def test_glob_shards_with_same_basename_do_not_collide(tmp_path):
+    frame = pd.DataFrame({"id": [str(i) for i in range(400)], "x": range(400)})
+    frame.to_csv(tmp_path / "alice.csv", index=False)
+    for index in range(2):
+        (tmp_path / f"d{index}").mkdir()
+        frame.iloc[index * 200:(index + 1) * 200].to_csv(tmp_path / f"d{index}" / "part-0.csv", index=False)
+
+    expected = split_rows(str(tmp_path / "alice.csv"), ["id"], str(tmp_path / "train.csv"), str(tmp_path / "test.csv"), seed=5)
+    shards = str(tmp_path / "d*" / "part-0.csv")
+    # 输出为文件时两个同名分片的结果都被合并
+    assert split_rows(shards, ["id"], str(tmp_path / "s-train.csv"), str(tmp_path / "s-test.csv"), seed=5) == expected
+    for name in ("train", "test"):
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / f"s-{name}.csv"), pd.read_csv(tmp_path / f"{name}.csv"))
+
+    # 输出为目录时两个同名分片各自写出，行数不丢失
+    outputs = [(f"{tmp_path / 'train'}/", [(0.0, 0.75)]), (f"{tmp_path / 'test'}/", [(0.75, 1.0)])]
+    assert split_rows_multi(shards, ["id"], outputs, seed=5) == [expected["train_rows"], expected["test_rows"]]
+    assert sorted(os.listdir(tmp_path / "train")) == ["00000-part-0.csv", "00001-part-0.csv"]
+    train = pd.concat([pd.read_csv(tmp_path / "train" / name) for name in sorted(os.listdir(tmp_path / "train"))], ignore_index=True)
+    pd.testing.assert_frame_equal(train, pd.read_csv(tmp_path / "train.csv"))
+
+
+def test_row_index_split_matches_materialized(tmp_path):
+    # 行号索引：alice.csv中键倒序，交集行按键排序后输出
+    pd.DataFrame({"id": [str(i) for i in range(200, 0, -1)], "x": range(200)}).to_csv(tmp_path / "alice.csv", index=False)
+    projected_output = str(tmp_path / "alice.keys-output.csv")
+    pd.DataFrame({"key_digest": ["-"] * 100, "row_id": range(0, 200, 2)}).to_csv(projected_output, index=False)
+    output = str(tmp_path / "psi-output.csv")
+    write_row_index(projected_output, str(tmp_path / "alice.csv"), output, ["id"], 200)
+    full_output = materialize_table(output)
+
+    def outputs(prefix):
+        return [(str(tmp_path / f"{prefix}-{i}.csv"), [interval]) for i, interval in enumerate([(0.0, 0.5), (0.5, 1.0)])]
+
+    counts = split_rows_multi(output, ["id"], outputs("view"), seed=3, chunk_size=16)
+    assert counts == split_rows_multi(full_output, ["id"], outputs("full"), seed=3)
+    assert sum(counts) == 100
+    for index in range(2):
+        with open(tmp_path / f"view-{index}.csv", "rb") as view_file, open(tmp_path / f"full-{index}.csv", "rb") as full_file:
+            assert view_file.read() == full_file.read()
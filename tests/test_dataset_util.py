@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import json
+import numpy as np
+import pandas as pd
+
+from utils.dataset_util import get_load_stats, get_schema_path, iter_dataset, load_dataset, reset_load_stats
+
+
+def test_load_dataset_prunes_downcasts_and_caches_schema(tmp_path):
+    path = str(tmp_path / "alice.csv")
+    pd.DataFrame({
+        "id": [f"u{i}" for i in range(100)],
+        "x1": np.linspace(0, 1, 100),
+        "x2": range(100),
+        "x3": np.linspace(1, 2, 100),
+    }).to_csv(path, index=False)
+    reset_load_stats()
+
+    # 不存在的列（例如另一方的标签列）被忽略，列顺序与文件一致
+    data = load_dataset(path, ["x3", "x1", "y"])
+    assert list(data.columns) == ["x1", "x3"]
+    assert data["x1"].dtype == np.float32
+    np.testing.assert_allclose(data["x3"], np.linspace(1, 2, 100), rtol=1e-6)
+    with open(get_schema_path(path), "r", encoding="utf-8") as file:
+        assert json.load(file)["columns"] == {"x1": "float", "x3": "float"}
+
+    # 已记录类型的列直接按记录解析，其他列推断后合并到记录中
+    assert load_dataset(path, ["x1"])["x1"].dtype == np.float32
+    data = load_dataset(path)
+    assert data["x2"].dtype == np.int64 and len(data) == 100
+    assert [stats["schema_cached"] for stats in get_load_stats()] == [False, True, False]
+    assert load_dataset(path, ["id", "x2"])["id"].tolist()[:2] == ["u0", "u1"]
+    assert get_load_stats()[-1]["schema_cached"] and get_load_stats()[-1]["rows"] == 100
+
+    # 文件变化后记录失效
+    pd.DataFrame({"x1": ["a", "b"]}).to_csv(path, index=False)
+    assert load_dataset(path, ["x1"])["x1"].tolist() == ["a", "b"]
+    assert not get_load_stats()[-1]["schema_cached"]
+    reset_load_stats()
+
+
+def test_iter_dataset_matches_load_dataset(tmp_path):
+    path = str(tmp_path / "bob.csv")
+    pd.DataFrame({"x1": np.linspace(0, 1, 25), "x2": range(25), "y": [i % 2 for i in range(25)]}).to_csv(path, index=False)
+    reset_load_stats()
+
+    full = load_dataset(path, ["x1", "x2"])
+    batches = list(iter_dataset(path, ["x2", "x1"], batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert all(batch["x1"].dtype == np.float32 for batch in batches)
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), full)
+    # 全部读取完后记录一次统计，已记录类型的列按记录解析
+    assert get_load_stats()[-1]["rows"] == 25 and get_load_stats()[-1]["schema_cached"]
+    reset_load_stats()
+
+
+def test_iter_dataset_keeps_first_chunk_types(tmp_path):
+    # 后续块的值都像整数时，按块推断会丢掉前导零，各块类型也不一致
+    path = str(tmp_path / "codes.csv")
+    pd.DataFrame({"code": ["x"] + [f"0{i}" for i in range(1, 25)], "v": range(25)}).to_csv(path, index=False)
+    batches = list(iter_dataset(path, batch_size=10))
+    assert all(pd.api.types.is_string_dtype(batch["code"]) and batch["v"].dtype == np.int64 for batch in batches)
+    assert batches[1]["code"].tolist()[0] == "010"
+    reset_load_stats()
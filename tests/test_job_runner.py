@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+from module_admin.service.job_runner import RESULT_MAX_BYTES, summarize_result
+from utils.dataset_util import reset_load_stats
+
+
+def test_summarize_result():
+    reset_load_stats()
+    assert summarize_result("job", {"intersection_count": 42, "original_count": {"alice": 100}}) == {
+        "intersection_count": 42,
+        "original_count": {"alice": 100},
+    }
+    # 模型等非dict返回值和过大的结果不回传
+    assert summarize_result("job", None) is None
+    assert summarize_result("job", [1, 2]) is None
+    assert summarize_result("job", {"rows": "x" * RESULT_MAX_BYTES}) is None
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+from config.env import ExecutorConfig
+from module_admin.service.peer_service import PeerCancelClient, get_peer_operators, rendezvous
+from module_admin.service.rendezvous_service import RendezvousRegistry
+from utils.cluster_util import get_listen_ports
+
+
+SF_CLUSTER_DESC = {
+    "devices": {
+        "spu_config": {
+            "cluster_def": {
+                "nodes": [
+                    {"address": "10.0.0.1:11666", "party": "alice"},
+                    {"address": "10.0.0.2:11667", "party": "bob"},
+                ]
+            }
+        }
+    },
+    "sf_init": {"address": "10.0.0.1:9394", "parties": ["alice", "bob"]},
+}
+
+
+def _start_peer_operator(received):
+    """本地模拟的对端算子服务，记录收到的停止请求"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            url = urlparse(self.path)
+            received.append((url.path, parse_qs(url.query)))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_peer_operators_from_cluster_def(monkeypatch):
+    monkeypatch.setattr(ExecutorConfig, "executor_party", "alice")
+    monkeypatch.setattr(ExecutorConfig, "executor_peer_operators", {})
+    assert get_peer_operators(SF_CLUSTER_DESC) == {"bob": f"http://10.0.0.2:{ExecutorConfig.executor_peer_port}"}
+    assert get_peer_operators({**SF_CLUSTER_DESC, "sf_init": {"address": "local"}}) == {}
+    # 停止任务时只等待本方节点的端口释放
+    assert get_listen_ports(SF_CLUSTER_DESC, "alice") == [11666]
+
+
+def test_cancel_reaches_peer_without_propagation(monkeypatch):
+    received = []
+    server = _start_peer_operator(received)
+    monkeypatch.setattr(ExecutorConfig, "executor_party", "alice")
+    monkeypatch.setattr(ExecutorConfig, "executor_peer_operators", {"bob": f"http://127.0.0.1:{server.server_port}"})
+    try:
+        assert PeerCancelClient(timeout=1).cancel("psi3", SF_CLUSTER_DESC) == {"bob": True}
+    finally:
+        server.shutdown()
+    assert received == [("/operator/stop_job", {"job_uids": ["psi3"], "propagate": ["false"]})]
+
+
+def test_rendezvous_waits_for_all_parties():
+    registry = RendezvousRegistry()
+    registry.arrive("psi3", "alice")
+    assert not asyncio.run(registry.wait("psi3", "alice", ["alice", "bob"], timeout=0.05))
+
+    # 其他线程登记时唤醒事件循环中的等待
+    threading.Timer(0.1, registry.arrive, args=("psi3", "bob")).start()
+    assert asyncio.run(registry.wait("psi3", "alice", ["alice", "bob"], timeout=2))
+    assert registry.get_wait_ms("psi3") >= 100
+    assert registry._waiters == {}
+
+
+def test_rendezvous_timeout_fails_job(monkeypatch):
+    monkeypatch.setattr(ExecutorConfig, "executor_party", "alice")
+    monkeypatch.setattr(ExecutorConfig, "executor_rendezvous_enabled", True)
+    monkeypatch.setattr(ExecutorConfig, "executor_rendezvous_timeout", 0)
+    monkeypatch.setattr(ExecutorConfig, "executor_peer_cancel_timeout", 0.2)
+    # 对端没有登记端口时不能继续使用配置中的端口
+    monkeypatch.setattr(ExecutorConfig, "executor_peer_operators", {"bob": "http://127.0.0.1:9"})
+    with pytest.raises(TimeoutError):
+        rendezvous("psi4", SF_CLUSTER_DESC)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import socket
+import pytest
+
+from utils.cluster_util import assign_node_ports, get_node_ports
+from utils.port_util import PortAllocator
+
+
+def _free_port_range(size):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        start = sock.getsockname()[1]
+    return start, start + size - 1
+
+
+def test_allocator_leases_distinct_ports_until_released():
+    start, end = _free_port_range(3)
+    allocator = PortAllocator(start, end)
+    first = allocator.lease("job1", 2)
+    second = allocator.lease("job2", 1)
+    assert len(set(first + second)) == 3
+    with pytest.raises(RuntimeError):
+        allocator.lease("job3", 1)
+    assert allocator.release("job1") == first
+    assert len(allocator.lease("job3", 2)) == 2
+
+
+def test_assign_node_ports_rewrites_copy():
+    sf_cluster_desc = {
+        "devices": {
+            "spu_config": {
+                "cluster_def": {
+                    "nodes": [
+                        {"address": "127.0.0.1:11666", "listen_address": "0.0.0.0:11666", "party": "alice"},
+                        {"address": "127.0.0.1:11667", "listen_address": "0.0.0.0:11667", "party": "bob"},
+                    ]
+                }
+            }
+        }
+    }
+    rewritten = assign_node_ports(sf_cluster_desc, {"bob": 20001})
+    assert get_node_ports(rewritten) == {"alice": 11666, "bob": 20001}
+    assert rewritten["devices"]["spu_config"]["cluster_def"]["nodes"][1]["listen_address"] == "0.0.0.0:20001"
+    assert get_node_ports(sf_cluster_desc) == {"alice": 11666, "bob": 11667}
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+import pytest
+
+from module_task.registry import _normalize_target, resolve_operator
+
+
+def test_resolve_registered_operator():
+    function = resolve_operator("job")
+    assert function.__module__ == "module_task.scheduler_test"
+    # 兼容旧的点分路径写法，且命中同一个缓存结果
+    assert resolve_operator("module_task.scheduler_test.job") is function
+
+
+def test_reject_unknown_operator():
+    with pytest.raises(ValueError):
+        resolve_operator("module_task.scheduler_test.not_exists")
+    # 点分路径必须与算子所在模块一致
+    for target in ("anything.evil.job", "module_task.psi.job", ".job"):
+        with pytest.raises(ValueError):
+            resolve_operator(target)
+
+
+
+def test_package_export_target():
+    # 原module_task包中导出的psi_csv仍可通过包级路径调用（psi模块依赖secretflow，这里只检查路径解析）
+    assert _normalize_target("module_task.psi_csv") == "psi_csv"
+    assert _normalize_target("module_task.split") is None
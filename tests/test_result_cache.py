@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import json
+import os
+
+from config.env import ExecutorConfig
+from module_admin.service.job_runner import execute_job
+from module_admin.service.result_cache import ResultCache
+from module_task import registry
+
+calls = []
+
+
+def fake_intersect(sf_node_eval_param):
+    calls.append(sf_node_eval_param)
+    with open(sf_node_eval_param["input_path"]["alice"]) as file:
+        rows = file.read().splitlines()
+    with open(sf_node_eval_param["output_path"]["alice"], "w") as file:
+        file.write("\n".join(rows[:2]) + "\n")
+
+
+def test_cache_hit_skips_operator(tmp_path, monkeypatch):
+    monkeypatch.setattr(ExecutorConfig, "executor_result_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(ExecutorConfig, "executor_result_cache_max_bytes", 1 << 20)
+    monkeypatch.setitem(registry._OPERATORS, "fake_intersect", fake_intersect)
+    monkeypatch.setitem(registry.CACHEABLE_OPERATORS, "fake_intersect", {"inputs": ["input_path"], "outputs": ["output_path"]})
+    (tmp_path / "alice.csv").write_text("id\n1\n2\n3\n")
+
+    def param(output_name):
+        return {
+            "input_path": {"alice": str(tmp_path / "alice.csv")},
+            "output_path": {"alice": str(tmp_path / output_name)},
+            "receiver": "alice",
+        }
+
+    execute_job("job1", fake_intersect, [], {"sf_node_eval_param": param("out1.csv")})
+    # 输出路径不同但输入内容相同，直接恢复缓存结果；结果中记录输出的格式
+    result = execute_job("job2", fake_intersect, [], {"sf_node_eval_param": param("out2.csv")})
+    assert result == {"output_formats": {"output_path.alice": "csv"}}
+    assert len(calls) == 1
+    assert (tmp_path / "out2.csv").read_text() == "id\n1\n"
+
+    manifest = json.loads(next((tmp_path / "cache").glob("*/manifest.json")).read_text())
+    assert manifest["outputs"]["output_path.alice"]["rows"] == 1
+
+    # 输入追加后缓存键变化，重新计算
+    (tmp_path / "alice.csv").write_text("id\n0\n1\n2\n3\n")
+    execute_job("job3", fake_intersect, [], {"sf_node_eval_param": param("out3.csv")})
+    assert len(calls) == 2
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+    for key in ("old", "new"):
+        output = tmp_path / f"{key}.csv"
+        output.write_text("id\n1\n")
+        cache.store(key, "fake_intersect", {"output_path": str(output)})
+        os.utime(tmp_path / "cache" / key / "manifest.json", (0, 0) if key == "old" else None)
+
+    # 容量只够保留一个条目，淘汰最久未访问的条目
+    cache.max_bytes = sum(entry.stat().st_size for entry in os.scandir(tmp_path / "cache" / "new"))
+    cache.evict()
+    assert cache.lookup("old") is None
+    assert cache.lookup("new") is not None
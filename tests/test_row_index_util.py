@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import os
+import pandas as pd
+import pytest
+
+from utils.csv_key_util import KEY_DIGEST_COLUMN, join_back, project_keys
+from utils.row_index_util import get_index_path, materialize_table, read_table, write_row_index
+
+
+def _intersect(tmp_path):
+    """对投影文件按摘要求交，模拟psi_csv在投影文件上的输出"""
+    pd.DataFrame({"id": [str(i) for i in range(100, 0, -1)], "x": range(100)}).to_csv(tmp_path / "alice.csv", index=False)
+    pd.DataFrame({"uid": [str(i) for i in range(50, 150)]}).to_csv(tmp_path / "bob.csv", index=False)
+    rows = project_keys(str(tmp_path / "alice.csv"), ["id"], "salt", str(tmp_path / "alice.keys.csv"))
+    project_keys(str(tmp_path / "bob.csv"), ["uid"], "salt", str(tmp_path / "bob.keys.csv"))
+    alice_keys = pd.read_csv(tmp_path / "alice.keys.csv", dtype={KEY_DIGEST_COLUMN: str})
+    bob_keys = pd.read_csv(tmp_path / "bob.keys.csv", dtype={KEY_DIGEST_COLUMN: str})
+    projected_output = str(tmp_path / "alice.keys-output.csv")
+    alice_keys[alice_keys[KEY_DIGEST_COLUMN].isin(bob_keys[KEY_DIGEST_COLUMN])].to_csv(projected_output, index=False)
+    return projected_output, rows
+
+
+def test_index_view_matches_full_output(tmp_path):
+    projected_output, rows = _intersect(tmp_path)
+    full_output = str(tmp_path / "full.csv")
+    join_back(projected_output, str(tmp_path / "alice.csv"), full_output, ["id"], rows)
+
+    output = str(tmp_path / "psi-output.csv")
+    pd.DataFrame({"stale": [1]}).to_csv(output, index=False)
+    assert write_row_index(projected_output, str(tmp_path / "alice.csv"), output, ["id"], rows) == 51
+    assert not os.path.exists(output) and os.path.isfile(get_index_path(output))
+
+    pd.testing.assert_frame_equal(read_table(output), pd.read_csv(full_output))
+    materialized = materialize_table(output)
+    assert materialized != output
+    pd.testing.assert_frame_equal(pd.read_csv(materialized), pd.read_csv(full_output))
+    # 普通csv文件原样读取
+    assert materialize_table(full_output) == full_output
+
+
+def test_index_view_rejects_changed_source(tmp_path):
+    projected_output, rows = _intersect(tmp_path)
+    output = str(tmp_path / "psi-output.csv")
+    write_row_index(projected_output, str(tmp_path / "alice.csv"), output, ["id"], rows)
+    with open(tmp_path / "alice.csv", "a") as file:
+        file.write("999,999\n")
+    with pytest.raises(ValueError):
+        read_table(output)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+from module_admin.service.scoring_service import ScoringService
+from utils.port_util import PortAllocator
+
+
+SF_CLUSTER_DESC = {"devices": {}, "sf_init": {"address": "local", "parties": ["alice", "bob"]}}
+
+
+def _fake_worker_main(sf_cluster_desc, max_models, conn):
+    """模拟评分进程：预测值为各方特征之和"""
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        _, frames = message
+        conn.send((True, np.asarray(sum(frame.sum(axis=1) for frame in frames.values()))))
+
+
+def test_concurrent_requests_share_micro_batches(tmp_path):
+    model_path = tmp_path / "model"
+    model_path.write_bytes(b"model")
+    service = ScoringService(
+        max_sessions=1,
+        max_models=1,
+        batch_window_ms=200,
+        max_batch_rows=1000,
+        idle_timeout=600,
+        mp_context=multiprocessing.get_context("fork"),
+        worker_main=_fake_worker_main,
+    )
+
+    def score(index):
+        features = {
+            "alice": [{"x1": index, "x2": row} for row in range(index % 3 + 1)],
+            "bob": [{"x3": 100} for _ in range(index % 3 + 1)],
+        }
+        return service.score(SF_CLUSTER_DESC, str(model_path), features, timeout=10)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(score, range(8)))
+        # 每个请求拿到自己的预测结果
+        for index, result in enumerate(results):
+            assert result["predictions"] == [index + row + 100 for row in range(index % 3 + 1)]
+        status = service.get_status()
+        assert len(status) == 1 and status[0]["requests"] == 8 and status[0]["batches"] < 8
+        assert max(result["batch_requests"] for result in results) > 1
+
+        with pytest.raises(ValueError):
+            service.score(SF_CLUSTER_DESC, str(model_path), {"alice": [{"x1": 1}], "bob": []})
+        with pytest.raises(ValueError):
+            service.score({**SF_CLUSTER_DESC, "sf_init": {"address": "10.0.0.1:9394"}}, str(model_path), {"alice": [{"x1": 1}]})
+    finally:
+        service.shutdown()
+
+
+def _wedged_worker_main(sf_cluster_desc, max_models, conn):
+    """模拟预测卡住的评分进程"""
+    os.setsid()
+    conn.recv()
+    time.sleep(60)
+
+
+def test_wedged_predict_kills_worker_before_releasing_ports(tmp_path):
+    model_path = tmp_path / "model"
+    model_path.write_bytes(b"model")
+    nodes = [{"party": "alice", "address": "127.0.0.1:11666"}, {"party": "bob", "address": "127.0.0.1:11667"}]
+    sf_cluster_desc = {**SF_CLUSTER_DESC, "devices": {"spu_config": {"cluster_def": {"nodes": nodes}}}}
+    allocator = PortAllocator(42000, 42100)
+    service = ScoringService(
+        max_sessions=1,
+        max_models=1,
+        batch_window_ms=0,
+        max_batch_rows=1000,
+        idle_timeout=600,
+        mp_context=multiprocessing.get_context("fork"),
+        port_allocator=allocator,
+        worker_main=_wedged_worker_main,
+        predict_timeout=0.3,
+    )
+    try:
+        with pytest.raises(TimeoutError):
+            service.score(sf_cluster_desc, str(model_path), {"alice": [{"x1": 1}], "bob": [{"x3": 1}]}, timeout=10)
+        # 评分进程被结束后才归还端口
+        assert allocator._next > 42000
+        deadline = time.time() + 10
+        while allocator._leases and time.time() < deadline:
+            time.sleep(0.05)
+        assert not allocator._leases
+        assert service.get_status() == []
+    finally:
+        service.shutdown()
+
+
+def test_eviction_between_lookup_and_enqueue_does_not_strand_request(tmp_path, monkeypatch):
+    model_path = tmp_path / "model"
+    model_path.write_bytes(b"model")
+    service = ScoringService(
+        max_sessions=1,
+        max_models=1,
+        batch_window_ms=0,
+        max_batch_rows=1000,
+        idle_timeout=0,
+        mp_context=multiprocessing.get_context("fork"),
+        worker_main=_fake_worker_main,
+        predict_timeout=10,
+    )
+    features = {"alice": [{"x1": 1}], "bob": [{"x3": 2}]}
+    get_session = service._get_session
+    evictors = []
+
+    def get_session_then_evict(sf_cluster_desc):
+        # 查找到评分进程后，回收线程尝试在请求入队之前回收它
+        session = get_session(sf_cluster_desc)
+        evictor = threading.Thread(target=service.evict_idle)
+        evictor.start()
+        evictors.append(evictor)
+        time.sleep(0.2)
+        return session
+
+    try:
+        assert service.score(SF_CLUSTER_DESC, str(model_path), features, timeout=10)["predictions"] == [3]
+        monkeypatch.setattr(service, "_get_session", get_session_then_evict)
+        # 请求排在回收标记之前，仍由原评分进程处理，而不是等到超时
+        assert service.score(SF_CLUSTER_DESC, str(model_path), features, timeout=5)["predictions"] == [3]
+        for evictor in evictors:
+            evictor.join(timeout=5)
+            assert not evictor.is_alive()
+    finally:
+        service.shutdown()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import os
+import pandas as pd
+import pytest
+
+from utils.dataset_util import iter_dataset, load_dataset, reset_load_stats
+from utils.path_util import modify_path, with_output_formats
+from utils.table_format_util import (
+    csv_staging_path,
+    finalize_table,
+    get_table_format,
+    is_sharded,
+    iter_tables,
+    list_shards,
+    materialize_csv,
+    read_arrow_table,
+    read_column_names,
+    with_format_extension,
+)
+
+
+def test_format_by_extension():
+    assert get_table_format("a/psi-output.parquet") == "parquet"
+    assert get_table_format("a/psi-output.ARROW") == "feather"
+    assert get_table_format("a/psi-output.txt") == "csv"
+    assert with_format_extension("a/psi-output.csv", "feather") == "a/psi-output.feather"
+    assert with_format_extension("a/psi-output.csv", None) == "a/psi-output.csv"
+    with pytest.raises(ValueError):
+        with_format_extension("a/psi-output.csv", "orc")
+    assert modify_path({"alice": "psi-output.csv"}, "parquet")["alice"].endswith(os.path.join("alice", "psi-output.parquet"))
+    entries = with_output_formats([{"ids": "psi-output", "output_path": {"alice": "a.parquet", "bob": "b.csv"}}])
+    assert entries[0]["format"] == {"alice": "parquet", "bob": "csv"}
+    # 指定output_format时与算子实际写出的文件一致
+    entries = with_output_formats([{"ids": "psi-output", "output_path": {"alice": "a.csv"}}], "feather")
+    assert entries[0]["output_path"] == {"alice": "a.feather"} and entries[0]["format"] == {"alice": "feather"}
+
+
+def test_staging_and_batches_across_formats(tmp_path):
+    frame = pd.DataFrame({"id": [f"u{i}" for i in range(25)], "x": [i / 4 for i in range(25)]})
+    staging = csv_staging_path(str(tmp_path / "out.parquet"))
+    frame.to_csv(staging, index=False)
+    assert finalize_table(staging, str(tmp_path / "out.parquet")) == str(tmp_path / "out.parquet")
+    assert not os.path.exists(staging)
+    assert read_column_names(str(tmp_path / "out.parquet")) == ["id", "x"]
+
+    # 不同格式按相同的行数分块
+    frame.to_feather(tmp_path / "out.feather")
+    for path in ("out.parquet", "out.feather"):
+        assert [table.num_rows for table in iter_tables(str(tmp_path / path), batch_size=10)] == [10, 10, 5]
+    materialized = materialize_csv(str(tmp_path / "out.feather"))
+    pd.testing.assert_frame_equal(pd.read_csv(materialized), frame)
+
+    reset_load_stats()
+    data = load_dataset(str(tmp_path / "out.parquet"), ["x", "y"])
+    assert list(data.columns) == ["x"] and data["x"].dtype == "float32"
+    batches = list(iter_dataset(str(tmp_path / "out.feather"), ["x"], batch_size=10))
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), data)
+    reset_load_stats()
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_columnar_round_trip_keeps_csv_bytes(tmp_path, extension):
+    # 前导零的ID和空字符串经过列式格式再转换回csv后不变，数值列保留数值类型
+    content = b"id,name,x,n\n007,a,1.5,1\n010,,2.0,\n100,\"b,c\",,3\n"
+    staging = csv_staging_path(str(tmp_path / f"out{extension}"))
+    with open(staging, "wb") as file:
+        file.write(content)
+    output = finalize_table(staging, str(tmp_path / f"out{extension}"))
+    types = {field.name: str(field.type) for field in read_arrow_table(output).schema}
+    assert types == {"id": "string", "name": "string", "x": "double", "n": "int64"}
+    with open(materialize_csv(output, str(tmp_path)), "rb") as file:
+        assert file.read() == content
+
+
+def test_sharded_dataset(tmp_path):
+    frame = pd.DataFrame({"id": [f"u{i}" for i in range(30)], "x": [i / 4 for i in range(30)]})
+    shard_dir = tmp_path / "alice"
+    shard_dir.mkdir()
+    # 文件名按数字排序，_SUCCESS、隐藏文件和列类型记录不作为分片
+    for index, start in ((10, 20), (2, 10), (1, 0)):
+        frame.iloc[start:start + 10].to_csv(shard_dir / f"part-{index}.csv", index=False)
+    (shard_dir / "_SUCCESS").write_text("")
+    (shard_dir / "part-1.csv.schema.json").write_text("{}")
+    assert [os.path.basename(path) for path in list_shards(str(shard_dir))] == ["part-1.csv", "part-2.csv", "part-10.csv"]
+    assert list_shards(str(shard_dir / "part-*.csv")) == list_shards(str(shard_dir))
+    with pytest.raises(FileNotFoundError):
+        list_shards(str(tmp_path / "missing-*.csv"))
+    # 文件名中含通配符字符的已有文件按字面路径读取
+    literal = tmp_path / "scores[2024].csv"
+    frame.to_csv(literal, index=False)
+    assert not is_sharded(str(literal)) and list_shards(str(literal)) == [str(literal)]
+
+    reset_load_stats()
+    expected = frame.astype({"x": "float32"})
+    pd.testing.assert_frame_equal(load_dataset(str(shard_dir)), expected)
+    batches = list(iter_dataset(str(shard_dir / "part-*.csv"), batch_size=7))
+    assert [len(batch) for batch in batches] == [7, 7, 7, 7, 2]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), expected)
+    reset_load_stats()
+
+    # 只能读取单个csv的步骤使用拼接后的文件，写在工作目录中，并发的任务各自使用不同的文件
+    work_dir = str(tmp_path / "work")
+    materialized = materialize_csv(str(shard_dir), work_dir)
+    pd.testing.assert_frame_equal(pd.read_csv(materialized), frame)
+    assert os.path.dirname(materialized) == work_dir
+    assert materialize_csv(str(shard_dir), work_dir) != materialized
+    assert csv_staging_path(str(tmp_path / "out.parquet")) != csv_staging_path(str(tmp_path / "out.parquet"))
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import itertools
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+import psutil
+import pytest
+
+from config.env import ExecutorConfig
+from module_admin.service.rendezvous_service import RendezvousRegistry
+from module_admin.service.task_service import ProcessManager
+
+
+class _RecordingDispatcher:
+    """记录回调通知，不发送请求"""
+
+    def __init__(self):
+        self.payloads = []
+
+    def submit(self, url, payload):
+        self.payloads.append(payload)
+
+
+def _record(path, name):
+    """任务：追加任务名，用于检查启动顺序"""
+    with open(path, "a") as f:
+        f.write(f"{name}\n")
+
+
+def _record_until_released(path, name, release_path):
+    """任务：记录启动后等待放行"""
+    _record(path, name)
+    while not os.path.exists(release_path):
+        time.sleep(0.01)
+
+
+def _wait_until(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.02)
+
+
+def _read_names(path):
+    return path.read_text().split() if path.exists() else []
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """独立于服务单例的进程管理器，不启用常驻执行器、端口分配和评分服务"""
+    monkeypatch.setattr(ExecutorConfig, "executor_max_parallelism", 1)
+    manager = object.__new__(ProcessManager)
+    manager._running_processes = {}
+    manager._queued_jobs = {}
+    manager._pending_jobs = []
+    manager._submit_seq = itertools.count()
+    manager._launching_jobs = {}
+    manager._finished_jobs = OrderedDict()
+    manager._lock = threading.RLock()
+    manager._launch_condition = threading.Condition(manager._lock)
+    manager._callback_dispatcher = _RecordingDispatcher()
+    manager.rendezvous_registry = RendezvousRegistry()
+    manager._mp_context = multiprocessing.get_context("fork")
+    # 周期维护间隔远大于任务耗时，任务结束只能由sentinel唤醒监控线程发现
+    manager._housekeeping_interval = 60
+    yield manager
+    manager._monitor_running = False
+    with manager._lock:
+        processes = [info["process"] for info in manager._running_processes.values()]
+    for process in processes:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.join(timeout=5)
+    if manager._wakeup_writer is not None:
+        os.write(manager._wakeup_writer, b"\0")
+
+
+def _start(manager):
+    manager._start_monitor()
+    manager._start_launcher()
+
+
+def test_queue_orders_by_priority_then_fifo(manager, tmp_path):
+    order_path = tmp_path / "order"
+    for name, priority in [("a", 0), ("b", 5), ("c", 0), ("d", 5)]:
+        queued = manager.start_process(name, _record, args=[str(order_path), name], priority=priority)
+        assert queued["status"] == "queued"
+    assert [manager.get_queue_position(name) for name in "abcd"] == [3, 1, 4, 2]
+
+    # 并发上限为1，启动顺序即执行顺序
+    _start(manager)
+    _wait_until(lambda: len(manager._finished_jobs) == 4)
+    assert _read_names(order_path) == ["b", "d", "a", "c"]
+
+
+def test_cancelled_job_is_skipped_and_can_be_resubmitted(manager, tmp_path):
+    order_path = tmp_path / "order"
+    manager.start_process("a", _record, args=[str(order_path), "first"], priority=5)
+    manager.start_process("b", _record, args=[str(order_path), "b"])
+    assert manager.terminate_job("a")["success"]
+    assert manager.get_process_info("a") is None
+    assert manager.get_queue_position("b") == 1
+    # 取消只做惰性删除，堆中仍保留旧条目
+    assert len(manager._pending_jobs) == 2
+
+    # 以相同job_uid重新提交，按新的优先级和提交顺序排队，旧条目不再匹配
+    manager.start_process("a", _record, args=[str(order_path), "second"])
+    assert manager.get_queue_position("a") == 2
+
+    _start(manager)
+    _wait_until(lambda: len(manager._finished_jobs) == 2)
+    assert _read_names(order_path) == ["b", "second"]
+    assert manager._pending_jobs == []
+
+
+def test_running_jobs_bounded_by_max_parallelism(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(ExecutorConfig, "executor_max_parallelism", 2)
+    order_path = tmp_path / "order"
+    release_path = tmp_path / "release"
+    for name in "abcd":
+        manager.start_process(name, _record_until_released, args=[str(order_path), name, str(release_path)])
+    _start(manager)
+
+    _wait_until(lambda: len(_read_names(order_path)) == 2)
+    time.sleep(0.3)
+    with manager._lock:
+        assert len(manager._running_processes) == 2
+        assert sorted(manager._queued_jobs) == ["c", "d"]
+    assert _read_names(order_path) == ["a", "b"]
+
+    release_path.touch()
+    _wait_until(lambda: len(manager._finished_jobs) == 4)
+    assert sorted(_read_names(order_path)) == ["a", "b", "c", "d"]
+    assert all(finished["status"] == "completed" for finished in manager._finished_jobs.values())
+
+
+def _return_rows(rows):
+    """任务：返回结果摘要"""
+    return {"rows": rows}
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def test_monitor_reaps_exited_jobs_from_sentinels(manager):
+    _start(manager)
+    start = time.time()
+    manager.start_process("ok", _return_rows, args=[3])
+    manager.start_process("bad", _fail)
+    _wait_until(lambda: len(manager._finished_jobs) == 2)
+    # 周期维护间隔为60秒，任务结束由sentinel立即唤醒监控线程
+    assert time.time() - start < 10
+
+    ok = manager.get_finished_job("ok")
+    assert ok["status"] == "completed" and ok["exit_code"] == 0 and ok["result"] == {"rows": 3}
+    bad = manager.get_finished_job("bad")
+    assert bad["status"] == "failed" and bad["exit_code"] != 0 and bad["result"] is None
+    assert manager.get_all_processes() == {}
+    assert len(manager._selector.get_map()) == 1  # 只剩唤醒管道
+    assert manager._callback_dispatcher.payloads == [
+        {"job_uid": "ok", "success": True, "result": {"rows": 3}},
+        {"job_uid": "bad", "success": False},
+    ]
+
+
+class _BrokenContext:
+    """进程无法启动的启动上下文"""
+
+    def Pipe(self, duplex=True):
+        return multiprocessing.Pipe(duplex)
+
+    def Process(self, target, args):
+        raise OSError("fork failed")
+
+
+def test_launch_failure_is_recorded_before_callback(manager):
+    manager._mp_context = _BrokenContext()
+    _start(manager)
+    manager.start_process("job", _return_rows, args=[1])
+    _wait_until(lambda: manager._callback_dispatcher.payloads)
+
+    finished = manager.get_finished_job("job")
+    assert finished["status"] == "failed" and "fork failed" in finished["result"]["error"]
+    assert manager._callback_dispatcher.payloads == [
+        {"job_uid": "job", "success": False, "result": finished["result"]}
+    ]
+    assert manager.get_process_info("job") is None
+
+
+def test_submit_returns_while_slots_are_busy(manager, tmp_path):
+    order_path = tmp_path / "order"
+    release_path = tmp_path / "release"
+    _start(manager)
+    manager.start_process("busy", _record_until_released, args=[str(order_path), "busy", str(release_path)])
+    _wait_until(lambda: _read_names(order_path) == ["busy"])
+
+    # 名额已满时提交立即返回排队信息，不等待进程启动
+    start = time.time()
+    queued = manager.start_process("next", _record, args=[str(order_path), "next"])
+    assert time.time() - start < 1
+    assert queued["status"] == "queued" and manager.get_queue_position("next") == 1
+    with pytest.raises(ValueError):
+        manager.start_process("next", _record, args=[str(order_path), "next"])
+
+    release_path.touch()
+    _wait_until(lambda: len(manager._finished_jobs) == 2)
+    assert _read_names(order_path) == ["busy", "next"]
+
+
+_ORPHAN_CODE = """
+import os, signal, sys, time
+signal.signal(signal.SIGTERM, signal.SIG_IGN)
+if os.fork() == 0:
+    with open(sys.argv[1], "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+"""
+
+
+def _ignore_sigterm(pid_path):
+    """任务：忽略SIGTERM，并留下一个脱离父子关系、仍在进程组中的孙进程"""
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    subprocess.run([sys.executable, "-c", _ORPHAN_CODE, pid_path], check=True)
+    time.sleep(60)
+
+
+def _is_gone(pid):
+    try:
+        return psutil.Process(pid).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def test_stop_escalates_to_sigkill_on_process_group(manager, tmp_path):
+    pid_path = tmp_path / "orphan.pid"
+    _start(manager)
+    manager.start_process("job", _ignore_sigterm, args=[str(pid_path)])
+    _wait_until(lambda: pid_path.exists() and pid_path.read_text())
+    orphan_pid = int(pid_path.read_text())
+    process = manager.get_process_info("job")["process"]
+    assert os.getpgid(orphan_pid) == process.pid
+
+    start = time.time()
+    result = manager.terminate_job("job", timeout=0.5)
+    assert result["success"]
+    # SIGTERM被忽略，等待超时后升级为SIGKILL
+    assert time.time() - start >= 0.5
+    finished = manager.get_finished_job("job")
+    assert finished["status"] == "stopped" and finished["exit_code"] == -signal.SIGKILL
+    # 孙进程不是任务进程的子孙，只能由进程组信号终止
+    _wait_until(lambda: _is_gone(orphan_pid), timeout=5)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import os
+
+from utils.ub_psi_cache_util import (
+    client_cache_state,
+    commit_client_cache,
+    commit_server_cache,
+    server_cache_state,
+)
+
+
+def _generate_cache(state):
+    with open(state["cache_path"], "w") as file:
+        file.write("cache")
+
+
+def test_server_cache_versions(tmp_path):
+    input_path = tmp_path / "bob.csv"
+    input_path.write_text("id\n1\n2\n")
+    cache_root = str(tmp_path / "cache")
+
+    state = server_cache_state(str(input_path), cache_root, "digest")
+    assert not state["ready"]
+    assert os.path.getsize(state["secret_key_path"]) == 32
+    _generate_cache(state)
+    commit_server_cache(cache_root, state)
+    assert server_cache_state(str(input_path), cache_root, "digest")["ready"]
+    # 参数变化或大表变化后需要重新生成，生成后旧版本被删除
+    assert not server_cache_state(str(input_path), cache_root, "other")["ready"]
+    input_path.write_text("id\n1\n2\n3\n")
+    new_state = server_cache_state(str(input_path), cache_root, "digest")
+    assert not new_state["ready"] and new_state["version"] != state["version"]
+    _generate_cache(new_state)
+    commit_server_cache(cache_root, new_state)
+    assert sorted(os.listdir(cache_root)) == sorted([new_state["version"], "version.json"])
+
+
+def test_client_cache_versions(tmp_path):
+    cache_root = str(tmp_path / "cache")
+    state = client_cache_state(cache_root, "v1")
+    assert not state["ready"]
+    with open(state["preprocess_path"], "w") as file:
+        file.write("preprocess")
+    commit_client_cache(cache_root, "v1")
+    assert client_cache_state(cache_root, "v1")["ready"]
+    assert not client_cache_state(cache_root, "v2")["ready"]
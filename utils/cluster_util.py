@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+__all__ = [
+    "cluster_fingerprint",
+    "get_spu_nodes",
+    "split_address",
+    "get_listen_ports",
+    "is_local_cluster",
+    "get_node_ports",
+    "assign_node_ports",
+    "get_bucket_ports",
+]
+
+
+def cluster_fingerprint(sf_cluster_desc: Dict) -> str:
+    """
+    计算集群配置指纹，相同指纹的任务可以复用同一个SecretFlow运行时
+
+    :param sf_cluster_desc: SecretFlow集群配置，包含devices和sf_init
+    :return: 配置内容的sha256摘要
+    """
+    content = json.dumps(sf_cluster_desc or {}, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_spu_nodes(sf_cluster_desc: Dict) -> List[Dict]:
+    """
+    获取SPU集群的节点列表
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :return: cluster_def.nodes，未配置SPU时返回空列表
+    """
+    spu_config = (sf_cluster_desc or {}).get("devices", {}).get("spu_config") or {}
+    return spu_config.get("cluster_def", {}).get("nodes", [])
+
+
+def split_address(address: str) -> Tuple[str, int]:
+    """
+    拆分host:port形式的地址
+
+    :param address: 地址，例如127.0.0.1:11666
+    :return: (host, port)
+    """
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+def get_listen_ports(sf_cluster_desc: Dict, party: Optional[str] = None) -> List[int]:
+    """
+    获取SPU节点监听的端口
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :param party: 只取该参与方节点的端口，为空时取全部节点
+    :return: 监听端口列表
+    """
+    ports = []
+    for node in get_spu_nodes(sf_cluster_desc):
+        if party is not None and node.get("party") != party:
+            continue
+        address = node.get("listen_address") or node.get("address")
+        if address:
+            ports.append(split_address(address)[1])
+    return ports
+
+
+def is_local_cluster(sf_cluster_desc: Dict) -> bool:
+    """
+    是否为单机模拟模式，全部参与方在同一进程内运行
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :return: sf_init.address是否为local
+    """
+    return ((sf_cluster_desc or {}).get("sf_init") or {}).get("address") == "local"
+
+
+def get_node_ports(sf_cluster_desc: Dict) -> Dict[str, int]:
+    """
+    获取各参与方SPU节点的端口
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :return: 参与方与端口的映射
+    """
+    return {
+        node["party"]: split_address(node["address"])[1]
+        for node in get_spu_nodes(sf_cluster_desc)
+        if node.get("party") and node.get("address")
+    }
+
+
+def assign_node_ports(sf_cluster_desc: Dict, ports: Dict[str, int]) -> Dict:
+    """
+    改写指定参与方SPU节点的端口，address和listen_address同时改写
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :param ports: 参与方与新端口的映射
+    :return: 改写后的集群配置副本，原配置不变
+    """
+    sf_cluster_desc = copy.deepcopy(sf_cluster_desc)
+    for node in get_spu_nodes(sf_cluster_desc):
+        port = ports.get(node.get("party"))
+        if port is None:
+            continue
+        for key in ("address", "listen_address"):
+            if node.get(key):
+                host, _ = split_address(node[key])
+                node[key] = f"{host}:{port}"
+    return sf_cluster_desc
+
+
+def get_bucket_ports(sf_cluster_desc: Dict, shards: int) -> List[Dict[str, int]]:
+    """
+    分桶求交时各桶SPU节点的端口，第0个桶使用节点配置的端口
+
+    同一主机上各节点的[基准端口, 基准端口+shards)互不重叠时（例如由端口分配器按块分配），第i个桶使用基准端口+i；
+    否则要求同一主机上节点的基准端口连续（例如单机配置的11666、11667），第i个桶使用基准端口+i*节点数，各节点交错使用。
+    端口只由集群配置决定，各方计算的结果一致
+
+    :param sf_cluster_desc: SecretFlow集群配置
+    :param shards: 桶数
+    :return: 各桶的{参与方: 端口}，下标为桶号
+    :raises ValueError: 同一主机上节点的端口无法分出互不重叠的桶端口
+    """
+    nodes = [
+        (node["party"], *split_address(node["address"]))
+        for node in get_spu_nodes(sf_cluster_desc)
+        if node.get("party") and node.get("address")
+    ]
+    hosts: Dict[str, List[int]] = {}
+    for _, host, port in nodes:
+        hosts.setdefault(host, []).append(port)
+    strides = {}
+    for host, ports in hosts.items():
+        ports = sorted(ports)
+        if all(upper >= lower + shards for lower, upper in zip(ports, ports[1:])):
+            strides[host] = 1
+        elif ports == list(range(ports[0], ports[0] + len(ports))):
+            strides[host] = len(ports)
+        else:
+            raise ValueError(f"主机 {host} 上SPU节点的端口 {ports} 无法为 {shards} 个桶分配互不重叠的端口，请启用端口分配或调整节点端口")
+    return [
+        {party: port + index * strides[host] for party, host, port in nodes}
+        for index in range(shards)
+    ]
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+import pandas as pd
+
+__all__ = [
+    "params_digest",
+    "prepare_delta",
+    "merge_outputs",
+    "save_watermark",
+    "remove_files",
+]
+
+# 校验追加写入时比对的首尾块大小
+_CHECK_BLOCK_SIZE = 1 << 20
+
+
+def params_digest(params: Dict) -> str:
+    """
+    计算影响求交结果的参数摘要，参数变化后不能沿用上次的结果
+
+    :param params: 求交参数（不含路径）
+    :return: sha256摘要
+    """
+    content = json.dumps(params, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _block_digest(path: str, offset: int, size: int) -> str:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return hashlib.sha256(file.read(size)).hexdigest()
+
+
+def _watermark_digests(path: str, watermark: int) -> Dict[str, str]:
+    """文件开头和水位线之前的块摘要，用于确认水位线之前的内容未被改写"""
+    return {
+        "head_digest": _block_digest(path, 0, min(_CHECK_BLOCK_SIZE, watermark)),
+        "tail_digest": _block_digest(path, max(watermark - _CHECK_BLOCK_SIZE, 0), min(_CHECK_BLOCK_SIZE, watermark)),
+    }
+
+
+def _read_state(state_path: str) -> Optional[Dict]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def prepare_delta(input_path: str, output_path: str, state_path: str, digest: str) -> Dict:
+    """
+    根据上次求交的水位线，生成本次新追加的行（含表头）
+
+    以下情况需要全量求交：没有上次的记录或输出、参数变化、文件被截断，
+    或水位线之前的内容被改写（比对开头和水位线前的块摘要）
+
+    :param input_path: 输入文件
+    :param output_path: 上次求交的输出文件
+    :param state_path: 水位线记录文件
+    :param digest: 本次求交参数的摘要
+    :return: {"mode": "full"|"delta", "delta_path": 增量文件, "delta_rows": 增量行数, "watermark": 本次水位线}
+    """
+    size = os.path.getsize(input_path)
+    full = {"mode": "full", "delta_path": None, "delta_rows": None, "watermark": size}
+    state = _read_state(state_path)
+    if (
+        state is None
+        or state.get("params_digest") != digest
+        or state.get("input_path") != input_path
+        or not os.path.isfile(output_path)
+    ):
+        return full
+
+    watermark = state["watermark"]
+    if size < watermark or _watermark_digests(input_path, watermark) != {
+        "head_digest": state.get("head_digest"),
+        "tail_digest": state.get("tail_digest"),
+    }:
+        return full
+    # 水位线必须落在行尾，否则追加的内容接在了上一行末尾
+    if watermark and _block_digest(input_path, watermark - 1, 1) != hashlib.sha256(b"\n").hexdigest():
+        return full
+
+    delta_path = f"{output_path}.delta-input.csv"
+    delta_rows = 0
+    with open(input_path, "rb") as source, open(delta_path, "wb") as target:
+        target.write(source.readline())
+        source.seek(watermark)
+        for line in source:
+            if line.strip():
+                target.write(line if line.endswith(b"\n") else line + b"\n")
+                delta_rows += 1
+    return {"mode": "delta", "delta_path": delta_path, "delta_rows": delta_rows, "watermark": size}
+
+
+def merge_outputs(output_path: str, delta_outputs: List[str], keys: List[str], sort: bool = True) -> int:
+    """
+    将增量求交结果追加到已有的输出文件，已有的行保持不变，耗时只与增量结果的大小有关
+
+    多方同时追加时，键同时落在双方增量中的行会出现在多次增量求交的结果中，
+    只在增量结果之间去重：后一次结果中键已出现在前面结果里的行被跳过。
+    已有输出中的行（包括求交键重复的行）不会被删除
+
+    :param output_path: 已有的输出文件
+    :param delta_outputs: 增量求交的输出文件，按求交的顺序
+    :param keys: 求交键
+    :param sort: 是否按求交键排序（与psi_csv的sort参数一致），只对本次追加的行排序
+    :return: 追加的行数
+    """
+    with open(output_path, "rb") as file:
+        header = file.readline()
+    frames = []
+    seen = None
+    for path in delta_outputs:
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as file:
+            if file.readline().rstrip(b"\r\n") != header.rstrip(b"\r\n"):
+                raise ValueError(f"增量求交结果 {path} 的表头与已有输出不一致")
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if seen is not None:
+            frame = frame[~pd.MultiIndex.from_frame(frame[keys]).isin(seen)]
+        frames.append(frame)
+        keys_index = pd.MultiIndex.from_frame(frame[keys])
+        seen = keys_index if seen is None else seen.append(keys_index)
+
+    appended = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if sort and not appended.empty:
+        appended = appended.sort_values(keys, kind="stable")
+    if not appended.empty:
+        with open(output_path, "rb+") as file:
+            # 已有输出的最后一行没有换行时先补上
+            file.seek(0, os.SEEK_END)
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+            file.write(appended.to_csv(header=False, index=False).encode("utf-8"))
+    for path in delta_outputs:
+        if os.path.isfile(path):
+            os.remove(path)
+    return len(appended)
+
+
+def save_watermark(input_path: str, state_path: str, digest: str, watermark: int):
+    """
+    记录本次求交的输入水位线
+
+    :param input_path: 输入文件
+    :param state_path: 水位线记录文件
+    :param digest: 求交参数摘要
+    :param watermark: 已求交的字节数
+    """
+    state = {"input_path": input_path, "params_digest": digest, "watermark": watermark}
+    state.update(_watermark_digests(input_path, watermark))
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+    os.replace(temp_path, state_path)
+
+
+def remove_files(paths: List[str]):
+    """
+    删除求交过程中的临时文件
+
+    :param paths: 文件路径列表
+    """
+    for path in paths:
+        if path and os.path.isfile(path):
+            os.remove(path)
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+from typing import List
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "KEY_DIGEST_COLUMN",
+    "ROW_ID_COLUMN",
+    "key_digests",
+    "project_keys",
+    "read_rows",
+    "read_row_ids",
+    "join_back",
+]
+
+# 投影文件的列：求交键摘要和原始行号
+KEY_DIGEST_COLUMN = "key_digest"
+ROW_ID_COLUMN = "row_id"
+
+
+def key_digests(keys: pd.DataFrame, salt: str) -> List[str]:
+    """
+    将求交键（支持多列组合键）转换为定长摘要
+
+    按键的原始字符串计算两个不同密钥的64位哈希，拼接为32位十六进制字符串，
+    各方使用相同的salt时相同的键得到相同的摘要；与直接求交一致，键值不做任何规范化（如去除空白）
+
+    :param keys: 求交键列
+    :param salt: 哈希密钥（各方相同）
+    :return: 摘要列表
+    """
+    seed = hashlib.sha256(salt.encode("utf-8")).hexdigest()
+    high = pd.util.hash_pandas_object(keys, index=False, hash_key=seed[:16]).values
+    low = pd.util.hash_pandas_object(keys, index=False, hash_key=seed[16:32]).values
+    encoded = np.stack([high, low], axis=1).astype(">u8").tobytes().hex()
+    return [encoded[offset:offset + 32] for offset in range(0, len(encoded), 32)]
+
+
+def project_keys(input_path: str, keys: List[str], salt: str, output_path: str, chunk_size: int = 1_000_000) -> int:
+    """
+    流式读取输入文件中的求交键列，生成只含键摘要和行号的投影文件
+
+    :param input_path: 输入文件
+    :param keys: 求交键
+    :param salt: 哈希密钥（各方相同）
+    :param output_path: 投影文件
+    :param chunk_size: 每次读取的行数
+    :return: 行数
+    """
+    rows = 0
+    header = True
+    for chunk in pd.read_csv(input_path, usecols=keys, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        projected = pd.DataFrame({
+            KEY_DIGEST_COLUMN: key_digests(chunk[keys], salt),
+            ROW_ID_COLUMN: np.arange(rows, rows + len(chunk)),
+        })
+        projected.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        rows += len(chunk)
+    if header:
+        pd.DataFrame(columns=[KEY_DIGEST_COLUMN, ROW_ID_COLUMN]).to_csv(output_path, index=False)
+    return rows
+
+
+def _select_lines(input_path: str, row_ids: np.ndarray, target) -> int:
+    """
+    按行号直接复制原始行，不解析未选中的行
+
+    :return: 输入文件的数据行数，用于确认行号与pandas解析的行一致
+    """
+    rows = 0
+    position = 0
+    with open(input_path, "rb") as source:
+        target.write(source.readline())
+        for line in source:
+            if not line.strip():
+                continue
+            if position < len(row_ids) and row_ids[position] == rows:
+                target.write(line if line.endswith(b"\n") else line + b"\n")
+                position += 1
+            rows += 1
+    return rows
+
+
+def read_rows(input_path: str, row_ids: np.ndarray, total_rows: int, chunk_size: int = 1_000_000, **read_kwargs) -> pd.DataFrame:
+    """
+    从原始输入中读取指定行号的行
+
+    按行号直接复制原始行，只解析选中的行；字段中含换行导致行数与投影时不一致时，退化为pandas逐块解析
+
+    :param input_path: 原始输入文件
+    :param row_ids: 升序的行号
+    :param total_rows: 投影时的数据行数
+    :param chunk_size: 每次读取的行数
+    :param read_kwargs: 传给pandas.read_csv的参数，默认按字符串原样读取
+    :return: 选中的行，按行号排列
+    """
+    read_kwargs = read_kwargs or {"dtype": str, "keep_default_na": False}
+    selected_lines = io.BytesIO()
+    if _select_lines(input_path, row_ids, selected_lines) == total_rows:
+        selected_lines.seek(0)
+        return pd.read_csv(selected_lines, **read_kwargs)
+
+    frames = []
+    offset = 0
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size, **read_kwargs):
+        selected = row_ids[(row_ids >= offset) & (row_ids < offset + len(chunk))] - offset
+        if len(selected):
+            frames.append(chunk.iloc[selected])
+        offset += len(chunk)
+    return pd.concat(frames, ignore_index=True) if frames else pd.read_csv(input_path, nrows=0, **read_kwargs)
+
+
+def read_row_ids(projected_output: str) -> np.ndarray:
+    """
+    读取投影文件求交结果中的行号
+
+    :param projected_output: 投影文件的求交结果
+    :return: 升序的行号
+    """
+    return np.sort(pd.read_csv(projected_output, usecols=[ROW_ID_COLUMN])[ROW_ID_COLUMN].to_numpy())
+
+
+def join_back(projected_output: str, input_path: str, output_path: str, keys: List[str], total_rows: int, sort: bool = True, chunk_size: int = 1_000_000) -> int:
+    """
+    根据投影文件的求交结果，从原始输入中取回交集行的全部列
+
+    :param projected_output: 投影文件的求交结果（含行号）
+    :param input_path: 原始输入文件
+    :param output_path: 最终输出文件
+    :param keys: 求交键，排序时使用
+    :param total_rows: 投影时的数据行数
+    :param sort: 是否按求交键排序（与psi_csv的sort参数一致）
+    :param chunk_size: 每次读取的行数
+    :return: 交集行数
+    """
+    intersected = read_rows(input_path, read_row_ids(projected_output), total_rows, chunk_size)
+    if sort:
+        intersected = intersected.sort_values(keys, kind="stable")
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temp_path = f"{output_path}.join.tmp"
+    intersected.to_csv(temp_path, index=False)
+    os.replace(temp_path, output_path)
+    return len(intersected)
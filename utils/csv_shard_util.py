@@ -0,0 +1,140 @@
+import csv
+import hashlib
+import heapq
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+
+__all__ = [
+    "get_shard_count",
+    "split_buckets",
+    "concat_buckets",
+    "run_buckets",
+]
+
+
+def get_shard_count(sf_node_eval_param: Dict, local_cluster: bool) -> int:
+    """
+    获取分桶求交的桶数，未开启分桶时为1
+
+    未指定shards时单机模拟模式取本机核数；多参与方各自的核数可能不同，必须显式指定
+
+    :param sf_node_eval_param: 节点评估参数，sharded开启分桶，shards指定桶数
+    :param local_cluster: 是否为单机模拟模式
+    :return: 桶数
+    """
+    if not (sf_node_eval_param or {}).get("sharded"):
+        return 1
+    shards = sf_node_eval_param.get("shards")
+    if shards is None:
+        if not local_cluster:
+            raise ValueError("多参与方分桶求交需要在sf_node_eval_param中指定shards")
+        shards = os.cpu_count() or 1
+    if int(shards) < 1:
+        raise ValueError(f"shards必须为正整数: {shards}")
+    return int(shards)
+
+
+def _bucket_of(keys: pd.DataFrame, shards: int, hash_key: str):
+    """按带密钥的哈希计算每行所属的桶，各方使用相同的密钥才能落入相同的桶"""
+    return pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).values % shards
+
+
+def split_buckets(input_path: str, keys: List[str], shards: int, salt: str, output_dir: str, chunk_size: int = 1_000_000) -> List[str]:
+    """
+    按求交键的带密钥哈希将输入文件流式拆分为多个桶文件
+
+    :param input_path: 输入文件
+    :param keys: 求交键
+    :param shards: 桶数
+    :param salt: 哈希密钥（各方相同）
+    :param output_dir: 桶文件目录
+    :param chunk_size: 每次读取的行数
+    :return: 各桶文件路径，下标为桶号
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f"bucket-{index}.csv") for index in range(shards)]
+    # hash_pandas_object要求16字节的密钥
+    hash_key = hashlib.sha256(salt.encode("utf-8")).hexdigest()[:16]
+    written = [False] * shards
+    for chunk in pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        for index, bucket in chunk.groupby(_bucket_of(chunk[keys], shards, hash_key)):
+            bucket.to_csv(paths[index], mode="a" if written[index] else "w", header=not written[index], index=False)
+            written[index] = True
+    # 没有数据落入的桶也写出表头，保证每个桶都能参与求交
+    header = pd.read_csv(input_path, dtype=str, nrows=0)
+    for index, path in enumerate(paths):
+        if not written[index]:
+            header.to_csv(path, index=False)
+    return paths
+
+
+def concat_buckets(bucket_outputs: List[str], output_path: str, keys: Optional[List[str]] = None, sort: bool = True) -> int:
+    """
+    流式合并各桶的求交结果，内存占用只与单个桶的大小有关
+
+    不排序时按桶号顺序逐行拼接；排序时先逐个桶按求交键排序，再多路归并
+
+    :param bucket_outputs: 各桶输出文件
+    :param output_path: 最终输出文件
+    :param keys: 求交键，排序时使用
+    :param sort: 是否按求交键排序（与psi_csv的sort参数一致）
+    :return: 合并后的行数
+    """
+    paths = [path for path in bucket_outputs if os.path.isfile(path)]
+    sort = bool(sort and keys)
+    if sort:
+        for path in paths:
+            pd.read_csv(path, dtype=str, keep_default_na=False).sort_values(keys, kind="stable").to_csv(path, index=False)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temp_path = f"{output_path}.merge.tmp"
+    files = [open(path, "r", newline="", encoding="utf-8") for path in paths]
+    rows = 0
+    try:
+        readers = [csv.reader(file) for file in files]
+        headers = [next(reader, None) for reader in readers]
+        header = next((item for item in headers if item is not None), None)
+        if any(item is not None and item != header for item in headers):
+            raise ValueError(f"各桶求交结果的表头不一致: {headers}")
+        with open(temp_path, "w", newline="", encoding="utf-8") as output:
+            writer = csv.writer(output, lineterminator="\n")
+            if header is not None:
+                writer.writerow(header)
+            if sort and header is not None:
+                indexes = [header.index(key) for key in keys]
+                records = heapq.merge(*readers, key=lambda row: [row[index] for index in indexes] if row else [])
+            else:
+                records = itertools.chain(*readers)
+            for row in records:
+                # 跳过空行
+                if row:
+                    writer.writerow(row)
+                    rows += 1
+    except Exception:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        for file in files:
+            file.close()
+    os.replace(temp_path, output_path)
+    return rows
+
+
+def run_buckets(bucket_runs: List[Callable]) -> List:
+    """
+    并发执行各桶的求交
+
+    SPU.psi_csv会阻塞到求交结束并返回各方的报告，各桶在独立的线程中调用，才能在各自的SPU上同时执行
+
+    :param bucket_runs: 每个桶一个无参函数，执行该桶的求交
+    :return: 各桶的返回值，与bucket_runs的顺序一致；任一桶失败时抛出其异常
+    """
+    if len(bucket_runs) <= 1:
+        return [run() for run in bucket_runs]
+    with ThreadPoolExecutor(max_workers=len(bucket_runs)) as executor:
+        futures = [executor.submit(run) for run in bucket_runs]
+        return [future.result() for future in futures]
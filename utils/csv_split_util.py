@@ -0,0 +1,448 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from utils.row_index_util import RowIndexView, materialize_table, open_row_index
+from utils.table_format_util import (
+    TableWriter,
+    concat_shards,
+    get_shard_output_path,
+    is_columnar,
+    is_directory_output,
+    is_sharded,
+    iter_tables,
+    list_shards,
+    read_column_names,
+)
+
+__all__ = [
+    "resolve_split_sizes",
+    "split_fractions",
+    "get_fold_path",
+    "kfold_intervals",
+    "ratio_intervals",
+    "split_rows_multi",
+    "split_rows",
+]
+
+# 输出的划分区间：哈希值落在任一[下界, 上界)内的行写入该输出
+Intervals = List[Tuple[float, float]]
+
+
+def resolve_split_sizes(train_size: Optional[float] = None, test_size: Optional[float] = None):
+    """
+    规范化训练集和测试集比例，与train_test_split一致：只指定一个时另一个取剩余部分，都未指定时测试集取0.25
+
+    :param train_size: 训练集比例
+    :param test_size: 测试集比例
+    :return: (train_size, test_size)
+    :raises ValueError: 比例不在(0, 1)内或两者之和大于1
+    """
+    if train_size is None and test_size is None:
+        test_size = 0.25
+    if train_size is None:
+        train_size = 1 - test_size
+    if test_size is None:
+        test_size = 1 - train_size
+    if not (0 < train_size < 1 and 0 < test_size < 1) or train_size + test_size > 1 + 1e-9:
+        raise ValueError(f"train_size和test_size必须在(0, 1)内且之和不超过1: {train_size}, {test_size}")
+    return train_size, test_size
+
+
+def split_fractions(keys: pd.DataFrame, seed) -> np.ndarray:
+    """
+    按求交键的带密钥哈希将每行映射到[0, 1)内的确定值
+
+    键值去除首尾空白后计算，各方的求交键列名可以不同，相同的键得到相同的值
+
+    :param keys: 求交键列
+    :param seed: 随机种子（各方相同）
+    :return: 每行的值
+    """
+    hash_key = hashlib.sha256(f"split:{seed}".encode("utf-8")).hexdigest()[:16]
+    keys = keys.apply(lambda column: column.str.strip())
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy()
+    # 取高53位，恰好可以精确表示为浮点数
+    return (hashes >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def get_fold_path(path: str, fold: int) -> str:
+    """
+    k折划分时第fold折的输出文件路径，例如train.csv -> train-fold0.csv，输出目录train/ -> train-fold0/
+
+    :param path: 输出文件路径
+    :param fold: 折号
+    :return: 该折的输出文件路径
+    """
+    if path.endswith(("/", os.sep)):
+        return f"{path.rstrip('/' + os.sep)}-fold{fold}{os.sep}"
+    stem, extension = os.path.splitext(path)
+    return f"{stem}-fold{fold}{extension}"
+
+
+def kfold_intervals(k: int) -> List[Tuple[Intervals, Intervals]]:
+    """
+    k折交叉验证的划分区间，第i折的测试集为[i/k, (i+1)/k)，训练集为其余部分
+
+    :param k: 折数
+    :return: 每一折的(训练集区间, 测试集区间)
+    :raises ValueError: 折数小于2
+    """
+    if int(k) < 2:
+        raise ValueError(f"k_folds必须大于等于2: {k}")
+    k = int(k)
+    folds = []
+    for fold in range(k):
+        lower, upper = fold / k, (fold + 1) / k
+        train = [interval for interval in ((0.0, lower), (upper, 1.0)) if interval[0] < interval[1]]
+        folds.append((train, [(lower, upper)]))
+    return folds
+
+
+def ratio_intervals(ratios: List[float]) -> List[Intervals]:
+    """
+    按比例列表依次划分的区间
+
+    :param ratios: 各输出的比例，之和不超过1，不足1的部分不写入任何输出
+    :return: 各输出的区间
+    :raises ValueError: 比例不为正或之和大于1
+    """
+    if not ratios or any(ratio <= 0 for ratio in ratios) or sum(ratios) > 1 + 1e-9:
+        raise ValueError(f"split_ratios必须为正且之和不超过1: {ratios}")
+    intervals = []
+    lower = 0.0
+    for ratio in ratios:
+        intervals.append([(lower, lower + ratio)])
+        lower += ratio
+    return intervals
+
+
+def _segments(output_intervals: List[Intervals]):
+    """
+    将[0, 1)按全部区间的端点切分为若干段，每段内的行写入相同的一组输出
+
+    :return: (各段下界, 每段对应的输出下标列表)
+    """
+    bounds = sorted({0.0} | {bound for intervals in output_intervals for interval in intervals for bound in interval if bound < 1})
+    members = [
+        [index for index, intervals in enumerate(output_intervals) if any(lower <= bound < upper for lower, upper in intervals)]
+        for bound in bounds
+    ]
+    return np.array(bounds), members
+
+
+def _split_lines(input_path: str, keys: List[str], segments, seed, files, chunk_size: int) -> Optional[List[int]]:
+    """
+    只解析求交键列，按划分结果直接复制原始行
+
+    :return: 各输出的行数；原始行数与pandas解析的行数不一致（字段中含换行）时返回None
+    """
+    bounds, members = segments
+    counts = [0] * len(files)
+    with open(input_path, "rb") as source:
+        header = source.readline()
+        for file in files:
+            file.write(header)
+        lines = (line for line in source if line.strip())
+        targets = [[files[index] for index in indexes] for indexes in members]
+        for chunk in pd.read_csv(input_path, usecols=keys, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            segment_ids = np.searchsorted(bounds, split_fractions(chunk[keys], seed), side="right") - 1
+            consumed = 0
+            # segment_ids在前，本块结束时不会多消耗一行
+            for segment_id, line in zip(segment_ids, lines):
+                consumed += 1
+                line = line if line.endswith(b"\n") else line + b"\n"
+                for file in targets[segment_id]:
+                    file.write(line)
+            if consumed != len(chunk):
+                return None
+            for segment_id, rows in zip(*np.unique(segment_ids, return_counts=True)):
+                for index in members[segment_id]:
+                    counts[index] += int(rows)
+        if next(lines, None) is not None:
+            return None
+    return counts
+
+
+def _split_parsed(input_path: str, keys: List[str], segments, seed, files, chunk_size: int) -> List[int]:
+    """逐块解析全部列后划分"""
+    bounds, members = segments
+    counts = [0] * len(files)
+    header = pd.read_csv(input_path, dtype=str, nrows=0).to_csv(index=False).encode("utf-8")
+    for file in files:
+        file.write(header)
+    for chunk in pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        segment_ids = np.searchsorted(bounds, split_fractions(chunk[keys], seed), side="right") - 1
+        for segment_id, indexes in enumerate(members):
+            selected = chunk[segment_ids == segment_id]
+            if not indexes or selected.empty:
+                continue
+            content = selected.to_csv(header=False, index=False).encode("utf-8")
+            for index in indexes:
+                files[index].write(content)
+                counts[index] += len(selected)
+    return counts
+
+
+def _row_offsets(view: RowIndexView) -> Optional[np.ndarray]:
+    """
+    单次流式读取原始输入，记录交集行的字节偏移
+
+    :return: 与行号一一对应的偏移；原始行数与投影时不一致（字段中含换行）时返回None
+    """
+    row_ids = view.row_ids
+    offsets = np.empty(len(row_ids), dtype=np.uint64)
+    rows = 0
+    position = 0
+    with open(view.source_path, "rb") as source:
+        offset = len(source.readline())
+        for line in source:
+            if line.strip():
+                if position < len(row_ids) and row_ids[position] == rows:
+                    offsets[position] = offset
+                    position += 1
+                rows += 1
+            offset += len(line)
+    return offsets if rows == view.total_rows else None
+
+
+def _split_row_index(view: RowIndexView, keys: List[str], segments, seed, files, chunk_size: int) -> Optional[List[int]]:
+    """
+    输入为行号索引时，按视图的行顺序从原始输入中逐块取出交集行划分，不写出完整的交集行
+
+    :return: 各输出的行数；原始行数与投影时不一致（字段中含换行）时返回None
+    """
+    offsets = _row_offsets(view)
+    if offsets is None:
+        return None
+    bounds, members = segments
+    counts = [0] * len(files)
+    targets = [[files[index] for index in indexes] for indexes in members]
+    # 需要排序时按保存的输出顺序读取，与完整输出文件的行顺序一致，各方对齐
+    order = view.order if view.order is not None else np.arange(len(offsets))
+    with open(view.source_path, "rb") as source:
+        header = source.readline()
+        header = header if header.endswith(b"\n") else header + b"\n"
+        for file in files:
+            file.write(header)
+        for start in range(0, len(order), chunk_size):
+            lines = []
+            for offset in offsets[order[start:start + chunk_size]]:
+                source.seek(int(offset))
+                line = source.readline()
+                lines.append(line if line.endswith(b"\n") else line + b"\n")
+            chunk = pd.read_csv(io.BytesIO(header + b"".join(lines)), usecols=keys, dtype=str, keep_default_na=False)
+            segment_ids = np.searchsorted(bounds, split_fractions(chunk[keys], seed), side="right") - 1
+            for segment_id, line in zip(segment_ids, lines):
+                for file in targets[segment_id]:
+                    file.write(line)
+            for segment_id, rows in zip(*np.unique(segment_ids, return_counts=True)):
+                for index in members[segment_id]:
+                    counts[index] += int(rows)
+    return counts
+
+
+def _split_columnar(input_path: str, keys: List[str], segments, seed, output_paths: List[str], chunk_size: int) -> List[int]:
+    """
+    输入或输出为列式格式时，逐块读取Arrow表划分，按各输出的扩展名写出，列类型保持不变
+    """
+    bounds, members = segments
+    counts = [0] * len(output_paths)
+    writers: List[TableWriter] = []
+    try:
+        for table in iter_tables(input_path, batch_size=chunk_size, string_columns=keys):
+            if not writers:
+                writers = [TableWriter(path, table.schema) for path in output_paths]
+            # 与csv输入一致，按键的字符串值计算哈希
+            key_values = table.select(keys).to_pandas().astype(str)
+            segment_ids = np.searchsorted(bounds, split_fractions(key_values, seed), side="right") - 1
+            for segment_id, indexes in enumerate(members):
+                mask = segment_ids == segment_id
+                if not indexes or not mask.any():
+                    continue
+                selected = table.filter(pa.array(mask))
+                for index in indexes:
+                    writers[index].write(selected)
+                    counts[index] += selected.num_rows
+        if not writers:
+            schema = pa.schema([pa.field(name, pa.string()) for name in read_column_names(input_path)])
+            writers = [TableWriter(path, schema) for path in output_paths]
+    except Exception:
+        for writer in writers:
+            writer.close(commit=False)
+        raise
+    for writer in writers:
+        writer.close()
+    return counts
+
+
+def _split_shards(input_path: str, keys: List[str], outputs: List[Tuple[str, Intervals]], seed, chunk_size: int, output_format: Optional[str]) -> List[int]:
+    """
+    分片输入的各分片在独立进程中并行划分，每个分片写出一个输出分片
+
+    输出为目录时分片写入该目录，文件名为分片序号加输入分片的文件名，指定output_format时替换为该格式的扩展名；
+    输出为文件时先写入临时目录，全部完成后按分片顺序合并
+    """
+    shards = list_shards(input_path)
+    part_dirs = [path if is_directory_output(path) else f"{path}.parts.tmp" for path, _ in outputs]
+    for part_dir in part_dirs:
+        os.makedirs(part_dir, exist_ok=True)
+    shard_outputs = [
+        [
+            (get_shard_output_path(part_dir, index, shard, output_format if part_dir == path else None), intervals)
+            for part_dir, (path, intervals) in zip(part_dirs, outputs)
+        ]
+        for index, shard in enumerate(shards)
+    ]
+    workers = min(len(shards), os.cpu_count() or 1)
+    try:
+        if workers > 1:
+            # 划分主要是Python逐行处理，线程受GIL限制；spawn避免在多线程的父进程中fork
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [
+                    executor.submit(split_rows_multi, shard, keys, shard_output, seed, chunk_size)
+                    for shard, shard_output in zip(shards, shard_outputs)
+                ]
+                shard_counts = [future.result() for future in futures]
+        else:
+            shard_counts = [
+                split_rows_multi(shard, keys, shard_output, seed, chunk_size)
+                for shard, shard_output in zip(shards, shard_outputs)
+            ]
+        for part_dir, (path, _) in zip(part_dirs, outputs):
+            if part_dir != path:
+                concat_shards([get_shard_output_path(part_dir, index, shard) for index, shard in enumerate(shards)], path)
+    finally:
+        for part_dir, (path, _) in zip(part_dirs, outputs):
+            if part_dir != path:
+                shutil.rmtree(part_dir, ignore_errors=True)
+    return [sum(counts) for counts in zip(*shard_counts)]
+
+
+def split_rows_multi(
+    input_path: str,
+    keys: List[str],
+    outputs: List[Tuple[str, Intervals]],
+    seed=None,
+    chunk_size: int = 1_000_000,
+    output_format: Optional[str] = None,
+) -> List[int]:
+    """
+    单次流式读取输入文件，按求交键的哈希将每行写入哈希值所在区间对应的输出
+
+    全部输出在同一次遍历中逐块写出，内存占用与文件大小无关；一行可以写入多个输出（例如k折的多个训练集）。
+    划分只取决于键值和随机种子，各方对齐的数据独立划分后结果一致，行顺序与输入相同。
+    只解析求交键列并直接复制原始行，字段中含换行时退化为解析全部列。
+    输入或任一输出为parquet/feather等列式格式时按Arrow表逐块划分，各输出按扩展名的格式写出。
+    输入为分片数据集（目录或通配符）时各分片并行划分，输出为目录时按分片写出，否则按分片顺序合并为一个文件。
+    输入为求交输出的行号索引时按行号从原始输入中逐块取出交集行，行顺序与完整输出文件一致
+
+    :param input_path: 输入文件（或其行号索引）、分片目录或通配符
+    :param keys: 求交键
+    :param outputs: [(输出文件或目录, 区间列表)]
+    :param seed: 随机种子（各方相同）
+    :param chunk_size: 每次读取的行数
+    :param output_format: 输出为目录时各输出分片的格式（csv/parquet/feather），为空时与输入分片相同；
+        输出为文件时按文件的扩展名写出
+    :return: 各输出的行数
+    """
+    view = open_row_index(input_path)
+    if view is not None:
+        return _split_view(view, input_path, keys, outputs, seed, chunk_size)
+    if is_sharded(input_path):
+        return _split_shards(input_path, keys, outputs, seed, chunk_size, output_format)
+    segments = _segments([intervals for _, intervals in outputs])
+    if any(is_columnar(path) for path in [input_path, *(path for path, _ in outputs)]):
+        return _split_columnar(input_path, keys, segments, seed, [path for path, _ in outputs], chunk_size)
+    return _write_outputs(
+        outputs,
+        [partial(split_function, input_path, keys, segments, seed, chunk_size=chunk_size) for split_function in (_split_lines, _split_parsed)],
+    )
+
+
+def _split_view(view: RowIndexView, input_path: str, keys: List[str], outputs: List[Tuple[str, Intervals]], seed, chunk_size: int) -> List[int]:
+    """
+    输入为行号索引时直接按行号流式读取原始输入划分
+
+    字段中含换行或输出为列式格式时，退化为先取出交集行写入临时文件再划分
+    """
+    view.check_source()
+    if not any(is_columnar(path) for path, _ in outputs):
+        segments = _segments([intervals for _, intervals in outputs])
+        counts = _write_outputs(outputs, [partial(_split_row_index, view, keys, segments, seed, chunk_size=chunk_size)])
+        if counts is not None:
+            return counts
+    materialized_path = materialize_table(input_path)
+    try:
+        return split_rows_multi(materialized_path, keys, outputs, seed, chunk_size)
+    finally:
+        os.remove(materialized_path)
+
+
+def _write_outputs(outputs: List[Tuple[str, Intervals]], split_functions) -> Optional[List[int]]:
+    """
+    依次尝试各划分函数写出临时文件，第一个成功的结果替换为输出文件
+
+    :param split_functions: 接收打开的输出文件列表，返回各输出的行数，无法处理时返回None
+    :return: 各输出的行数，全部划分函数都无法处理时返回None
+    """
+    temp_paths = [f"{path}.split.tmp" for path, _ in outputs]
+    for path, _ in outputs:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    counts = None
+    for split_function in split_functions:
+        files = [open(path, "wb") for path in temp_paths]
+        try:
+            counts = split_function(files)
+        finally:
+            for file in files:
+                file.close()
+        if counts is not None:
+            break
+
+    for temp_path, (path, _) in zip(temp_paths, outputs):
+        if counts is None:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    return counts
+
+
+def split_rows(
+    input_path: str,
+    keys: List[str],
+    train_output_path: str,
+    test_output_path: str,
+    train_size: Optional[float] = None,
+    test_size: Optional[float] = None,
+    seed=None,
+    chunk_size: int = 1_000_000,
+) -> Dict[str, int]:
+    """
+    单次流式读取输入文件，按求交键的哈希将每行划入训练集或测试集
+
+    :param input_path: 输入文件
+    :param keys: 求交键
+    :param train_output_path: 训练集输出文件
+    :param test_output_path: 测试集输出文件
+    :param train_size: 训练集比例
+    :param test_size: 测试集比例
+    :param seed: 随机种子（各方相同）
+    :param chunk_size: 每次读取的行数
+    :return: {"train_rows": 训练集行数, "test_rows": 测试集行数}
+    """
+    train_size, test_size = resolve_split_sizes(train_size, test_size)
+    outputs = [
+        (train_output_path, [(0.0, train_size)]),
+        (test_output_path, [(train_size, train_size + test_size)]),
+    ]
+    train_rows, test_rows = split_rows_multi(input_path, keys, outputs, seed, chunk_size)
+    return {"train_rows": train_rows, "test_rows": test_rows}
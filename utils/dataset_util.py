@@ -0,0 +1,216 @@
+import json
+import os
+import resource
+import time
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from utils.csv_delta_util import remove_files
+from utils.row_index_util import materialize_table, open_row_index, read_table
+from utils.table_format_util import is_columnar, is_sharded, iter_tables, read_arrow_table, read_column_names
+
+__all__ = [
+    "get_schema_path",
+    "load_dataset",
+    "iter_dataset",
+    "reset_load_stats",
+    "get_load_stats",
+]
+
+# 列类型记录文件的后缀，保存在<数据文件>.schema.json
+SCHEMA_SUFFIX = ".schema.json"
+
+# 可以记录在列类型文件中的类型（pyarrow的类型别名），其他类型的列每次加载时推断
+_SCHEMA_TYPES = {"bool", "int64", "float", "double", "string", "null"}
+
+# 列类型记录中的pyarrow类型对应的pandas类型，分块读取时使用
+_PANDAS_TYPES = {"bool": "bool", "int64": "int64", "float": "float32", "double": "float64", "string": "str"}
+
+# 当前进程中数据加载的统计，由任务执行入口在任务开始时清空、结束时汇总
+_load_stats: List[Dict] = []
+
+
+def get_schema_path(path: str) -> str:
+    """
+    获取数据文件对应的列类型记录文件路径
+
+    :param path: 数据文件
+    :return: 列类型记录文件路径
+    """
+    return f"{path}{SCHEMA_SUFFIX}"
+
+
+def _file_signature(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_schema(path: str, float32: bool) -> Dict[str, str]:
+    """读取与数据文件当前内容一致的列类型记录，没有或已过期时返回空字典"""
+    try:
+        with open(get_schema_path(path), "r", encoding="utf-8") as file:
+            schema = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if schema.get("file") != _file_signature(path) or schema.get("float32") != float32:
+        return {}
+    return schema["columns"]
+
+
+def _write_schema(path: str, float32: bool, columns: Dict[str, str]):
+    """保存列类型记录，所在目录不可写时跳过"""
+    schema_path = get_schema_path(path)
+    temp_path = f"{schema_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"file": _file_signature(path), "float32": float32, "columns": columns}, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, schema_path)
+    except OSError:
+        pass
+
+
+def _downcast(table: pa.Table) -> pa.Table:
+    """将float64列转换为float32"""
+    schema = pa.schema([
+        field.with_type(pa.float32()) if pa.types.is_float64(field.type) else field
+        for field in table.schema
+    ])
+    return table.cast(schema)
+
+
+def _select_columns(path: str, columns: Optional[List[str]]) -> List[str]:
+    """只保留文件中存在的列（例如标签列只在一方的文件中），保持文件中的列顺序，columns为None时返回全部列"""
+    header = read_column_names(path)
+    wanted = set(header if columns is None else columns)
+    return [column for column in header if column in wanted]
+
+
+def load_dataset(path: str, columns: Optional[List[str]] = None, float32: bool = True) -> pd.DataFrame:
+    """
+    加载数据集
+
+    parquet/feather等列式格式按扩展名直接读取需要的列，目录或通配符表示的分片数据集各分片并行读取后按文件名顺序拼接。
+    csv使用pyarrow多线程解析，只解析需要的列，float64列转换为float32。
+    首次加载后在<数据文件>.schema.json中记录各列的类型（含float32转换），文件未变化时后续加载直接按记录的类型解析，
+    不再推断类型，float32列也直接解析为float32。
+    上游只输出了行号索引时通过惰性视图读取。每次加载的耗时和内存记录在当前进程的统计中
+
+    :param path: 数据文件、分片目录或通配符
+    :param columns: 需要的列，文件中不存在的列被忽略，为None时读取全部列
+    :param float32: 是否将浮点列转换为float32
+    :return: 数据
+    """
+    start = time.perf_counter()
+    schema_hit = False
+    view = open_row_index(path)
+    if view is not None:
+        data = read_table(path, usecols=_select_columns(view.source_path, columns))
+        if float32:
+            data = data.astype({column: "float32" for column in data.columns if data[column].dtype == "float64"})
+    elif is_sharded(path) or is_columnar(path):
+        # 列式格式的列类型保存在文件中，不需要推断；分片数据集各分片并行读取
+        schema_hit = is_columnar(path)
+        table = read_arrow_table(path, _select_columns(path, columns))
+        data = (_downcast(table) if float32 else table).to_pandas()
+    else:
+        include_columns = _select_columns(path, columns)
+        known_types = _read_schema(path, float32)
+        schema_hit = bool(include_columns) and all(column in known_types for column in include_columns)
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=include_columns,
+            column_types={name: pa.type_for_alias(alias) for name, alias in known_types.items()},
+        )
+        table = pa_csv.read_csv(path, read_options=pa_csv.ReadOptions(use_threads=True), convert_options=convert_options)
+        if float32:
+            table = _downcast(table)
+        if not schema_hit:
+            # 与已记录的列合并，不同的列选择共用同一个记录
+            inferred = {field.name: str(field.type) for field in table.schema if str(field.type) in _SCHEMA_TYPES}
+            _write_schema(path, float32, {**known_types, **inferred})
+        data = table.to_pandas()
+
+    _record_load(path, len(data), data.columns, time.perf_counter() - start, data, schema_hit)
+    return data
+
+
+def iter_dataset(path: str, columns: Optional[List[str]] = None, batch_size: int = 100_000, float32: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    按行分块读取数据集（csv或列式格式，可以是分片数据集），内存占用只与batch_size有关
+
+    列的选择和float32转换与load_dataset一致，已记录类型的列按记录解析，
+    其余列与load_dataset一样由pyarrow推断类型；各块的列类型与第一块一致，不随块内的取值变化。
+    上游只输出了行号索引时先取出交集行写入临时文件，读取结束后删除。
+    全部分块读取完后记录一次加载统计（耗时只计读取部分）
+
+    :param path: 数据文件、分片目录或通配符
+    :param columns: 需要的列，文件中不存在的列被忽略，为None时读取全部列
+    :param batch_size: 每块的行数
+    :param float32: 是否将浮点列转换为float32
+    :return: 数据块的迭代器，各块的行顺序与文件一致
+    :raises ValueError: 后续块的值无法按第一块的类型表示（例如整数列在后续块中出现空值）
+    """
+    if int(batch_size) < 1:
+        raise ValueError(f"batch_size必须为正整数: {batch_size}")
+    source_path = materialize_table(path)
+    try:
+        usecols = _select_columns(source_path, columns)
+        if is_sharded(source_path) or is_columnar(source_path):
+            schema_hit = is_columnar(source_path)
+            column_types = {}
+        else:
+            known_types = _read_schema(source_path, float32) if source_path == path else {}
+            column_types = {name: pa.type_for_alias(alias) for name, alias in known_types.items() if name in usecols}
+            schema_hit = bool(usecols) and all(name in column_types for name in usecols)
+        rows, seconds, memory = 0, 0.0, 0
+        schema, dtypes = None, None
+        start = time.perf_counter()
+        for table in iter_tables(source_path, usecols, int(batch_size), column_types=column_types):
+            # csv由pyarrow按第一个数据块推断类型，各分片推断的类型可能不同，后续块统一转换为第一块的类型
+            schema = schema or table.schema
+            if not table.schema.equals(schema):
+                table = table.cast(schema)
+            chunk = (_downcast(table) if float32 else table).to_pandas()[usecols]
+            dtypes = dtypes if dtypes is not None else chunk.dtypes
+            if not chunk.dtypes.equals(dtypes):
+                changed = [column for column in usecols if chunk[column].dtype != dtypes[column]]
+                raise ValueError(f"{path}的列{changed}在第{rows + 1}行之后的类型与第一块不一致（如整数列出现空值），请增大batch_size")
+            rows += len(chunk)
+            memory = max(memory, chunk.memory_usage(deep=True).sum())
+            seconds += time.perf_counter() - start
+            yield chunk
+            start = time.perf_counter()
+        _record_load(path, rows, usecols, seconds, None, schema_hit, memory_bytes=memory)
+    finally:
+        if source_path != path:
+            remove_files([source_path])
+
+
+def _record_load(path: str, rows: int, columns, seconds: float, data: Optional[pd.DataFrame], schema_hit: bool, memory_bytes: int = 0):
+    if data is not None:
+        memory_bytes = data.memory_usage(deep=True).sum()
+    _load_stats.append({
+        "path": path,
+        "rows": rows,
+        "columns": len(columns),
+        "seconds": round(seconds, 3),
+        # 分块读取时为最大一块的内存
+        "memory_mb": round(float(memory_bytes) / 2**20, 1),
+        # 进程的峰值RSS（Linux下ru_maxrss单位为KB）
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "schema_cached": schema_hit,
+    })
+
+
+def reset_load_stats():
+    """清空当前进程的数据加载统计"""
+    _load_stats.clear()
+
+
+def get_load_stats() -> List[Dict]:
+    """
+    获取当前进程的数据加载统计
+
+    :return: 每次加载的{"path", "rows", "columns", "seconds", "memory_mb", "peak_rss_mb", "schema_cached"}
+    """
+    return list(_load_stats)
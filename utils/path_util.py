@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
-from typing import Dict
+from typing import Dict, List, Optional
+from utils.table_format_util import get_table_format, with_format_extension
 
 def get_project_root() -> str:
     """获取项目根目录"""
@@ -11,19 +12,36 @@ def get_local_data_path() -> str:
     """获取local_data目录路径"""
     return os.path.join(get_project_root(), 'local_data')
 
-def modify_path(path_dict: Dict[str, str]) -> Dict[str, str]:
+def modify_path(path_dict: Dict[str, str], table_format: Optional[str] = None) -> Dict[str, str]:
     """规范化路径字典
     
     Args:
         path_dict: 包含原始路径的字典，格式为 {类别: 文件名}
+        table_format: 数据格式（csv/parquet/feather），指定时将文件的扩展名替换为该格式的扩展名
     
     Returns:
         包含完整路径的新字典
     """
     return {
-        category: os.path.join(get_local_data_path(), category, filename)
+        category: os.path.join(get_local_data_path(), category, with_format_extension(filename, table_format))
         for category, filename in path_dict.items()
     }
+
+def with_output_formats(sf_output_information: List[Dict], table_format: Optional[str] = None) -> List[Dict]:
+    """为sf_output_information的每个输出补充各参与方文件的格式
+    
+    Args:
+        sf_output_information: 输出信息列表，每项含output_path: {参与方: 文件路径}
+        table_format: 算子的output_format参数，指定时文件的扩展名替换为该格式的扩展名（与算子实际写出的文件一致）
+    
+    Returns:
+        output_path按格式替换扩展名、每项增加format: {参与方: csv/parquet/feather}的新列表，下游按格式读取
+    """
+    result = []
+    for entry in sf_output_information:
+        output_path = {party: with_format_extension(path, table_format) for party, path in entry.get("output_path", {}).items()}
+        result.append({**entry, "output_path": output_path, "format": {party: get_table_format(path) for party, path in output_path.items()}})
+    return result
     
     
 if __name__ == '__main__':
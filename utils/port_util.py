@@ -0,0 +1,114 @@
+import socket
+import threading
+import time
+from typing import Dict, List
+
+__all__ = [
+    "is_port_free",
+    "wait_ports_released",
+    "PortAllocator",
+]
+
+
+def is_port_free(port: int, host: str = "0.0.0.0") -> bool:
+    """
+    检查端口当前是否可以被绑定
+
+    :param port: 端口号
+    :param host: 绑定地址
+    :return: 端口是否空闲
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        # 与brpc一致开启SO_REUSEADDR，处于TIME_WAIT的端口视为已释放
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def wait_ports_released(ports: List[int], timeout: float = 5, interval: float = 0.05) -> Dict[int, bool]:
+    """
+    等待端口被释放
+
+    :param ports: 端口列表
+    :param timeout: 最长等待时间（单位：秒）
+    :param interval: 检查间隔（单位：秒）
+    :return: 端口与是否已释放的映射
+    """
+    deadline = time.time() + timeout
+    released = {port: False for port in ports}
+    while True:
+        for port in ports:
+            if not released[port]:
+                released[port] = is_port_free(port)
+        if all(released.values()) or time.time() >= deadline:
+            return released
+        time.sleep(interval)
+
+
+class PortAllocator:
+    """
+    端口范围分配器
+
+    按租约持有者（任务或常驻执行器）分配端口，持有者结束后归还。
+    分配时从上次位置继续轮询，刚归还的端口不会被立即复用
+    """
+
+    def __init__(self, start: int, end: int):
+        """
+        :param start: 端口范围起始（包含）
+        :param end: 端口范围结束（包含）
+        """
+        self.start = start
+        self.end = end
+        self._next = start
+        self._leases: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def lease(self, owner: str, count: int, block: int = 1) -> List[int]:
+        """
+        为持有者分配空闲端口
+
+        :param owner: 租约持有者
+        :param count: 端口数量
+        :param block: 每个端口连同其后共block个连续端口一起分配，例如分桶求交的每个桶使用基准端口+桶号
+        :return: 分配的基准端口列表
+        """
+        with self._lock:
+            leased = {port for ports in self._leases.values() for port in ports}
+            ports = []
+            size = self.end - self.start + 1
+            for offset in range(size):
+                if len(ports) == count * block:
+                    break
+                port = self.start + (self._next - self.start + offset) % size
+                block_ports = range(port, port + block)
+                if port + block - 1 > self.end or any(
+                    candidate in leased or candidate in ports for candidate in block_ports
+                ):
+                    continue
+                if all(is_port_free(candidate) for candidate in block_ports):
+                    ports.extend(block_ports)
+            if len(ports) < count * block:
+                raise RuntimeError(f"端口范围 {self.start}-{self.end} 内没有 {count} 组 {block} 个连续的空闲端口")
+            if ports:
+                self._next = ports[-1] + 1
+            self._leases.setdefault(owner, []).extend(ports)
+            return ports[::block]
+
+    def release(self, owner: str) -> List[int]:
+        """
+        归还持有者的全部端口
+
+        :param owner: 租约持有者
+        :return: 归还的端口列表
+        """
+        with self._lock:
+            return self._leases.pop(owner, [])
+
+    def get_leases(self) -> Dict[str, List[int]]:
+        """获取当前全部租约"""
+        with self._lock:
+            return {owner: list(ports) for owner, ports in self._leases.items()}
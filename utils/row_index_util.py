@@ -0,0 +1,202 @@
+import json
+import os
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from utils.csv_key_util import read_row_ids, read_rows
+from utils.table_format_util import is_columnar, is_sharded, list_shards, read_arrow_table, unique_temp_path
+
+__all__ = [
+    "INDEX_SUFFIX",
+    "get_index_path",
+    "write_row_index",
+    "RowIndexView",
+    "open_row_index",
+    "table_exists",
+    "read_table",
+    "materialize_table",
+]
+
+# 行号索引文件的后缀，索引保存在<输出文件>.index.npz
+INDEX_SUFFIX = ".index.npz"
+
+
+def get_index_path(output_path: str) -> str:
+    """
+    获取输出文件对应的行号索引文件路径
+
+    :param output_path: 输出文件
+    :return: 索引文件路径
+    """
+    return f"{output_path}{INDEX_SUFFIX}"
+
+
+def write_row_index(projected_output: str, input_path: str, output_path: str, keys: List[str], total_rows: int, sort: bool = True) -> int:
+    """
+    根据投影文件的求交结果，只保存交集行在原始输入中的行号，不写出交集行
+
+    行号升序保存并压缩；需要排序时只解析交集行的求交键列，另存按求交键排序后的输出顺序。
+    原始输入的大小和修改时间一并记录，输入变化后索引失效。
+    同名的完整输出文件会被删除，下游读取时只会看到索引
+
+    :param projected_output: 投影文件的求交结果（含行号）
+    :param input_path: 原始输入文件
+    :param output_path: 输出文件，索引保存在get_index_path(output_path)
+    :param keys: 求交键，读取时按其排序
+    :param total_rows: 投影时的数据行数
+    :param sort: 读取时是否按求交键排序（与psi_csv的sort参数一致）
+    :return: 交集行数
+    """
+    row_ids = read_row_ids(projected_output)
+    dtype = np.uint32 if total_rows <= np.iinfo(np.uint32).max else np.uint64
+    arrays = {"row_ids": row_ids.astype(dtype)}
+    if sort:
+        # 与完整输出一致，按求交键的字符串值稳定排序
+        key_values = read_rows(input_path, row_ids, total_rows, usecols=keys, dtype=str, keep_default_na=False)
+        arrays["order"] = key_values.sort_values(keys, kind="stable").index.to_numpy().astype(dtype)
+    stat = os.stat(input_path)
+    meta = {
+        "source_path": os.path.abspath(input_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "total_rows": total_rows,
+        "keys": keys,
+    }
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    index_path = get_index_path(output_path)
+    # np.savez会为文件名补上.npz后缀，临时文件也以.npz结尾
+    temp_path = f"{index_path}.tmp.npz"
+    np.savez_compressed(temp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(temp_path, index_path)
+    if os.path.isfile(output_path):
+        os.remove(output_path)
+    return len(row_ids)
+
+
+class RowIndexView:
+    """
+    求交结果的惰性视图
+
+    只持有交集行在原始输入中的行号，读取时才从原始输入中取出选中的行，
+    返回的数据与完整输出文件的内容和行顺序一致
+    """
+
+    def __init__(self, index_path: str):
+        with np.load(index_path) as index:
+            self.row_ids = index["row_ids"]
+            self.order = index["order"] if "order" in index else None
+            meta = json.loads(str(index["meta"]))
+        self.index_path = index_path
+        self.source_path = meta["source_path"]
+        self.total_rows = meta["total_rows"]
+        self.keys = meta["keys"]
+        self._source_size = meta["source_size"]
+        self._source_mtime_ns = meta["source_mtime_ns"]
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def check_source(self):
+        """
+        确认原始输入未被修改
+
+        :raises ValueError: 原始输入不存在或已变化，行号不再有效
+        """
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            raise ValueError(f"行号索引 {self.index_path} 的原始输入 {self.source_path} 不存在")
+        if stat.st_size != self._source_size or stat.st_mtime_ns != self._source_mtime_ns:
+            raise ValueError(f"行号索引 {self.index_path} 的原始输入 {self.source_path} 已变化，需要重新求交")
+
+    def read(self, **read_kwargs) -> pd.DataFrame:
+        """
+        读取交集行
+
+        :param read_kwargs: 传给pandas.read_csv的参数，默认按字符串原样读取
+        :return: 交集行
+        """
+        self.check_source()
+        rows = read_rows(self.source_path, self.row_ids.astype(np.int64), self.total_rows, **read_kwargs)
+        if self.order is not None:
+            rows = rows.iloc[self.order].reset_index(drop=True)
+        return rows
+
+    def to_csv(self, output_path: str) -> int:
+        """
+        将交集行写出为csv文件
+
+        :param output_path: 输出文件
+        :return: 行数
+        """
+        rows = self.read()
+        temp_path = f"{output_path}.tmp"
+        rows.to_csv(temp_path, index=False)
+        os.replace(temp_path, output_path)
+        return len(rows)
+
+
+def open_row_index(path: str) -> Optional[RowIndexView]:
+    """
+    打开输出文件对应的行号索引
+
+    同名的完整输出文件存在时（例如之后又执行了完整求交）优先使用完整文件
+
+    :param path: 输出文件
+    :return: 惰性视图，没有索引时返回None
+    """
+    index_path = get_index_path(path)
+    if os.path.isfile(path) or not os.path.isfile(index_path):
+        return None
+    return RowIndexView(index_path)
+
+
+def table_exists(path: str) -> bool:
+    """
+    文件、其行号索引或分片数据集的分片是否存在
+
+    :param path: 文件路径、分片目录或通配符
+    :return: 是否存在
+    """
+    if os.path.isfile(path) or os.path.isfile(get_index_path(path)):
+        return True
+    if is_sharded(path):
+        try:
+            return bool(list_shards(path))
+        except FileNotFoundError:
+            return False
+    return False
+
+
+def read_table(path: str, **kwargs) -> pd.DataFrame:
+    """
+    读取数据文件，文件为行号索引时通过惰性视图读取，parquet/feather等列式格式按扩展名读取
+
+    :param path: 文件路径
+    :param kwargs: 传给pandas.read_csv的参数，列式格式只使用其中的usecols
+    :return: 数据
+    """
+    view = open_row_index(path)
+    if view is None:
+        if is_sharded(path) or is_columnar(path):
+            # 列类型保存在文件中，不需要解析参数；分片数据集各分片并行读取
+            return read_arrow_table(path, kwargs.get("usecols")).to_pandas()
+        return pd.read_csv(path, **kwargs)
+    # 未指定参数时与直接读取完整输出文件一致，由pandas推断列类型
+    return view.read(**(kwargs or {"dtype": None}))
+
+
+def materialize_table(path: str) -> str:
+    """
+    获取可以按文件读取的路径，行号索引只在此时取出交集行，写入临时文件
+
+    :param path: 文件路径
+    :return: 普通csv文件直接返回原路径，行号索引返回输出目录下文件名唯一的临时文件路径（由调用方删除）
+    """
+    view = open_row_index(path)
+    if view is None:
+        return path
+    temp_path = unique_temp_path(path, ".materialized.csv")
+    view.to_csv(temp_path)
+    return temp_path
@@ -44,19 +44,41 @@ import secretflow as sf
 from secretflow.device import SPU, HEU
 from secretflow.security.aggregation import SecureAggregator
 from secretflow.security.compare import PlainComparator
+from utils.cluster_util import cluster_fingerprint
 
 
 class SecretFlowConfigurator:
+    # 常驻模式：进程内保留已初始化的运行时，退出上下文时不调用sf.shutdown()
+    _reuse_runtime = False
+    # 常驻模式下缓存的运行时 {"fingerprint": str, "spu": SPU, "heu": HEU}
+    _warm_runtime = None
+
     def __init__(self, devices: dict, sf_init: dict):
         """
         SecretFlow 隐私计算设备初始化类
         """
         self.sf_device = devices
         self.sf_init = sf_init
-        
-        self._init_sf()
-        self.spu = self._init_spu()
-        self.heu = self._init_heu()
+        self.fingerprint = cluster_fingerprint({"devices": devices, "sf_init": sf_init})
+
+        warm = SecretFlowConfigurator._warm_runtime
+        if self._reuse_runtime and warm and warm["fingerprint"] == self.fingerprint:
+            # 复用常驻运行时，跳过sf.init和设备构建
+            self.spu = warm["spu"]
+            self.heu = warm["heu"]
+        else:
+            if warm:
+                # 指纹不一致，先释放旧的运行时
+                self.release_runtime()
+            self._init_sf()
+            self.spu = self._init_spu()
+            self.heu = self._init_heu()
+            if self._reuse_runtime:
+                SecretFlowConfigurator._warm_runtime = {
+                    "fingerprint": self.fingerprint,
+                    "spu": self.spu,
+                    "heu": self.heu,
+                }
         self.parties_pyu = {it: sf.PYU(it) for it in self.sf_init.get("parties", [])}
 
     def __enter__(self):
@@ -65,6 +87,19 @@ class SecretFlowConfigurator:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """退出上下文时，关闭设备以释放资源"""
+        if not self._reuse_runtime or exc_type is not None:
+            # 非常驻模式，或任务异常（运行时状态不可信）时释放资源
+            self.release_runtime()
+
+    @classmethod
+    def enable_reuse(cls):
+        """开启常驻模式，仅在常驻执行器进程中调用"""
+        cls._reuse_runtime = True
+
+    @classmethod
+    def release_runtime(cls):
+        """关闭当前进程内的SecretFlow运行时"""
+        cls._warm_runtime = None
         sf.shutdown()
 
     def _init_sf(self) -> SPU:
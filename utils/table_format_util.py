@@ -0,0 +1,492 @@
+import glob
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+__all__ = [
+    "FORMAT_EXTENSIONS",
+    "is_sharded",
+    "list_shards",
+    "is_directory_output",
+    "get_shard_output_path",
+    "unique_temp_path",
+    "get_table_format",
+    "is_columnar",
+    "with_format_extension",
+    "read_column_names",
+    "read_arrow_table",
+    "iter_tables",
+    "TableWriter",
+    "write_arrow_table",
+    "csv_staging_path",
+    "finalize_table",
+    "needs_csv_materialization",
+    "concat_shards",
+    "materialize_csv",
+]
+
+# 扩展名对应的格式，其他扩展名按csv处理
+_EXTENSION_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+# 各格式的默认扩展名
+FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+# 分片目录中不作为数据分片的文件：隐藏文件、_SUCCESS等标记文件以及本工程写出的辅助文件
+_SHARD_IGNORED_SUFFIXES = (".json", ".tmp", ".npz", ".crc")
+# 流式读取csv时每块的字节数，类型按第一块推断，块越大推断越可靠
+_CSV_BLOCK_SIZE = 64 << 20
+
+
+def is_sharded(path: str) -> bool:
+    """
+    路径是否为分片数据集：分片文件所在的目录，或匹配分片文件的通配符
+
+    已存在的文件按字面路径处理，文件名中含[、*、?时不会被当作通配符
+
+    :param path: 文件路径
+    :return: 是否为分片数据集
+    """
+    return os.path.isdir(path) or (glob.has_magic(path) and not os.path.exists(path))
+
+
+def _natural_key(path: str):
+    """按文件名中的数字排序，part-2排在part-10之前"""
+    return [int(token) if token.isdigit() else token for token in re.split(r"(\d+)", path)]
+
+
+def list_shards(path: str) -> List[str]:
+    """
+    列出数据集的分片文件
+
+    分片按文件名自然排序，各方的分片按相同的顺序拼接，上游按行对齐的分片拼接后仍然对齐
+
+    :param path: 目录、通配符或单个文件
+    :return: 分片文件路径列表，单个文件时为[path]
+    :raises FileNotFoundError: 没有匹配的分片
+    """
+    if not is_sharded(path):
+        return [path]
+    candidates = [os.path.join(path, name) for name in os.listdir(path)] if os.path.isdir(path) else glob.glob(path)
+    shards = sorted(
+        (
+            candidate for candidate in candidates
+            if os.path.isfile(candidate)
+            and not os.path.basename(candidate).startswith((".", "_"))
+            and not candidate.endswith(_SHARD_IGNORED_SUFFIXES)
+        ),
+        key=_natural_key,
+    )
+    if not shards:
+        raise FileNotFoundError(f"没有找到数据分片: {path}")
+    return shards
+
+
+def is_directory_output(path: str) -> bool:
+    """
+    输出路径是否为目录（以路径分隔符结尾或是已有的目录），分片输入时按分片写出到该目录
+
+    :param path: 输出路径
+    :return: 是否为目录
+    """
+    return path.endswith(("/", os.sep)) or os.path.isdir(path)
+
+
+def get_shard_output_path(output_dir: str, shard_index: int, shard_path: str, table_format: Optional[str] = None) -> str:
+    """
+    分片输出的文件路径，文件名为分片序号加输入分片的文件名
+
+    通配符匹配的分片可能来自不同目录且文件名相同（例如data/*/part-0.csv），加上序号后输出不会相互覆盖，
+    按文件名排序仍与输入分片的顺序一致
+
+    :param output_dir: 输出目录
+    :param shard_index: 输入分片在list_shards结果中的序号
+    :param shard_path: 输入分片
+    :param table_format: 输出格式（csv/parquet/feather），指定时替换扩展名，为空时与输入分片的格式相同
+    :return: 输出分片路径
+    """
+    name = f"{shard_index:05d}-{os.path.basename(shard_path)}"
+    return with_format_extension(os.path.join(output_dir, name), table_format)
+
+
+def unique_temp_path(path: str, suffix: str, work_dir: Optional[str] = None) -> str:
+    """
+    生成临时文件路径，文件名含随机串，并发读取同一输入的任务不会相互覆盖或删除对方的临时文件
+
+    文件名以.开头，写在分片目录中时不会被当作分片
+
+    :param path: 临时文件对应的数据文件、分片目录或通配符
+    :param suffix: 临时文件后缀，例如.materialized.csv
+    :param work_dir: 临时文件所在目录，为空时与path位于同一目录
+    :return: 临时文件路径（尚未创建）
+    """
+    directory = work_dir or os.path.dirname(path.rstrip("/" + os.sep))
+    name = re.sub(r"[^\w.-]", "_", os.path.basename(path.rstrip("/" + os.sep)))
+    return os.path.join(directory, f".{name}.{uuid.uuid4().hex[:12]}{suffix}")
+
+
+def get_table_format(path: str) -> str:
+    """
+    按扩展名判断数据文件的格式，分片数据集取第一个分片的格式
+
+    :param path: 文件路径
+    :return: csv/parquet/feather（Arrow IPC文件）
+    """
+    if is_sharded(path):
+        try:
+            path = list_shards(path)[0]
+        except FileNotFoundError:
+            # 尚未写出分片的输出目录
+            return "csv"
+    return _EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def is_columnar(path: str) -> bool:
+    """
+    是否为列式二进制格式
+
+    :param path: 文件路径
+    :return: 扩展名为parquet/feather/arrow等时返回True
+    """
+    return get_table_format(path) != "csv"
+
+
+def with_format_extension(path: str, table_format: Optional[str]) -> str:
+    """
+    将文件的扩展名替换为指定格式的扩展名
+
+    :param path: 文件路径，目录时原样返回（各分片的扩展名由get_shard_output_path替换）
+    :param table_format: csv/parquet/feather，为空时原样返回
+    :return: 替换扩展名后的路径
+    :raises ValueError: 不支持的格式
+    """
+    if not table_format:
+        return path
+    if table_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"不支持的数据格式: {table_format}，可选 {list(FORMAT_EXTENSIONS)}")
+    if is_directory_output(path):
+        return path
+    if get_table_format(path) == table_format:
+        return path
+    return os.path.splitext(path)[0] + FORMAT_EXTENSIONS[table_format]
+
+
+def read_column_names(path: str) -> List[str]:
+    """
+    读取数据文件的列名，不读取数据
+
+    :param path: 文件路径
+    :return: 列名列表
+    """
+    path = list_shards(path)[0]
+    table_format = get_table_format(path)
+    if table_format == "parquet":
+        return pq.read_schema(path).names
+    if table_format == "feather":
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_arrow_table(path: str, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    按格式读取整个数据文件，分片数据集的各分片并行读取后按顺序拼接
+
+    :param path: 文件路径、分片目录或通配符
+    :param columns: 需要的列，为None时读取全部列
+    :return: Arrow表
+    """
+    shards = list_shards(path)
+    if len(shards) > 1:
+        # pyarrow解析时释放GIL，线程即可并行
+        with ThreadPoolExecutor(max_workers=min(len(shards), os.cpu_count() or 1)) as executor:
+            tables = list(executor.map(lambda shard: _read_file(shard, columns), shards))
+        # 各分片推断的类型可能不同（例如整数和浮点），拼接时统一
+        return pa.concat_tables(tables, promote_options="permissive")
+    return _read_file(shards[0], columns)
+
+
+def _read_file(path: str, columns: Optional[List[str]]) -> pa.Table:
+    table_format = get_table_format(path)
+    if table_format == "parquet":
+        return pq.read_table(path, columns=columns)
+    if table_format == "feather":
+        return feather.read_table(path, columns=columns, memory_map=True)
+    return pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(include_columns=columns))
+
+
+def _iter_batches(path: str, columns: Optional[List[str]], batch_size: int, column_types: Dict[str, pa.DataType]) -> Iterator[pa.RecordBatch]:
+    for shard in list_shards(path):
+        yield from _iter_file_batches(shard, columns, batch_size, column_types)
+
+
+def _iter_file_batches(path: str, columns: Optional[List[str]], batch_size: int, column_types: Dict[str, pa.DataType]) -> Iterator[pa.RecordBatch]:
+    table_format = get_table_format(path)
+    if table_format == "parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+    elif table_format == "feather":
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                yield batch if columns is None else batch.select(columns)
+    else:
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types=column_types,
+        )
+        yield from pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=_CSV_BLOCK_SIZE), convert_options=convert_options)
+
+
+def iter_tables(
+    path: str,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 100_000,
+    string_columns: Optional[List[str]] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> Iterator[pa.Table]:
+    """
+    按格式流式读取数据文件，每块恰好batch_size行（最后一块除外）
+
+    各方文件的格式或分片方式不同时按相同的行数分块，对齐的数据逐块仍然对齐。分片数据集按顺序逐个分片读取
+
+    :param path: 文件路径
+    :param columns: 需要的列，为None时读取全部列
+    :param batch_size: 每块的行数
+    :param string_columns: csv文件中按字符串读取的列（例如求交键），列式格式保留文件中的类型
+    :param column_types: csv文件中按指定类型读取的列，其余列由pyarrow按第一个数据块推断
+    :return: Arrow表的迭代器
+    """
+    column_types = {**(column_types or {}), **{name: pa.string() for name in string_columns or []}}
+    pending: List[pa.RecordBatch] = []
+    rows = 0
+    for batch in _iter_batches(path, columns, batch_size, column_types):
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= batch_size:
+            # 各分片推断的类型可能不同，拼接时统一
+            table = pa.concat_tables([pa.Table.from_batches([batch]) for batch in pending], promote_options="permissive")
+            yield table.slice(0, batch_size)
+            rest = table.slice(batch_size)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.concat_tables([pa.Table.from_batches([batch]) for batch in pending], promote_options="permissive")
+
+
+class TableWriter:
+    """
+    按扩展名选择格式，逐块写出数据文件
+
+    先写入临时文件，close时替换目标文件，写出失败时不会留下不完整的输出
+    """
+
+    def __init__(self, path: str, schema: pa.Schema):
+        self.path = path
+        self.schema = schema
+        self.table_format = get_table_format(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._temp_path = f"{path}.tmp"
+        if self.table_format == "parquet":
+            self._writer = pq.ParquetWriter(self._temp_path, schema)
+        elif self.table_format == "feather":
+            self._writer = pa.ipc.new_file(self._temp_path, schema)
+        else:
+            self._writer = pa_csv.CSVWriter(self._temp_path, schema)
+
+    def write(self, table: pa.Table):
+        self._writer.write(table)
+
+    def close(self, commit: bool = True):
+        """
+        结束写出
+
+        :param commit: 为True时替换目标文件，否则删除临时文件
+        """
+        self._writer.close()
+        if commit:
+            os.replace(self._temp_path, self.path)
+        elif os.path.isfile(self._temp_path):
+            os.remove(self._temp_path)
+
+
+def write_arrow_table(table: pa.Table, path: str):
+    """
+    按扩展名的格式写出整个表
+
+    :param table: Arrow表
+    :param path: 输出文件
+    """
+    writer = TableWriter(path, table.schema)
+    try:
+        writer.write(table)
+    except Exception:
+        writer.close(commit=False)
+        raise
+    writer.close()
+
+
+def csv_staging_path(path: str) -> str:
+    """
+    只能写出csv的步骤（例如SecretFlow的求交和纵向数据写出）使用的中间文件
+
+    :param path: 最终的输出文件
+    :return: csv文件直接返回原路径，列式格式返回输出目录下文件名唯一的.staging.csv文件
+    """
+    return unique_temp_path(path, ".staging.csv") if is_columnar(path) else path
+
+
+def _lossless_column(column: pa.ChunkedArray) -> pa.Array:
+    """整数或浮点值转换回字符串后与原文完全一致时才转换类型，空字符串转换为空值，否则保留字符串"""
+    text = column.to_pandas()
+    present = (text != "").to_numpy()
+    if not present.any():
+        return column.combine_chunks()
+    for dtype, arrow_type in (("int64", pa.int64()), ("float64", pa.float64())):
+        values = text.where(present, "0")
+        try:
+            parsed = values.astype(dtype)
+        except (ValueError, OverflowError):
+            continue
+        if (parsed[present].astype(str) == values[present]).all():
+            return pa.array(parsed.to_numpy(), type=arrow_type, mask=~present)
+    return column.combine_chunks()
+
+
+def _read_csv_lossless(path: str) -> pa.Table:
+    """
+    读取中间csv文件，只有能按原文还原的列才转换为数值类型
+
+    直接推断类型时"007"会被解析为7，写出列式格式后ID和求交键被改写，再转换回csv也无法还原；
+    先按字符串读取全部列，再逐列判断能否无损转换为整数或浮点
+    """
+    names = read_column_names(path)
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in names}))
+    return pa.Table.from_arrays([_lossless_column(column) for column in table.columns], names=table.column_names)
+
+
+def _write_pandas_csv(path: str, target: str):
+    """逐块将列式格式转换为csv，格式与pandas写出的csv一致（只在需要时加引号，整数列的空值写为空）"""
+    header = True
+    with open(target, "w", encoding="utf-8", newline="") as output:
+        for table in iter_tables(path):
+            frame = table.to_pandas(types_mapper=lambda arrow_type: pd.Int64Dtype() if pa.types.is_integer(arrow_type) else None)
+            frame.to_csv(output, header=header, index=False, lineterminator="\n")
+            header = False
+        if header:
+            pd.DataFrame(columns=read_column_names(path)).to_csv(output, index=False, lineterminator="\n")
+
+
+def finalize_table(staging_path: str, path: str) -> str:
+    """
+    将中间csv文件转换为最终格式并删除中间文件
+
+    数值列只在能按原文还原时才转换类型，例如"007"保留为字符串，materialize_csv转换回csv时内容不变
+
+    :param staging_path: csv_staging_path返回的中间文件
+    :param path: 最终的输出文件
+    :return: 最终的输出文件
+    """
+    # 未广播结果时非接收方没有输出
+    if staging_path != path and os.path.isfile(staging_path):
+        write_arrow_table(_read_csv_lossless(staging_path), path)
+        os.remove(staging_path)
+    return path
+
+
+def needs_csv_materialization(path: str) -> bool:
+    """
+    只能读取单个csv文件的步骤是否需要先转换输入
+
+    :param path: 文件路径
+    :return: 列式格式或分片数据集时返回True
+    """
+    return is_sharded(path) or is_columnar(path)
+
+
+def _concat_csv_shards(shards: List[str], target: str):
+    """直接拼接csv分片的原始字节，只保留第一个分片的表头，不解析数据"""
+    header = None
+    with open(target, "wb") as output:
+        for shard in shards:
+            with open(shard, "rb") as source:
+                shard_header = source.readline().rstrip(b"\r\n") + b"\n"
+                if header is None:
+                    header = shard_header
+                    output.write(header)
+                elif shard_header != header:
+                    raise ValueError(f"分片 {shard} 的表头与第一个分片不一致")
+                shutil.copyfileobj(source, output, 16 << 20)
+                if source.tell() > len(shard_header):
+                    source.seek(-1, os.SEEK_END)
+                    if source.read(1) != b"\n":
+                        output.write(b"\n")
+
+
+def concat_shards(shards: List[str], path: str):
+    """
+    将分片按顺序合并为一个文件
+
+    分片和目标都是csv时直接拼接原始字节，否则逐块读取后按目标的格式写出，各块转换为第一块的列类型
+
+    :param shards: 分片文件列表
+    :param path: 目标文件
+    """
+    if not is_columnar(path) and not any(is_columnar(shard) for shard in shards):
+        temp_path = f"{path}.tmp"
+        try:
+            _concat_csv_shards(shards, temp_path)
+        except Exception:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            raise
+        os.replace(temp_path, path)
+        return
+    writer: Optional[TableWriter] = None
+    try:
+        for shard in shards:
+            for table in iter_tables(shard):
+                if writer is None:
+                    writer = TableWriter(path, table.schema)
+                writer.write(table.cast(writer.schema))
+        if writer is None:
+            writer = TableWriter(path, pa.schema([pa.field(name, pa.string()) for name in read_column_names(shards[0])]))
+    except Exception:
+        if writer is not None:
+            writer.close(commit=False)
+        raise
+    writer.close()
+
+
+def materialize_csv(path: str, work_dir: Optional[str] = None) -> str:
+    """
+    获取只能读取单个csv文件的步骤可以使用的路径
+
+    csv分片直接拼接原始字节；列式格式（含分片）转换为csv。临时文件不写入输入所在的目录（可能只读）
+
+    :param path: 文件路径、分片目录或通配符
+    :param work_dir: 临时文件所在目录（例如任务的输出目录），为空时使用系统临时目录
+    :return: 单个csv文件直接返回原路径，否则返回临时文件路径（由调用方删除）
+    """
+    if not needs_csv_materialization(path):
+        return path
+    temp_path = unique_temp_path(path, ".materialized.csv", work_dir or tempfile.gettempdir())
+    if work_dir:
+        os.makedirs(work_dir, exist_ok=True)
+    if is_columnar(path):
+        _write_pandas_csv(path, temp_path)
+    else:
+        _concat_csv_shards(list_shards(path), temp_path)
+    return temp_path
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+__all__ = [
+    "input_version",
+    "server_cache_state",
+    "commit_server_cache",
+    "client_cache_state",
+    "commit_client_cache",
+]
+
+# 缓存目录中的版本记录文件
+_MANIFEST_NAME = "version.json"
+# ECDH私钥长度
+_SECRET_KEY_SIZE = 32
+
+
+def _read_manifest(cache_root: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(cache_root, _MANIFEST_NAME), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache_root: str, manifest: Dict):
+    os.makedirs(cache_root, exist_ok=True)
+    manifest_path = os.path.join(cache_root, _MANIFEST_NAME)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def _file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def input_version(input_path: str, params_digest: str, manifest: Optional[Dict] = None) -> Dict:
+    """
+    计算大数据方输入的版本
+
+    版本由求交参数摘要和输入文件内容摘要决定；文件大小和修改时间与上次记录一致时沿用记录的内容摘要，
+    不必每次查询都重新读取整个大文件
+
+    :param input_path: 大数据方输入文件
+    :param params_digest: 影响离线结果的参数摘要（求交键、曲线等）
+    :param manifest: 上次的版本记录
+    :return: {"version": 版本, "size": 文件大小, "mtime_ns": 修改时间, "content_digest": 内容摘要}
+    """
+    stat = os.stat(input_path)
+    if manifest and manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+        content_digest = manifest["content_digest"]
+    else:
+        content_digest = _file_digest(input_path)
+    version = hashlib.sha256(f"{params_digest}:{content_digest}".encode("utf-8")).hexdigest()[:16]
+    return {"version": version, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content_digest": content_digest}
+
+
+def server_cache_state(input_path: str, cache_root: str, params_digest: str) -> Dict:
+    """
+    检查大数据方的离线缓存是否与当前输入一致
+
+    每个版本使用独立的目录，保存离线生成的缓存和对应的ECDH私钥；缓存过期时为新版本生成私钥
+
+    :param input_path: 大数据方输入文件
+    :param cache_root: 缓存根目录
+    :param params_digest: 影响离线结果的参数摘要
+    :return: {"version", "ready": 缓存是否可用, "cache_path", "secret_key_path", 以及版本记录字段}
+    """
+    manifest = _read_manifest(cache_root)
+    state = input_version(input_path, params_digest, manifest)
+    version_dir = os.path.join(cache_root, state["version"])
+    state["cache_path"] = os.path.join(version_dir, "server-cache")
+    state["secret_key_path"] = os.path.join(version_dir, "secret-key.bin")
+    state["ready"] = bool(
+        manifest
+        and manifest.get("version") == state["version"]
+        and os.path.isfile(state["cache_path"])
+        and os.path.isfile(state["secret_key_path"])
+    )
+    if not os.path.isfile(state["secret_key_path"]):
+        # 同一版本的私钥只生成一次，并发生成缓存的任务不会覆盖彼此的私钥
+        os.makedirs(version_dir, exist_ok=True)
+        try:
+            fd = os.open(state["secret_key_path"], os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return state
+        with os.fdopen(fd, "wb") as file:
+            file.write(os.urandom(_SECRET_KEY_SIZE))
+    return state
+
+
+def commit_server_cache(cache_root: str, state: Dict):
+    """
+    离线缓存生成后记录版本，并删除旧版本的目录
+
+    :param cache_root: 缓存根目录
+    :param state: server_cache_state返回的状态
+    """
+    manifest = {key: state[key] for key in ("version", "size", "mtime_ns", "content_digest")}
+    manifest["created"] = time.time()
+    _write_manifest(cache_root, manifest)
+    _remove_other_versions(cache_root, state["version"])
+
+
+def client_cache_state(cache_root: str, version: str) -> Dict:
+    """
+    检查小数据方是否已持有指定版本的预处理数据
+
+    :param cache_root: 缓存根目录
+    :param version: 大数据方当前的缓存版本
+    :return: {"version", "ready": 预处理数据是否可用, "preprocess_path"}
+    """
+    manifest = _read_manifest(cache_root)
+    preprocess_path = os.path.join(cache_root, version, "client-preprocess")
+    os.makedirs(os.path.dirname(preprocess_path), exist_ok=True)
+    ready = bool(manifest and manifest.get("version") == version and os.path.isfile(preprocess_path))
+    return {"version": version, "ready": ready, "preprocess_path": preprocess_path}
+
+
+def commit_client_cache(cache_root: str, version: str):
+    """
+    预处理数据接收完成后记录版本，并删除旧版本的目录
+
+    :param cache_root: 缓存根目录
+    :param version: 缓存版本
+    """
+    _write_manifest(cache_root, {"version": version, "created": time.time()})
+    _remove_other_versions(cache_root, version)
+
+
+def _remove_other_versions(cache_root: str, version: str):
+    for entry in os.scandir(cache_root):
+        if entry.is_dir() and entry.name != version:
+            shutil.rmtree(entry.path, ignore_errors=True)